@@ -7,6 +7,7 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from google.auth.transport.requests import Request
+from Api_clients import get_api_gateway
 
 # Google OAuth scopes
 SCOPES = [
@@ -81,7 +82,7 @@ def main():
     try:
         # Build OAuth2 service
         service = build('oauth2', 'v2', credentials=creds)
-        user_info = service.userinfo().get().execute()
+        user_info = get_api_gateway().call('oauth', 'userinfo.get', service.userinfo().get().execute)
 
         # Display user info
         print("\n✅ Login successful!")
@@ -0,0 +1,161 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import threading
+
+from Api_gateway import ApiGateway
+
+try:
+    import googlemaps
+    import requests
+    GOOGLEMAPS_AVAILABLE = True
+except ImportError:
+    GOOGLEMAPS_AVAILABLE = False
+
+if GOOGLEMAPS_AVAILABLE:
+    class SingleAttemptMapsClient(googlemaps.Client):
+        """``googlemaps.Client`` that makes one attempt per call.
+
+        The client retries 5xx responses and retriable statuses by calling
+        ``_request`` again with ``retry_counter`` raised. Here that call fails
+        with a ``TransportError`` instead, which the gateway retries with its
+        own backoff, so a request is never retried by both.
+        """
+        
+        def _request(self, url, params, first_request_time=None, retry_counter=0, *args, **kwargs):
+            if retry_counter > 0:
+                raise googlemaps.exceptions.TransportError(RuntimeError(f"retriable response from {url}"))
+            return super()._request(url, params, first_request_time, retry_counter, *args, **kwargs)
+
+try:
+    import google.generativeai as genai
+    GENAI_AVAILABLE = True
+except ImportError:
+    GENAI_AVAILABLE = False
+
+# Connection pool and timeout defaults shared by every worker thread
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 20
+DEFAULT_GEMINI_TIMEOUT = 60
+# Gemini model methods that reach the network
+GEMINI_ENDPOINTS = ('generate_content', 'count_tokens')
+
+
+class ClientRegistry:
+    """Long-lived, thread-safe API clients shared across worker threads.
+
+    Building a ``googlemaps.Client`` or ``GenerativeModel`` per request means a
+    new HTTP session and TLS handshake every time. The registry builds each
+    client once and keeps its keep-alive connection pool warm. Every client
+    it hands out calls through the shared ``ApiGateway``, which rate-limits,
+    deduplicates and retries its requests.
+    """
+    
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, gemini_timeout=DEFAULT_GEMINI_TIMEOUT):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.gemini_timeout = gemini_timeout
+        
+        self.gateway = ApiGateway()
+        self._lock = threading.Lock()
+        self._maps_clients = {}
+        self._guarded_maps_clients = {}
+        self._gemini_models = {}
+        self._gemini_key = None
+    
+    def configure(self, pool_size=None, connect_timeout=None, read_timeout=None, gemini_timeout=None):
+        """Change pool/timeout settings; clients are rebuilt on next use"""
+        with self._lock:
+            if pool_size is not None:
+                self.pool_size = pool_size
+            if connect_timeout is not None:
+                self.connect_timeout = connect_timeout
+            if read_timeout is not None:
+                self.read_timeout = read_timeout
+            if gemini_timeout is not None:
+                self.gemini_timeout = gemini_timeout
+            self._close_maps_clients()
+            self._gemini_models.clear()
+    
+    def maps_client(self, api_key):
+        """Return the shared Google Maps client for ``api_key``"""
+        if not GOOGLEMAPS_AVAILABLE:
+            raise RuntimeError("Google Maps library not installed")
+        
+        with self._lock:
+            guarded = self._guarded_maps_clients.get(api_key)
+            if guarded is None:
+                # Quota and server errors are retried by the gateway, with its backoff
+                client = SingleAttemptMapsClient(
+                    key=api_key,
+                    connect_timeout=self.connect_timeout,
+                    read_timeout=self.read_timeout,
+                    retry_over_query_limit=False
+                )
+                # Size the keep-alive pool for concurrent worker threads
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size
+                )
+                client.session.mount('https://', adapter)
+                self._maps_clients[api_key] = client
+                guarded = self._guarded_maps_clients[api_key] = self.gateway.wrap(client, 'maps')
+            return guarded
+    
+    def gemini_model(self, api_key, model_name="gemini-1.5-pro"):
+        """Return the shared Gemini model, configuring the SDK only once"""
+        if not GENAI_AVAILABLE:
+            raise RuntimeError("Gemini AI library not installed")
+        
+        with self._lock:
+            # genai.configure is process-wide, so only call it when the key changes
+            if self._gemini_key != api_key:
+                genai.configure(api_key=api_key)
+                self._gemini_key = api_key
+                self._gemini_models.clear()
+            
+            model = self._gemini_models.get(model_name)
+            if model is None:
+                model = self.gateway.wrap(genai.GenerativeModel(model_name), 'gemini', GEMINI_ENDPOINTS)
+                self._gemini_models[model_name] = model
+            return model
+    
+    def gemini_request_options(self):
+        """Per-call options for ``generate_content``"""
+        return {'timeout': self.gemini_timeout}
+    
+    def close(self):
+        """Close pooled connections"""
+        with self._lock:
+            self._close_maps_clients()
+            self._gemini_models.clear()
+    
+    def _close_maps_clients(self):
+        for client in self._maps_clients.values():
+            try:
+                client.session.close()
+            except Exception as e:
+                print(f"Error closing Google Maps session: {e}")
+        self._maps_clients.clear()
+        self._guarded_maps_clients.clear()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry():
+    """Return the process-wide client registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry()
+        return _registry
+
+
+def get_api_gateway():
+    """Return the gateway shared by every outbound API call"""
+    return get_client_registry().gateway
@@ -0,0 +1,445 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import copy
+import time
+import random
+import asyncio
+import threading
+from collections import namedtuple
+
+from Rate_limiter import TokenBucket
+
+# Response statuses (Maps ``ApiError.status``, gRPC codes) worth retrying
+RETRYABLE_STATUSES = {'OVER_QUERY_LIMIT', 'RESOURCE_EXHAUSTED', 'UNKNOWN_ERROR', 'UNAVAILABLE',
+                      'DEADLINE_EXCEEDED', 'INTERNAL'}
+RETRYABLE_HTTP_CODES = {408, 429, 500, 502, 503, 504}
+# Exception classes of the Google client libraries that mean "try again later";
+# matched by name so none of those libraries has to be installed
+RETRYABLE_ERROR_NAMES = {'Timeout', 'TransportError', '_OverQueryLimit', 'ResourceExhausted', 'TooManyRequests',
+                         'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError', 'BadGateway',
+                         'GatewayTimeout', 'ConnectionError', 'ReadTimeout', 'ConnectTimeout'}
+
+# ``max_wait`` bounds how long a call may queue for a rate-limit token
+ApiPolicy = namedtuple('ApiPolicy', ['queries_per_second', 'burst', 'max_retries', 'base_delay', 'max_delay',
+                                     'max_wait'])
+DEFAULT_POLICIES = {
+    'maps': ApiPolicy(queries_per_second=10, burst=20, max_retries=3, base_delay=0.5, max_delay=8.0, max_wait=30.0),
+    'gemini': ApiPolicy(queries_per_second=0.5, burst=2, max_retries=3, base_delay=2.0, max_delay=30.0,
+                        max_wait=60.0),
+    'oauth': ApiPolicy(queries_per_second=2, burst=2, max_retries=2, base_delay=1.0, max_delay=8.0, max_wait=10.0),
+}
+# Used for any API without a policy of its own
+FALLBACK_POLICY = ApiPolicy(queries_per_second=5, burst=5, max_retries=2, base_delay=1.0, max_delay=8.0,
+                            max_wait=30.0)
+
+
+class RateLimitTimeout(RuntimeError):
+    """A call waited longer than its API's ``max_wait`` for a rate-limit token"""
+
+
+def is_retryable(error):
+    """Whether ``error`` is a quota or transient failure that may succeed if retried"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    status = getattr(error, 'status', None)
+    if isinstance(status, str) and status in RETRYABLE_STATUSES:
+        return True
+    # urllib's HTTPError, google.api_core errors, googleapiclient's HttpError
+    for code in (getattr(error, 'code', None), getattr(error, 'status_code', None),
+                 getattr(getattr(error, 'resp', None), 'status', None)):
+        try:
+            if code is not None and int(code) in RETRYABLE_HTTP_CODES:
+                return True
+        except (TypeError, ValueError):
+            continue
+    return False
+
+
+def backoff_delay(attempt, base_delay, max_delay, rng=random):
+    """Exponential backoff with full jitter: uniform in [0, min(max_delay, base_delay * 2**attempt)]"""
+    return rng.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class EndpointMetrics:
+    """Counters for one API endpoint"""
+    
+    __slots__ = ('calls', 'sent', 'shared', 'retries', 'errors', 'throttled_s', 'latency_s', 'max_latency_s',
+                 'last_error')
+    
+    def __init__(self):
+        self.calls = 0
+        # Requests that actually went out, retries included
+        self.sent = 0
+        # Calls answered by an identical request already in flight
+        self.shared = 0
+        self.retries = 0
+        # Calls that failed after any retries
+        self.errors = 0
+        self.throttled_s = 0.0
+        self.latency_s = 0.0
+        self.max_latency_s = 0.0
+        self.last_error = None
+    
+    def snapshot(self):
+        snapshot = {name: getattr(self, name) for name in self.__slots__}
+        snapshot['avg_latency_s'] = self.latency_s / self.sent if self.sent else 0.0
+        return snapshot
+
+
+class _Flight:
+    """One in-flight request that identical calls wait on"""
+    
+    __slots__ = ('done', 'result', 'error', 'waiters')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class _AsyncFlight:
+    """``_Flight`` for coroutines: identical calls await the leader's future"""
+    
+    __slots__ = ('future', 'waiters')
+    
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+
+
+def _private_copy(result):
+    """A copy one caller may change without affecting the others"""
+    try:
+        return copy.deepcopy(result)
+    except Exception:
+        return result
+
+
+def _raise_shared_error(error):
+    """Raise the leader's ``error`` in a follower as its own copy, chained to it, so tracebacks stay apart"""
+    try:
+        own = copy.copy(error)
+    except Exception:
+        own = None
+    if own is None:
+        raise error
+    raise own from error
+
+
+class ApiGateway:
+    """Shared layer every outbound API call goes through.
+
+    Per API it applies a token-bucket rate limit and retries quota and
+    transient errors with exponential backoff and jitter. Identical calls
+    made while one is already in flight wait for that one instead of
+    sending their own (single flight). Counters are kept per endpoint.
+    Errors that are not retryable reach the caller unchanged.
+    """
+    
+    def __init__(self, policies=None, sleep=time.sleep, rng=None, clock=time.monotonic):
+        self.policies = dict(DEFAULT_POLICIES)
+        self.policies.update(policies or {})
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._in_flight = {}
+        self._async_in_flight = {}
+        self._metrics = {}
+    
+    def configure(self, api, **changes):
+        """Change fields of ``api``'s policy, e.g. ``configure('maps', queries_per_second=5)``"""
+        with self._lock:
+            self.policies[api] = self.policies.get(api, FALLBACK_POLICY)._replace(**changes)
+            self._buckets.pop(api, None)
+    
+    def wrap(self, client, api, endpoints=None):
+        """``client`` with its public methods, or only ``endpoints``, routed through the gateway"""
+        return GuardedClient(client, self, api, endpoints)
+    
+    def call(self, api, endpoint, fn, /, *args, **kwargs):
+        """Call ``fn(*args, **kwargs)`` as ``api``/``endpoint`` under the gateway's limits.
+
+        Streaming calls (``stream=True``) are neither shared nor retried once
+        their response has started.
+        """
+        metrics = self._count_call(api, endpoint)
+        if kwargs.get('stream'):
+            return self._send(api, metrics, fn, args, kwargs)
+        
+        key = self._flight_key(api, endpoint, fn, args, kwargs)
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+            else:
+                flight.waiters += 1
+        
+        if not leader:
+            flight.done.wait()
+            with self._lock:
+                metrics.shared += 1
+            if flight.error is not None:
+                _raise_shared_error(flight.error)
+            return _private_copy(flight.result)
+        
+        try:
+            result = self._send(api, metrics, fn, args, kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            flight.result = result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.done.set()
+        # No one can join once the flight is removed, so ``waiters`` is final
+        return _private_copy(result) if flight.waiters else result
+    
+    async def acall(self, api, endpoint, fn, /, *args, **kwargs):
+        """``call`` for a coroutine function ``fn``, sharing the same limits and metrics.
+
+        Waiting for tokens and backing off sleep with asyncio, so hundreds
+        of calls can wait on one event loop thread.
+        """
+        metrics = self._count_call(api, endpoint)
+        if kwargs.get('stream'):
+            return await self._asend(api, metrics, fn, args, kwargs)
+        
+        loop = asyncio.get_running_loop()
+        # Futures belong to one loop, so flights are not shared across loops
+        key = (id(loop),) + self._flight_key(api, endpoint, fn, args, kwargs)
+        with self._lock:
+            flight = self._async_in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._async_in_flight[key] = _AsyncFlight(loop.create_future())
+            else:
+                flight.waiters += 1
+        
+        if not leader:
+            # A follower that is cancelled must not cancel the leader's request
+            try:
+                result = await asyncio.shield(flight.future)
+            except Exception as e:
+                _raise_shared_error(e)
+            with self._lock:
+                metrics.shared += 1
+            return _private_copy(result)
+        
+        try:
+            result = await self._asend(api, metrics, fn, args, kwargs)
+        except asyncio.CancelledError:
+            flight.future.cancel()
+            raise
+        except Exception as e:
+            flight.future.set_exception(e)
+            raise
+        else:
+            flight.future.set_result(result)
+        finally:
+            with self._lock:
+                self._async_in_flight.pop(key, None)
+            if not flight.waiters and flight.future.done() and not flight.future.cancelled():
+                # Nobody else will look at it; keeps asyncio from warning about an unread exception
+                flight.future.exception()
+        return _private_copy(result) if flight.waiters else result
+    
+    async def _asend(self, api, metrics, fn, args, kwargs):
+        policy = self.policies.get(api, FALLBACK_POLICY)
+        bucket = self._bucket(api)
+        attempt = 0
+        while True:
+            waited = self._clock()
+            if not await bucket.acquire_async(timeout=policy.max_wait):
+                raise self._wait_exceeded(api, policy, metrics)
+            started = self._clock()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._attempt_failed(policy, metrics, attempt, e, waited, started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._attempt_succeeded(metrics, waited, started)
+            return result
+    
+    def _send(self, api, metrics, fn, args, kwargs):
+        policy = self.policies.get(api, FALLBACK_POLICY)
+        bucket = self._bucket(api)
+        attempt = 0
+        while True:
+            waited = self._clock()
+            if not bucket.acquire(timeout=policy.max_wait):
+                raise self._wait_exceeded(api, policy, metrics)
+            started = self._clock()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._attempt_failed(policy, metrics, attempt, e, waited, started)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+                attempt += 1
+                continue
+            self._attempt_succeeded(metrics, waited, started)
+            return result
+    
+    def _count_call(self, api, endpoint):
+        metrics = self._endpoint_metrics(api, endpoint)
+        with self._lock:
+            metrics.calls += 1
+        return metrics
+    
+    @staticmethod
+    def _flight_key(api, endpoint, fn, args, kwargs):
+        # Same object, same arguments; a new object (e.g. a one-off request) is never shared
+        return (api, endpoint, id(getattr(fn, '__self__', fn)), repr(args), repr(sorted(kwargs.items())))
+    
+    def _wait_exceeded(self, api, policy, metrics):
+        """Count a call that got no rate-limit token in time and return the error to raise"""
+        with self._lock:
+            metrics.errors += 1
+            metrics.last_error = "rate-limit wait exceeded"
+        return RateLimitTimeout(f"{api} rate limit: no capacity within {policy.max_wait:.0f}s")
+    
+    def _attempt_failed(self, policy, metrics, attempt, error, waited, started):
+        """Record a failed attempt; the backoff before retrying it, or None if ``error`` should be raised"""
+        retry = attempt < policy.max_retries and is_retryable(error)
+        with self._lock:
+            self._record_attempt(metrics, started - waited, self._clock() - started)
+            metrics.last_error = f"{type(error).__name__}: {error}"
+            if retry:
+                metrics.retries += 1
+            else:
+                metrics.errors += 1
+        return backoff_delay(attempt, policy.base_delay, policy.max_delay, self._rng) if retry else None
+    
+    def _attempt_succeeded(self, metrics, waited, started):
+        with self._lock:
+            self._record_attempt(metrics, started - waited, self._clock() - started)
+    
+    @staticmethod
+    def _record_attempt(metrics, throttled, latency):
+        metrics.sent += 1
+        metrics.throttled_s += throttled
+        metrics.latency_s += latency
+        metrics.max_latency_s = max(metrics.max_latency_s, latency)
+    
+    def _bucket(self, api):
+        with self._lock:
+            bucket = self._buckets.get(api)
+            if bucket is None:
+                policy = self.policies.get(api, FALLBACK_POLICY)
+                bucket = self._buckets[api] = TokenBucket(policy.queries_per_second, policy.burst,
+                                                          clock=self._clock, sleep=self._sleep)
+            return bucket
+    
+    def _endpoint_metrics(self, api, endpoint):
+        name = f"{api}.{endpoint}"
+        with self._lock:
+            metrics = self._metrics.get(name)
+            if metrics is None:
+                metrics = self._metrics[name] = EndpointMetrics()
+            return metrics
+    
+    def metrics(self):
+        """``{'api.endpoint': counters}`` for every endpoint called so far"""
+        with self._lock:
+            return {name: metrics.snapshot() for name, metrics in sorted(self._metrics.items())}
+    
+    def reset_metrics(self):
+        with self._lock:
+            self._metrics.clear()
+    
+    def metrics_report(self):
+        """Plain-text table of the per-endpoint counters"""
+        lines = [f"{'endpoint':32s} {'calls':>6s} {'sent':>6s} {'shared':>6s} {'retries':>7s} {'errors':>6s} "
+                 f"{'avg ms':>8s} {'waited s':>8s}"]
+        for name, counters in self.metrics().items():
+            lines.append(f"{name:32s} {counters['calls']:6d} {counters['sent']:6d} {counters['shared']:6d} "
+                         f"{counters['retries']:7d} {counters['errors']:6d} {counters['avg_latency_s'] * 1000:8.1f} "
+                         f"{counters['throttled_s']:8.2f}")
+        return '\n'.join(lines)
+
+
+class GuardedClient:
+    """Proxy whose method calls go through an ``ApiGateway``; other attributes pass straight through"""
+    
+    def __init__(self, client, gateway, api, endpoints=None):
+        self._client = client
+        self._gateway = gateway
+        self._api = api
+        self._endpoints = set(endpoints) if endpoints is not None else None
+    
+    def __getattr__(self, name):
+        if name in ('_client', '_gateway', '_api', '_endpoints'):
+            # Not set yet, e.g. while copying; do not recurse
+            raise AttributeError(name)
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith('_') or (self._endpoints is not None and name not in self._endpoints):
+            return attr
+        
+        def call(*args, **kwargs):
+            return self._gateway.call(self._api, name, attr, *args, **kwargs)
+        return call
+
+
+def benchmark(latency=0.05, server_quota=8, callers=40, threads=16):
+    """Fire a burst of partly duplicate requests at a rate-limited fake server, with and without the gateway"""
+    from concurrent.futures import ThreadPoolExecutor
+    from Fake_maps_server import FakeMapsServer, FakeMapsClient
+    
+    places = ["Malviya Nagar, Jaipur", "Hawa Mahal, Jaipur", "Amer Fort, Jaipur", "C Scheme, Jaipur",
+              "Jaipur Airport, Jaipur", "Raja Park, Jaipur", "Sindhi Camp, Jaipur", "World Trade Park, Jaipur"]
+    # Every route asked for twice, as from double clicks or two views wanting the same trip
+    routes = [(places[i % len(places)], places[(i * 3 + 1) % len(places)]) for i in range(callers // 2)] * 2
+    
+    for name in ("direct", "gateway"):
+        with FakeMapsServer(latency=latency, queries_per_second=server_quota) as server:
+            server.fail_next(3, 503)
+            gateway = ApiGateway()
+            gateway.configure('maps', queries_per_second=server_quota * 0.9, burst=server_quota // 2)
+            client = FakeMapsClient(server.url)
+            if name == "gateway":
+                client = gateway.wrap(client, 'maps')
+            
+            def route(pair):
+                try:
+                    client.directions(*pair, mode='driving')
+                    return None
+                except Exception as e:
+                    return type(e).__name__
+            
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                failures = [error for error in pool.map(route, routes) if error]
+            elapsed = time.perf_counter() - started
+            print(f"{name:8s} {len(routes)} calls in {elapsed:5.2f}s: {len(failures)} failed, "
+                  f"{server.request_count} requests sent, {server.quota_errors} over quota")
+            if name == "gateway":
+                print(gateway.metrics_report())
+    
+    gateway = ApiGateway()
+    gateway.configure('local', queries_per_second=1e9, burst=1e9)
+    started = time.perf_counter()
+    for i in range(20000):
+        gateway.call('local', 'noop', int, i)
+    print(f"overhead: {(time.perf_counter() - started) / 20000 * 1e6:.1f} µs per call")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Api_gateway.py --bench")
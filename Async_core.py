@@ -0,0 +1,488 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import json
+import time
+import asyncio
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import wait
+from datetime import datetime
+
+from Api_clients import get_api_gateway
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import qasync
+    QASYNC_AVAILABLE = True
+except ImportError:
+    QASYNC_AVAILABLE = False
+
+# The app only switches its network calls to asyncio when a real async HTTP client is there
+ASYNC_NETWORKING = HTTPX_AVAILABLE
+
+MAPS_BASE_URL = 'https://maps.googleapis.com'
+GEMINI_BASE_URL = 'https://generativelanguage.googleapis.com'
+DEFAULT_TIMEOUT = 20
+# Requests in flight at once; more wait on a semaphore rather than inside httpx
+DEFAULT_MAX_CONNECTIONS = 256
+# httpx's pool scans all of its connections for every request it assigns, which
+# costs more CPU than the request itself at a few dozen connections. So the
+# connections are spread over several small pools, used in turn.
+CONNECTIONS_PER_POOL = 4
+
+
+class AsyncHttpError(Exception):
+    """An HTTP error status; ``code`` is what the gateway's retry check reads"""
+    
+    def __init__(self, code, message=''):
+        super().__init__(f"HTTP {code}: {message}" if message else f"HTTP {code}")
+        self.code = code
+
+
+class AsyncApiError(Exception):
+    """A non-OK status in a Maps response, like ``googlemaps.exceptions.ApiError``"""
+    
+    def __init__(self, status, message=None):
+        super().__init__(f"{status} ({message})" if message else status)
+        self.status = status
+        self.message = message
+
+
+class AsyncHttpClient:
+    """JSON over HTTP for coroutines.
+
+    With httpx requests share a set of pooled ``AsyncClient`` objects and
+    hundreds can be in flight on the loop's thread. Without it each request
+    runs as a blocking urllib call on the loop's helper threads, so the same code
+    still works, only without the concurrency.
+    """
+    
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._clients = None
+        self._turn = 0
+        self._slots = None
+        self._opening = None
+    
+    @property
+    def backend(self):
+        return 'httpx' if HTTPX_AVAILABLE else 'urllib'
+    
+    async def _ensure_open(self):
+        # Created on first use, inside the loop they belong to
+        if self._clients is None:
+            if self._opening is None:
+                self._opening = asyncio.ensure_future(self._open())
+            await asyncio.shield(self._opening)
+    
+    def _next_client(self):
+        self._turn = (self._turn + 1) % len(self._clients)
+        return self._clients[self._turn]
+    
+    async def _open(self):
+        # Loading the CA certificates takes tens of milliseconds, so it is done once, off the loop
+        ssl_context = await asyncio.to_thread(httpx.create_ssl_context)
+        per_pool = min(CONNECTIONS_PER_POOL, self.max_connections)
+        limits = httpx.Limits(max_connections=per_pool, max_keepalive_connections=per_pool)
+        self._slots = asyncio.Semaphore(self.max_connections)
+        self._clients = [httpx.AsyncClient(timeout=self.timeout, limits=limits, verify=ssl_context)
+                         for _ in range(-(-self.max_connections // per_pool))]
+    
+    async def get_json(self, url, params=None):
+        return await self.request_json('GET', url, params=params)
+    
+    async def post_json(self, url, body, params=None):
+        return await self.request_json('POST', url, body=body, params=params)
+    
+    async def request_json(self, method, url, body=None, params=None):
+        if HTTPX_AVAILABLE:
+            await self._ensure_open()
+            async with self._slots:
+                response = await self._next_client().request(method, url, params=params, json=body)
+            if response.status_code >= 400:
+                raise AsyncHttpError(response.status_code, response.text[:200])
+            return response.json()
+        text = await asyncio.to_thread(self._blocking_request, method, url, body, params)
+        return json.loads(text)
+    
+    async def request_lines(self, method, url, body=None, params=None):
+        """Yield the response body line by line as it arrives"""
+        if HTTPX_AVAILABLE:
+            await self._ensure_open()
+            async with self._next_client().stream(method, url, params=params, json=body) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise AsyncHttpError(response.status_code, response.text[:200])
+                async for line in response.aiter_lines():
+                    yield line
+            return
+        text = await asyncio.to_thread(self._blocking_request, method, url, body, params)
+        for line in text.splitlines():
+            yield line
+    
+    def _blocking_request(self, method, url, body, params):
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(url, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read().decode('utf-8')
+        except urllib.error.HTTPError as e:
+            raise AsyncHttpError(e.code, e.read().decode('utf-8', 'replace')[:200]) from None
+    
+    async def aclose(self):
+        clients, self._clients, self._opening = self._clients or [], None, None
+        for client in clients:
+            await client.aclose()
+
+
+def _timestamp(departure_time):
+    if isinstance(departure_time, datetime):
+        return str(int(departure_time.timestamp()))
+    return str(departure_time)
+
+
+class AsyncMapsClient:
+    """Google Maps web services for coroutines, with ``googlemaps.Client``'s method names and results.
+
+    Calls go through the shared ``ApiGateway``, so they count against the
+    same rate limits and metrics as the blocking client.
+    """
+    
+    def __init__(self, key, http=None, base_url=MAPS_BASE_URL, gateway=None):
+        self.key = key
+        self.http = http or AsyncHttpClient()
+        self.base_url = base_url.rstrip('/')
+        self.gateway = gateway or get_api_gateway()
+    
+    async def directions(self, origin, destination, mode='driving', departure_time=None, traffic_model=None,
+                         alternatives=False):
+        params = {'origin': origin, 'destination': destination, 'mode': mode}
+        if departure_time is not None:
+            params['departure_time'] = _timestamp(departure_time)
+        if traffic_model:
+            params['traffic_model'] = traffic_model
+        if alternatives:
+            params['alternatives'] = 'true'
+        body = await self._get('directions', '/maps/api/directions/json', params)
+        return body.get('routes', [])
+    
+    async def distance_matrix(self, origins, destinations, mode='driving', departure_time=None, traffic_model=None):
+        params = {'origins': '|'.join(origins), 'destinations': '|'.join(destinations), 'mode': mode}
+        if departure_time is not None:
+            params['departure_time'] = _timestamp(departure_time)
+        if traffic_model:
+            params['traffic_model'] = traffic_model
+        return await self._get('distance_matrix', '/maps/api/distancematrix/json', params)
+    
+    async def geocode(self, address):
+        body = await self._get('geocode', '/maps/api/geocode/json', {'address': address})
+        return body.get('results', [])
+    
+    async def places_autocomplete(self, input_text, session_token=None):
+        params = {'input': input_text}
+        if session_token:
+            params['sessiontoken'] = session_token
+        body = await self._get('places_autocomplete', '/maps/api/place/autocomplete/json', params)
+        return body.get('predictions', [])
+    
+    async def _get(self, endpoint, path, params):
+        return await self.gateway.acall('maps', endpoint, self._fetch, path, tuple(sorted(params.items())))
+    
+    async def _fetch(self, path, params):
+        body = await self.http.get_json(self.base_url + path, dict(params, key=self.key))
+        status = body.get('status')
+        if status not in ('OK', 'ZERO_RESULTS'):
+            raise AsyncApiError(status, body.get('error_message'))
+        return body
+
+
+def response_text(body):
+    """Text of the first candidate of a generateContent response"""
+    candidates = body.get('candidates') or [{}]
+    parts = (candidates[0].get('content') or {}).get('parts') or []
+    return ''.join(part.get('text', '') for part in parts)
+
+
+class AsyncGeminiClient:
+    """Gemini's REST API for coroutines: whole replies or a stream of text chunks"""
+    
+    def __init__(self, key, model_name="gemini-1.5-pro", http=None, base_url=GEMINI_BASE_URL, gateway=None):
+        self.key = key
+        self.model_name = model_name
+        self.http = http or AsyncHttpClient(timeout=60)
+        self.base_url = base_url.rstrip('/')
+        self.gateway = gateway or get_api_gateway()
+    
+    def _url(self, method):
+        return f"{self.base_url}/v1beta/models/{self.model_name}:{method}"
+    
+    @staticmethod
+    def _body(prompt):
+        return {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+    
+    async def generate_content(self, prompt):
+        """The whole reply to ``prompt``"""
+        body = await self.gateway.acall('gemini', 'generate_content', self._generate, prompt)
+        return response_text(body)
+    
+    async def _generate(self, prompt):
+        return await self.http.post_json(self._url('generateContent'), self._body(prompt), {'key': self.key})
+    
+    async def stream_generate_content(self, prompt):
+        """Yield the reply to ``prompt`` in chunks as Gemini produces them"""
+        lines = await self.gateway.acall('gemini', 'stream_generate_content', self._open_stream, prompt, stream=True)
+        try:
+            async for line in lines:
+                if not line.startswith('data:'):
+                    continue
+                text = response_text(json.loads(line[len('data:'):]))
+                if text:
+                    yield text
+        finally:
+            await lines.aclose()
+    
+    async def _open_stream(self, prompt, stream=True):
+        lines = self.http.request_lines('POST', self._url('streamGenerateContent'), self._body(prompt),
+                                        {'key': self.key, 'alt': 'sse'})
+        # Send the request now, so rate limiting and retries cover it; the caller reads the rest
+        try:
+            first = await lines.__anext__()
+        except StopAsyncIteration:
+            first = None
+        return _prepend(first, lines)
+
+
+async def _prepend(first, lines):
+    try:
+        if first is not None:
+            yield first
+        async for line in lines:
+            yield line
+    finally:
+        await lines.aclose()
+
+
+class AsyncRunner:
+    """One asyncio loop for the app's network work, tied into the Qt event loop.
+
+    With qasync the loop is the Qt loop itself and ``run_app`` replaces
+    ``app.exec_()``. Without it the loop runs on a background thread and
+    results reach widgets through their signals, which Qt queues to the
+    GUI thread. Like ``TaskExecutor``, tasks are submitted under a key and
+    a repeat of a running key is not started twice.
+    """
+    
+    def __init__(self, app=None, use_qt_loop=QASYNC_AVAILABLE):
+        self.http = AsyncHttpClient()
+        self._lock = threading.Lock()
+        self._tasks = {}
+        self._maps_clients = {}
+        self._gemini_clients = {}
+        self._thread = None
+        if use_qt_loop and app is not None:
+            self.loop = qasync.QEventLoop(app)
+            asyncio.set_event_loop(self.loop)
+        else:
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop, name='async-network', daemon=True)
+            self._thread.start()
+    
+    @property
+    def integrated(self):
+        """Whether the loop is the Qt event loop rather than a thread of its own"""
+        return self._thread is None
+    
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+    
+    def maps_client(self, api_key):
+        """Shared ``AsyncMapsClient`` for ``api_key`` on this runner's connection pool"""
+        with self._lock:
+            client = self._maps_clients.get(api_key)
+            if client is None:
+                client = self._maps_clients[api_key] = AsyncMapsClient(api_key, self.http)
+            return client
+    
+    def gemini_client(self, api_key, model_name="gemini-1.5-pro"):
+        """Shared ``AsyncGeminiClient`` for ``api_key`` and ``model_name``"""
+        with self._lock:
+            client = self._gemini_clients.get((api_key, model_name))
+            if client is None:
+                client = self._gemini_clients[(api_key, model_name)] = AsyncGeminiClient(api_key, model_name,
+                                                                                         AsyncHttpClient(timeout=60))
+            return client
+    
+    def submit(self, key, coro, cancel_event=None):
+        """Run coroutine ``coro`` on the loop under ``key``; returns a ``concurrent.futures.Future``.
+
+        ``cancel_event`` is set when the task is cancelled, for code that
+        polls it.
+        """
+        with self._lock:
+            existing = self._tasks.get(key)
+            if existing is not None and not existing[0].done():
+                coro.close()
+                return existing[0]
+            future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+            self._tasks[key] = (future, cancel_event)
+        future.add_done_callback(lambda done, key=key: self._finished(key, done))
+        return future
+    
+    def _finished(self, key, future):
+        with self._lock:
+            if self._tasks.get(key, (None,))[0] is future:
+                del self._tasks[key]
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Background task {key!r} failed: {future.exception()}")
+    
+    def is_in_flight(self, key):
+        with self._lock:
+            task = self._tasks.get(key)
+            return task is not None and not task[0].done()
+    
+    def cancel(self, key):
+        """Cancel the task for ``key``; its pending request is abandoned at once"""
+        with self._lock:
+            task = self._tasks.get(key)
+        if task is not None:
+            future, cancel_event = task
+            if cancel_event is not None:
+                cancel_event.set()
+            future.cancel()
+    
+    def cancel_all(self):
+        with self._lock:
+            keys = list(self._tasks)
+        for key in keys:
+            self.cancel(key)
+    
+    def shutdown(self, timeout=5):
+        """Cancel every task, close the connection pools and stop a background loop.
+
+        With qasync the pools are closed by ``run_app`` once Qt's loop has
+        finished, since this is called from that loop's thread.
+        """
+        with self._lock:
+            futures = [future for future, _ in self._tasks.values()]
+        self.cancel_all()
+        if self.integrated:
+            return True
+        
+        _, not_done = wait(futures, timeout=timeout)
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), self.loop).result(timeout)
+        except Exception as e:
+            print(f"Error closing HTTP connections: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        return not not_done
+    
+    async def _close(self):
+        """Let the remaining tasks finish cancelling, then close the connection pools"""
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for http in [self.http] + [client.http for client in self._gemini_clients.values()]:
+            try:
+                await http.aclose()
+            except Exception as e:
+                print(f"Error closing HTTP connections: {e}")
+    
+    def run_app(self, app):
+        """Run the Qt application until its last window closes, driving the asyncio loop with it"""
+        if not self.integrated:
+            return app.exec_()
+        # Qt would stop at once; stop only after the tasks have wound down and the pools are
+        # closed, which needs the loop still running
+        app.setQuitOnLastWindowClosed(False)
+        closed = asyncio.Event()
+        app.lastWindowClosed.connect(closed.set)
+        
+        async def serve():
+            await closed.wait()
+            await self._close()
+        
+        with self.loop:
+            try:
+                self.loop.run_until_complete(serve())
+            except RuntimeError:
+                # Qt was told to quit some other way, e.g. by the session ending
+                pass
+        return 0
+
+
+def benchmark(requests=1024, latency=0.2, connections=DEFAULT_MAX_CONNECTIONS, pool_workers=4):
+    """Directions from the app's worker pool, a thread per connection and one loop thread; then a Gemini stream"""
+    from concurrent.futures import ThreadPoolExecutor
+    from Fake_maps_server import FakeMapsServer, FakeMapsClient
+    from Api_gateway import ApiGateway
+    
+    trips = [(f"Origin {i}, Jaipur", f"Destination {i}, Jaipur") for i in range(requests)]
+    
+    def report(label, count, elapsed, server):
+        print(f"{label:<34} {count:5d} directions in {elapsed:5.2f}s ({count / elapsed:4.0f}/s), "
+              f"{server.peak_in_flight:3d} in flight at once")
+    
+    def run_threads(workers, count):
+        with FakeMapsServer(latency=latency) as server:
+            client = FakeMapsClient(server.url)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(lambda trip: client.directions(*trip, departure_time=datetime.now()), trips[:count]))
+            report(f"threads ({workers} workers)", count, time.perf_counter() - started, server)
+    
+    async def run_async(server):
+        gateway = ApiGateway()
+        gateway.configure('maps', queries_per_second=10 ** 6, burst=10 ** 6)
+        gateway.configure('gemini', queries_per_second=10 ** 6, burst=10 ** 6)
+        http = AsyncHttpClient(max_connections=connections)
+        client = AsyncMapsClient('fake-key', http, server.url, gateway)
+        
+        started = time.perf_counter()
+        # Every request is started at once; the HTTP client paces them over its connections
+        routes = await asyncio.gather(*(client.directions(origin, destination, departure_time=datetime.now())
+                                        for origin, destination in trips))
+        report(f"asyncio ({http.backend}, 1 thread)", len(routes), time.perf_counter() - started, server)
+        
+        gemini = AsyncGeminiClient('fake-key', 'gemini-1.5-pro', http, server.url, gateway)
+        started = time.perf_counter()
+        chunks = [chunk async for chunk in gemini.stream_generate_content("Best time to leave for the airport?")]
+        print(f"gemini stream: {len(chunks)} chunks in {(time.perf_counter() - started) * 1000:.0f} ms")
+        
+        # A cancelled task stops waiting for its response straight away
+        task = asyncio.ensure_future(client.directions("Cancel me", "Nowhere"))
+        await asyncio.sleep(0.01)
+        started = time.perf_counter()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            print(f"cancelled in {(time.perf_counter() - started) * 1000:.1f} ms")
+        await http.aclose()
+    
+    # The app's shared pool is only timed on a slice of the requests; at its pace all of them take minutes
+    run_threads(pool_workers, min(requests, pool_workers * 16))
+    run_threads(connections, requests)
+    with FakeMapsServer(latency=latency) as server:
+        asyncio.run(run_async(server))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Async_core.py --bench")
@@ -0,0 +1,193 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import csv
+import sys
+import asyncio
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from Directions_service import fetch_directions, fetch_directions_async, parse_directions
+
+TRAVEL_MODES = ['driving', 'walking', 'bicycling', 'transit']
+DEFAULT_CONCURRENCY = 4
+# Rows in flight at once in ``run_async``; the gateway's rate limit still sets the pace
+ASYNC_CONCURRENCY = 200
+
+BatchRow = namedtuple('BatchRow', ['origin', 'destination', 'mode', 'departure_time'])
+
+
+def parse_departure_time(value):
+    """Parse a CSV departure time; blank or 'now' means leave now"""
+    value = (value or '').strip()
+    if not value or value.lower() == 'now':
+        return None
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid departure time: {value}")
+
+
+def read_batch_csv(path):
+    """Read (origin, destination, mode, departure_time) rows from a CSV file"""
+    rows = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.DictReader(f)
+        for line_number, record in enumerate(reader, 2):
+            origin = (record.get('origin') or '').strip()
+            destination = (record.get('destination') or '').strip()
+            if not origin or not destination:
+                raise ValueError(f"Line {line_number}: origin and destination are required")
+            
+            mode = (record.get('mode') or 'driving').strip().lower()
+            if mode not in TRAVEL_MODES:
+                mode = 'driving'
+            
+            try:
+                departure_time = parse_departure_time(record.get('departure_time'))
+            except ValueError as e:
+                raise ValueError(f"Line {line_number}: {e}")
+            
+            rows.append(BatchRow(origin, destination, mode, departure_time))
+    return rows
+
+
+class BatchPlanner:
+    """Fetch directions for many rows concurrently.
+
+    Requests are paced by the ``ApiGateway`` the client is wrapped in, so
+    the batch shares the app's one Maps rate limit. ``on_result(index, row,
+    directions_data, error)`` is called from worker threads as each row
+    finishes, in completion order.
+    """
+    
+    def __init__(self, client, cache=None, concurrency=DEFAULT_CONCURRENCY):
+        self.client = client
+        self.cache = cache
+        self.concurrency = concurrency
+    
+    def run(self, rows, on_result=None, cancel_event=None):
+        """Plan every row; returns a list of ``(directions_data, error)`` in input order"""
+        cancel_event = cancel_event or threading.Event()
+        results = [None] * len(rows)
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='batch-route') as pool:
+            futures = {
+                pool.submit(self._plan_row, row, cancel_event): index
+                for index, row in enumerate(rows)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                directions_data, error = future.result()
+                results[index] = (directions_data, error)
+                if on_result and not cancel_event.is_set():
+                    on_result(index, rows[index], directions_data, error)
+        
+        return results
+    
+    async def run_async(self, client, rows, on_result=None, cancel_event=None, concurrency=ASYNC_CONCURRENCY):
+        """``run`` on the event loop with an async maps client; ``on_result`` runs on the loop thread"""
+        cancel_event = cancel_event or threading.Event()
+        slots = asyncio.Semaphore(concurrency)
+        results = [None] * len(rows)
+        
+        async def plan(index, row):
+            async with slots:
+                directions_data, error = await self._plan_row_async(client, row, cancel_event)
+            results[index] = (directions_data, error)
+            if on_result and not cancel_event.is_set():
+                on_result(index, row, directions_data, error)
+        
+        await asyncio.gather(*(plan(index, row) for index, row in enumerate(rows)))
+        return results
+    
+    async def _plan_row_async(self, client, row, cancel_event):
+        if cancel_event.is_set():
+            return None, "Cancelled"
+        try:
+            departure_time = row.departure_time or datetime.now()
+            directions_result = await fetch_directions_async(
+                client, row.origin, row.destination, row.mode, departure_time, cache=self.cache)
+            if not directions_result:
+                return None, "No route found between the specified locations"
+            directions_data = await asyncio.to_thread(parse_directions, directions_result, row.origin,
+                                                      row.destination, row.mode)
+            return directions_data, None
+        except Exception as e:
+            return None, str(e)
+    
+    def _plan_row(self, row, cancel_event):
+        if cancel_event.is_set():
+            return None, "Cancelled"
+        # Cached routes are free, so only live requests spend rate-limit tokens
+        try:
+            departure_time = row.departure_time or datetime.now()
+            directions_result = fetch_directions(
+                self.client,
+                row.origin,
+                row.destination,
+                row.mode,
+                departure_time,
+                cache=self.cache
+            )
+            if not directions_result:
+                return None, "No route found between the specified locations"
+            return parse_directions(directions_result, row.origin, row.destination, row.mode), None
+        except Exception as e:
+            return None, str(e)
+
+
+def benchmark(rows=200, concurrency=8, queries_per_second=100, latency=0.05):
+    """Measure batch throughput against a local fake directions server"""
+    from Fake_maps_server import FakeMapsServer, FakeMapsClient
+    from Api_gateway import ApiGateway
+    
+    batch = [
+        BatchRow(f"Origin {i}, Jaipur", f"Destination {i}, Jaipur", 'driving', None)
+        for i in range(rows)
+    ]
+    with FakeMapsServer(latency=latency) as server:
+        for workers in sorted({1, concurrency}):
+            gateway = ApiGateway()
+            gateway.configure('maps', queries_per_second=queries_per_second, burst=queries_per_second)
+            planner = BatchPlanner(gateway.wrap(FakeMapsClient(server.url), 'maps'), concurrency=workers)
+            started = time.perf_counter()
+            results = planner.run(batch)
+            elapsed = time.perf_counter() - started
+            failures = sum(1 for _, error in results if error)
+            print(f"concurrency={workers:3d}  rows={rows}  {elapsed:6.2f}s  "
+                  f"{rows / elapsed:7.1f} routes/s  failures={failures}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+        return
+    
+    if len(sys.argv) < 2:
+        print("Usage: python Batch_planner.py trips.csv | --bench")
+        return
+    
+    from Api_clients import get_client_registry
+    from Smart_Travel_Assistant import GOOGLE_MAPS_API_KEY
+    
+    rows = read_batch_csv(sys.argv[1])
+    planner = BatchPlanner(get_client_registry().maps_client(GOOGLE_MAPS_API_KEY))
+    
+    def print_result(index, row, directions_data, error):
+        if error:
+            print(f"❌ {row.origin} → {row.destination}: {error}")
+        else:
+            print(f"✅ {directions_data['origin']} → {directions_data['destination']} "
+                  f"({row.mode}): {directions_data['duration']}, {directions_data['distance']}")
+    
+    planner.run(rows, on_result=print_result)
+
+
+if __name__ == '__main__':
+    main()
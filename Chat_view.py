@@ -0,0 +1,167 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import time
+from datetime import datetime
+from PyQt5.QtWidgets import QApplication, QTextEdit
+from PyQt5.QtGui import QTextCursor
+
+
+def message_html(message):
+    """Message text as the HTML the chat renders it with"""
+    return message.replace('/n', '<br>')
+
+
+class ChatMessageHandle:
+    """Reference to one message in a ChatView, used to update or remove it"""
+    
+    def __init__(self, start_cursor, end_cursor):
+        # Both cursors keep their position when text is inserted at it, so
+        # later messages appended at the end of the document leave them alone
+        self.start_cursor = start_cursor
+        self.end_cursor = end_cursor
+        self.removed = False
+
+
+class ChatView(QTextEdit):
+    """Read-only chat transcript built by appending at the end with a QTextCursor.
+
+    Adding a message costs the same no matter how long the chat is. Messages
+    added with ``removable=True`` (such as the "Thinking..." placeholder) get
+    a handle and can later be removed without re-parsing any HTML.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self._handles = []
+    
+    def add_message(self, sender, message, color, removable=False):
+        """Append a message; returns its handle when ``removable`` is set"""
+        timestamp = datetime.now().strftime("%H:%M")
+        
+        # Create HTML formatted message
+        html_message = f"""
+        <div style="margin-bottom: 15px; padding: 12px; background: rgba(255, 255, 255, 0.05); border-radius: 10px; border-left: 4px solid {color};">
+            <p style="margin: 0; color: {color}; font-weight: bold; font-size: 14px;">
+                {sender} <span style="color: #888; font-weight: normal; font-size: 12px;">({timestamp})</span>
+            </p>
+            <p style="margin: 8px 0 0 0; color: #ffffff; font-size: 14px; line-height: 1.4;">
+                {message_html(message)}
+            </p>
+        </div>"""
+        
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        if not self.document().isEmpty():
+            cursor.insertBlock()
+        
+        if not removable:
+            cursor.insertHtml(html_message)
+            self.scroll_to_bottom()
+            return None
+        
+        # Qt updates every live cursor on each edit, so only removable messages keep any
+        start_cursor = QTextCursor(cursor)
+        start_cursor.setKeepPositionOnInsert(True)
+        cursor.insertHtml(html_message)
+        # Drop the space the template's trailing whitespace leaves, so appended text joins cleanly
+        if self.document().characterAt(cursor.position() - 1) == ' ':
+            cursor.deletePreviousChar()
+        end_cursor = QTextCursor(cursor)
+        end_cursor.setKeepPositionOnInsert(True)
+        
+        handle = ChatMessageHandle(start_cursor, end_cursor)
+        self._handles.append(handle)
+        self.scroll_to_bottom()
+        return handle
+    
+    def append_to_message(self, handle, text):
+        """Append text to the end of a removable message, e.g. a streamed reply, rendered like ``add_message``"""
+        if handle is None or handle.removed:
+            return
+        # The end cursor keeps its position on insert, so write with a fresh cursor and move it after
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(handle.end_cursor.position())
+        cursor.insertHtml(message_html(text))
+        handle.end_cursor.setPosition(cursor.position())
+        self.scroll_to_bottom()
+    
+    def remove_message(self, handle):
+        """Remove a message previously returned by add_message"""
+        if handle is None or handle.removed:
+            return
+        handle.removed = True
+        
+        begin = handle.start_cursor.position()
+        finish = handle.end_cursor.position()
+        # Take the block break that separates this message from its neighbour too
+        if begin > 0:
+            begin -= 1
+        elif finish < self.document().characterCount() - 1:
+            finish += 1
+        
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(begin)
+        cursor.setPosition(finish, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        handle.start_cursor = handle.end_cursor = None
+        
+        # The newest message is the usual one to remove, so search from the end
+        for index in range(len(self._handles) - 1, -1, -1):
+            if self._handles[index] is handle:
+                del self._handles[index]
+                break
+    
+    def release(self, handle):
+        """Stop tracking a message that will not be removed after all"""
+        if handle is None or handle.removed:
+            return
+        handle.start_cursor = handle.end_cursor = None
+        self._handles = [h for h in self._handles if h is not handle]
+    
+    def clear(self):
+        for handle in self._handles:
+            handle.removed = True
+        self._handles = []
+        super().clear()
+    
+    def scroll_to_bottom(self):
+        scrollbar = self.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
+
+def benchmark(count=5000):
+    """Append ``count`` messages and report how append time scales"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    view = ChatView()
+    view.resize(800, 600)
+    
+    batch = count // 10
+    started = time.perf_counter()
+    batch_started = started
+    for i in range(count):
+        sender, color = ("You", "#4facfe") if i % 2 == 0 else (" AI", "#00f2fe")
+        view.add_message(sender, f"Message {i}: how long does the Jaipur commute take at 9am?", color)
+        if (i + 1) % batch == 0:
+            now = time.perf_counter()
+            print(f"messages {i + 2 - batch:5d}-{i + 1:5d}: {(now - batch_started) / batch * 1000:.3f} ms/append")
+            batch_started = now
+    
+    # Placeholder removal by handle, as the AI tab does for "Thinking..."
+    placeholder = view.add_message(" AI", "🤔 Thinking...", "#00f2fe", removable=True)
+    removal_started = time.perf_counter()
+    view.remove_message(placeholder)
+    removal_ms = (time.perf_counter() - removal_started) * 1000
+    
+    total = time.perf_counter() - started
+    print(f"{count} messages in {total:.2f}s; placeholder removal {removal_ms:.3f} ms")
+    return app
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Chat_view.py --bench")
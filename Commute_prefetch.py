@@ -0,0 +1,365 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import os
+import sys
+import json
+import time
+import threading
+from collections import namedtuple, defaultdict
+from datetime import datetime, timedelta
+from statistics import median
+
+from Directions_service import fetch_directions, normalize_place, TRAFFIC_TTL, DEPARTURE_BUCKET_MINUTES
+from Departure_optimizer import TIME_DEPENDENT_MODES
+
+# Warm this long before the usual departure; kept inside the traffic TTL so the
+# warmed entry is still fresh when the user usually asks
+PREFETCH_LEAD_MINUTES = min(3, TRAFFIC_TTL // 60 - 1)
+# A commute is still worth warming this long after its usual departure
+PREFETCH_GRACE_MINUTES = 10
+# Distinct days a (route, weekday, hour) needs before it counts as a habit
+MIN_OCCURRENCES = 3
+# Only journeys this recent are mined
+PATTERN_WEEKS = 8
+# API calls the prefetcher may make per calendar day
+DEFAULT_DAILY_BUDGET = 20
+BUDGET_FILE = 'prefetch_budget.json'
+# How often the app looks for commutes that are due
+CHECK_INTERVAL_MS = 60 * 1000
+
+# Share of trips at each end ignored when taking a habit's usual start times
+SPREAD_TRIM = 0.1
+
+# ``minute`` is the median minute past ``hour`` the trip was started at;
+# ``earliest``/``latest`` bound the usual ones, trimmed of outliers
+CommutePattern = namedtuple('CommutePattern', ['origin', 'destination', 'mode', 'weekday', 'hour', 'minute',
+                                               'earliest', 'latest', 'occurrences'])
+
+
+class PrefetchBudgetExceeded(RuntimeError):
+    """The prefetcher has used its API calls for today"""
+
+
+def warm_slots(pattern, bucket_minutes=DEPARTURE_BUCKET_MINUTES):
+    """Minutes past the hour at which to warm ``pattern``: one per cache bucket its usual start times fall in"""
+    if pattern.mode not in TIME_DEPENDENT_MODES:
+        # One cache entry serves any departure time
+        return [pattern.minute]
+    first = pattern.earliest - pattern.earliest % bucket_minutes
+    return [max(bucket, pattern.earliest) for bucket in range(first, pattern.latest + 1, bucket_minutes)]
+
+
+def journey_time(timestamp):
+    """Local naive datetime of a saved journey, or None"""
+    try:
+        started = datetime.fromisoformat((timestamp or '').replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if started.tzinfo is not None:
+        started = started.astimezone().replace(tzinfo=None)
+    return started
+
+
+def mine_commute_patterns(journeys, now=None, min_occurrences=MIN_OCCURRENCES, weeks=PATTERN_WEEKS):
+    """Recurring ``CommutePattern``s in ``{'timestamp', 'data'}`` journey entries, most frequent first"""
+    now = now or datetime.now()
+    since = now - timedelta(weeks=weeks)
+    days = defaultdict(set)
+    minutes = defaultdict(list)
+    # Latest spelling of each route, sent to the API as saved
+    places = {}
+    for entry in journeys:
+        data = entry.get('data') or {}
+        started = journey_time(entry.get('timestamp'))
+        if started is None or started < since or started > now:
+            continue
+        if not data.get('origin') or not data.get('destination'):
+            continue
+        # Offline plans are estimates, kept out of anything learned from history
+        if data.get('offline'):
+            continue
+        route = (normalize_place(data['origin']), normalize_place(data['destination']), data.get('mode', 'driving'))
+        key = route + (started.weekday(), started.hour)
+        days[key].add(started.date())
+        minutes[key].append(started.minute)
+        places[route] = (data['origin'], data['destination'])
+    
+    patterns = []
+    for key, dates in days.items():
+        if len(dates) < min_occurrences:
+            continue
+        origin, destination = places[key[:3]]
+        started = sorted(minutes[key])
+        trim = int(len(started) * SPREAD_TRIM)
+        patterns.append(CommutePattern(origin, destination, key[2], key[3], key[4], int(median(started)),
+                                       started[trim], started[len(started) - 1 - trim], len(dates)))
+    patterns.sort(key=lambda pattern: (-pattern.occurrences, pattern.hour, pattern.minute))
+    return patterns
+
+
+class PrefetchBudget:
+    """Thread-safe count of API calls spent today, persisted so restarts do not reset it"""
+    
+    def __init__(self, limit=DEFAULT_DAILY_BUDGET, budget_file=BUDGET_FILE, today=None):
+        self.limit = limit
+        self.budget_file = budget_file
+        # Injectable for simulations
+        self._today = today or (lambda: datetime.now().date().isoformat())
+        self._lock = threading.Lock()
+        self._date = self._today()
+        self._spent = 0
+        self.load()
+    
+    def try_spend(self, calls=1):
+        """Take ``calls`` from today's budget if that many are left"""
+        with self._lock:
+            self._roll_over()
+            if self._spent + calls > self.limit:
+                return False
+            self._spent += calls
+        self.save()
+        return True
+    
+    def remaining(self):
+        with self._lock:
+            self._roll_over()
+            return self.limit - self._spent
+    
+    def _roll_over(self):
+        today = self._today()
+        if today != self._date:
+            self._date = today
+            self._spent = 0
+    
+    def load(self):
+        """Load today's spend from disk"""
+        if not self.budget_file or not os.path.exists(self.budget_file):
+            return
+        try:
+            with open(self.budget_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            with self._lock:
+                if saved.get('date') == self._date:
+                    self._spent = int(saved.get('spent', 0))
+        except Exception as e:
+            print(f"Error loading prefetch budget: {e}")
+    
+    def save(self):
+        """Write today's spend to disk"""
+        if not self.budget_file:
+            return
+        with self._lock:
+            saved = {'date': self._date, 'spent': self._spent}
+        try:
+            temp_file = self.budget_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(saved, f)
+            os.replace(temp_file, self.budget_file)
+        except Exception as e:
+            print(f"Error saving prefetch budget: {e}")
+
+
+class BudgetedClient:
+    """Wraps a maps client so each outbound call is charged to a ``PrefetchBudget``"""
+    
+    def __init__(self, client, budget):
+        self._client = client
+        self._budget = budget
+    
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        
+        def call(*args, **kwargs):
+            if not self._budget.try_spend():
+                raise PrefetchBudgetExceeded("Daily prefetch budget used up")
+            return attr(*args, **kwargs)
+        return call
+
+
+class CommutePrefetcher:
+    """Warm the directions cache shortly before the user's habitual trips.
+
+    Patterns are mined from the journey history. A few minutes before the
+    usual start, each departure bucket the habit's start times fall in is
+    fetched once per day through ``fetch_directions`` with the geocoding a
+    Get Directions click would use, so that click, or one from the history
+    list, is answered from the cache. Every API call is charged to a daily
+    ``PrefetchBudget``, strongest habits first.
+    """
+    
+    def __init__(self, cache, geocode_cache=None, budget=None, lead_minutes=PREFETCH_LEAD_MINUTES,
+                 grace_minutes=PREFETCH_GRACE_MINUTES):
+        self.cache = cache
+        self.geocode_cache = geocode_cache
+        self.budget = budget if budget is not None else PrefetchBudget()
+        self.lead = timedelta(minutes=lead_minutes)
+        self.grace = timedelta(minutes=grace_minutes)
+        self.patterns = []
+        self._lock = threading.Lock()
+        # (pattern, minute, date) already warmed or given up on
+        self._done = set()
+    
+    def set_journeys(self, journeys, now=None):
+        """Re-mine patterns, e.g. after sign-in or a new saved journey"""
+        patterns = mine_commute_patterns(journeys, now)
+        with self._lock:
+            self.patterns = patterns
+    
+    def clear(self):
+        with self._lock:
+            self.patterns = []
+            self._done.clear()
+    
+    def due(self, now=None):
+        """``(pattern, departure_time)`` pairs to warm now, strongest habit first.
+
+        Each is returned once per day, so overlapping checks never fetch it twice.
+        """
+        now = now or datetime.now()
+        due = []
+        with self._lock:
+            for pattern in self.patterns:
+                if pattern.weekday != now.weekday():
+                    continue
+                for minute in warm_slots(pattern):
+                    if (pattern, minute, now.date()) in self._done:
+                        continue
+                    usual = now.replace(hour=pattern.hour, minute=0, second=0, microsecond=0) + timedelta(minutes=minute)
+                    if usual - self.lead <= now <= usual + self.grace:
+                        # The API only predicts traffic for future departures
+                        due.append((pattern, max(usual, now)))
+                        self._done.add((pattern, minute, now.date()))
+        return due
+    
+    def prefetch(self, pattern, departure_time, client, cancel_event=None):
+        """Warm one commute; returns the API calls it cost.
+
+        Raises ``PrefetchBudgetExceeded`` when today's budget runs out.
+        """
+        if cancel_event is not None and cancel_event.is_set():
+            return 0
+        
+        before = self.budget.remaining()
+        client = BudgetedClient(client, self.budget)
+        origin, destination = pattern.origin, pattern.destination
+        if self.geocode_cache is not None:
+            origin = self.geocode_cache.query_for(pattern.origin, client)
+            destination = self.geocode_cache.query_for(pattern.destination, client)
+        fetch_directions(client, origin, destination, pattern.mode, departure_time, cache=self.cache)
+        return before - self.budget.remaining()
+    
+    def run_due(self, client, now=None, cancel_event=None):
+        """Warm every due commute; returns ``(warmed, calls)``"""
+        warmed = calls = 0
+        for pattern, departure_time in self.due(now):
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            if self.budget.remaining() <= 0:
+                break
+            try:
+                calls += self.prefetch(pattern, departure_time, client, cancel_event)
+                warmed += 1
+            except PrefetchBudgetExceeded:
+                break
+            except Exception as e:
+                print(f"Prefetch of {pattern.origin} → {pattern.destination} failed: {e}")
+        return warmed, calls
+
+
+def synthetic_history(weeks=PATTERN_WEEKS, seed=5, start=None):
+    """Journeys of a commuter with two weekday habits plus one-off trips"""
+    import random
+    
+    rng = random.Random(seed)
+    start = start or datetime(2025, 3, 3)
+    journeys = []
+    
+    def add(when, origin, destination, mode='driving'):
+        journeys.append({'timestamp': when.isoformat(),
+                         'data': {'origin': origin, 'destination': destination, 'mode': mode}})
+    
+    for day in range(weeks * 7):
+        date = start + timedelta(days=day)
+        if date.weekday() < 5 and rng.random() < 0.9:
+            add(date.replace(hour=8, minute=30) + timedelta(minutes=rng.randint(-4, 6)),
+                "Malviya Nagar, Jaipur", "World Trade Park, Jaipur")
+        if date.weekday() < 5 and rng.random() < 0.8:
+            add(date.replace(hour=18, minute=5) + timedelta(minutes=rng.randint(-3, 8)),
+                "World Trade Park, Jaipur", "Malviya Nagar, Jaipur")
+        for _ in range(rng.randint(0, 2)):
+            add(date.replace(hour=rng.randint(7, 22), minute=rng.randint(0, 59)),
+                rng.choice(["Hawa Mahal, Jaipur", "C Scheme, Jaipur", "Amer Fort, Jaipur"]),
+                rng.choice(["Jaipur Airport, Jaipur", "Raja Park, Jaipur", "Sindhi Camp, Jaipur"]))
+    return journeys
+
+
+def benchmark(days=14, daily_budget=6, latency=0.1):
+    """Replay two weeks of commutes against the fake server, with and without prefetching"""
+    from Fake_maps_server import FakeMapsServer, FakeMapsClient
+    from Directions_service import DirectionsCache
+    from Geocode_cache import GeocodeCache
+    import random
+    import tempfile
+    
+    history = synthetic_history()
+    now = journey_time(history[-1]['timestamp']) + timedelta(hours=1)
+    started = time.perf_counter()
+    for _ in range(100):
+        patterns = mine_commute_patterns(history, now)
+    print(f"mined {len(patterns)} patterns from {len(history)} journeys in "
+          f"{(time.perf_counter() - started) * 10:.2f} ms")
+    for pattern in patterns[:4]:
+        print(f"  {'MTWTFSS'[pattern.weekday]} {pattern.hour:02d}:{pattern.minute:02d} {pattern.origin} → "
+              f"{pattern.destination} ({pattern.occurrences} days)")
+    
+    rng = random.Random(11)
+    # The user's actual trips over the following days
+    trips = []
+    for day in range(1, days + 1):
+        date = (now + timedelta(days=day)).replace(hour=0, minute=0, second=0, microsecond=0)
+        if date.weekday() < 5:
+            trips.append((date.replace(hour=8, minute=30) + timedelta(minutes=rng.randint(-4, 6)),
+                          "Malviya Nagar, Jaipur", "World Trade Park, Jaipur"))
+            trips.append((date.replace(hour=18, minute=5) + timedelta(minutes=rng.randint(-3, 8)),
+                          "World Trade Park, Jaipur", "Malviya Nagar, Jaipur"))
+        trips.append((date.replace(hour=rng.randint(9, 20), minute=rng.randint(0, 59)),
+                      "Hawa Mahal, Jaipur", "Jaipur Airport, Jaipur"))
+    
+    with FakeMapsServer(latency=latency) as server, tempfile.TemporaryDirectory() as folder:
+        client = FakeMapsClient(server.url)
+        for prefetching in (False, True):
+            cache = DirectionsCache(os.path.join(folder, f'cache_{prefetching}.json'), traffic_ttl=10 ** 9)
+            geocode_cache = GeocodeCache(os.path.join(folder, f'geocode_{prefetching}.json'))
+            clock = {'now': now}
+            budget = PrefetchBudget(daily_budget, None, today=lambda: clock['now'].date().isoformat())
+            prefetcher = CommutePrefetcher(cache, geocode_cache, budget)
+            prefetcher.set_journeys(history, now)
+            hits = prefetch_calls = 0
+            waits = []
+            for departure, origin, destination in trips:
+                if prefetching:
+                    # The app checks once a minute; replay the checks leading up to the trip
+                    for minutes_before in range(PREFETCH_LEAD_MINUTES + 1, -1, -1):
+                        clock['now'] = departure - timedelta(minutes=minutes_before)
+                        prefetch_calls += prefetcher.run_due(client, clock['now'])[1]
+                clock['now'] = departure
+                requests_before = server.request_count
+                started = time.perf_counter()
+                fetch_directions(client, geocode_cache.query_for(origin, client),
+                                 geocode_cache.query_for(destination, client), 'driving', departure, cache=cache)
+                waits.append(time.perf_counter() - started)
+                hits += server.request_count == requests_before
+            waits.sort()
+            print(f"{'prefetch' if prefetching else 'no prefetch':11s} {hits}/{len(trips)} trips answered from cache, "
+                  f"median wait {waits[len(waits) // 2] * 1000:6.1f} ms, prefetch calls {prefetch_calls} "
+                  f"(budget {daily_budget}/day)")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Commute_prefetch.py --bench")
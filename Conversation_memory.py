@@ -0,0 +1,170 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import re
+import sys
+import time
+from collections import Counter
+
+from Prompt_context import estimate_tokens
+
+RECENT_TURNS = 6
+MESSAGE_TOKEN_CAP = 300
+SUMMARY_TOKEN_BUDGET = 400
+# Older sentences lose a little weight with every turn folded after them
+RECENCY_DECAY = 0.97
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+WORD_RE = re.compile(r"[a-z0-9']+")
+STOPWORDS = frozenset("""
+a an the and or but if then so of to in on at by for with from about as into than too very can could would
+should will just is are was were be been being it its this that these those there here i me my we our you
+your he she they them their what which who whom how when where why do does did have has had not no yes
+also some any more most such only own same other all each both few many much get got let like make
+""".split())
+
+
+def split_sentences(text):
+    return [sentence.strip(' -*•') for sentence in SENTENCE_RE.split(text) if sentence.strip(' -*•')]
+
+
+def content_words(text):
+    return [word for word in WORD_RE.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+
+def compress_message(line, token_cap=MESSAGE_TOKEN_CAP):
+    """Shorten a long chat line to its most informative sentences, in their original order"""
+    if estimate_tokens(line) <= token_cap:
+        return line
+    speaker, _, text = line.partition(':')
+    sentences = split_sentences(text)
+    frequencies = Counter(content_words(text))
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda i: _sentence_score(content_words(sentences[i]), frequencies) + (1.0 if i == 0 else 0.0),
+        reverse=True
+    )
+    remaining = token_cap - estimate_tokens(speaker) - 1
+    kept = []
+    for i in ranked:
+        tokens = estimate_tokens(sentences[i]) + 1
+        if tokens <= remaining:
+            kept.append(i)
+            remaining -= tokens
+    if not kept:
+        return line[:token_cap * 4]
+    return f"{speaker}: " + ' '.join(sentences[i] for i in sorted(kept))
+
+
+def _sentence_score(words, frequencies):
+    if not words:
+        return 0.0
+    # Favour sentences made of words the conversation keeps coming back to
+    return sum(frequencies[word] for word in set(words)) / len(words) ** 0.5
+
+
+class ConversationMemory:
+    """Recent chat turns kept verbatim, older turns folded into a rolling summary.
+
+    The summary is extractive: sentences from folded turns are scored by how
+    often their words occur across the conversation, discounted by age, and
+    the best ones that fit ``summary_token_budget`` are kept in order. Each
+    fold only rescores the sentences already in the summary plus the new
+    ones, so the cost per turn stays flat over long sessions.
+    """
+    
+    def __init__(self, recent_turns=RECENT_TURNS, summary_token_budget=SUMMARY_TOKEN_BUDGET,
+                 message_token_cap=MESSAGE_TOKEN_CAP):
+        self.recent_turns = recent_turns
+        self.summary_token_budget = summary_token_budget
+        self.message_token_cap = message_token_cap
+        self.recent = []
+        self._frequencies = Counter()
+        # (sequence, speaker, sentence, words, tokens) currently in the summary
+        self._sentences = []
+        self._sequence = 0
+        self._summary = ''
+    
+    def add(self, line):
+        """Record one ``"User: ..."`` or ``" AI: ..."`` line"""
+        self.recent.append(compress_message(line, self.message_token_cap))
+        folded = []
+        while len(self.recent) > self.recent_turns:
+            folded.append(self.recent.pop(0))
+        if folded:
+            self._fold(folded)
+    
+    def pop(self):
+        """Forget the newest line, e.g. a question that could not be sent"""
+        if self.recent:
+            self.recent.pop()
+    
+    def summary(self):
+        return self._summary
+    
+    def clear(self):
+        self.recent = []
+        self._frequencies.clear()
+        self._sentences = []
+        self._sequence = 0
+        self._summary = ''
+    
+    def _fold(self, lines):
+        # Keyed by speaker and sentence so a repeated sentence is kept once, at its latest position
+        candidates = {(candidate[1], candidate[2].lower()): candidate for candidate in self._sentences}
+        for line in lines:
+            speaker, _, text = line.partition(':')
+            speaker = speaker.strip() or 'User'
+            for sentence in split_sentences(text):
+                words = content_words(sentence)
+                if not words:
+                    continue
+                self._sequence += 1
+                self._frequencies.update(set(words))
+                candidates[(speaker, sentence.lower())] = (
+                    self._sequence, speaker, sentence, words, estimate_tokens(sentence) + 2
+                )
+        
+        def score(candidate):
+            sequence, speaker, _, words, _ = candidate
+            value = _sentence_score(words, self._frequencies) * RECENCY_DECAY ** (self._sequence - sequence)
+            # Questions say what the user cares about, so they outrank answers of equal weight
+            return value * 1.5 if speaker == 'User' else value
+        
+        remaining = self.summary_token_budget
+        kept = []
+        for candidate in sorted(candidates.values(), key=score, reverse=True):
+            if candidate[4] <= remaining:
+                kept.append(candidate)
+                remaining -= candidate[4]
+        kept.sort(key=lambda candidate: candidate[0])
+        self._sentences = kept
+        self._summary = '\n'.join(f"- {speaker}: {sentence}" for _, speaker, sentence, _, _ in kept)
+
+
+def benchmark(turns=1000):
+    """Show that prompt size and assembly time stay flat as a chat grows"""
+    from Prompt_context import ContextBuilder
+    
+    builder = ContextBuilder()
+    memory = ConversationMemory()
+    answer = ("The fastest way from Malviya Nagar to the airport at 9am is via JLN Marg. "
+              "Traffic near the Jawahar Circle usually adds ten minutes. "
+              "Leaving before 8:30 avoids most of the rush. ") * 6
+    started = time.perf_counter()
+    for turn in range(1, turns + 1):
+        memory.add(f"User: How is traffic to the airport on day {turn}?")
+        memory.add(f" AI: {answer}")
+        if turn in (1, 10, 100, turns):
+            build_started = time.perf_counter()
+            prompt = builder.build("And tomorrow?", memory.recent, summary=memory.summary())
+            build_ms = (time.perf_counter() - build_started) * 1000
+            print(f"turn {turn:5d}: ~{estimate_tokens(prompt)} prompt tokens, built in {build_ms:.3f} ms")
+    print(f"{turns} turns folded in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Conversation_memory.py --bench")
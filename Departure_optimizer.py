@@ -0,0 +1,215 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from statistics import median
+
+from Directions_service import fetch_directions, parse_directions, DEPARTURE_BUCKET_MINUTES
+
+DEFAULT_STEP_MINUTES = 15
+DEFAULT_CONCURRENCY = 4
+# Slots whose past trips ran this much slower than the best slot are not queried
+PRUNE_MARGIN = 0.15
+# Past trips within this many minutes of a slot's time of day count towards it
+HISTORY_TOLERANCE_MINUTES = 30
+MIN_HISTORY_OBSERVATIONS = 3
+# Only these modes give different answers for different departure times
+TIME_DEPENDENT_MODES = ('driving', 'transit')
+
+# ``source`` is 'live' for an API (or cached) estimate and 'history' for a pruned slot
+DepartureSlot = namedtuple('DepartureSlot', ['departure_time', 'duration_s', 'source'])
+DepartureResult = namedtuple('DepartureResult', ['best', 'curve', 'directions_data', 'queried', 'pruned', 'errors'])
+
+
+def candidate_slots(window_start, window_end, step_minutes=DEFAULT_STEP_MINUTES):
+    """Departure times from ``window_start`` to ``window_end`` inclusive"""
+    step = timedelta(minutes=step_minutes)
+    slots = []
+    slot = window_start
+    while slot <= window_end:
+        slots.append(slot)
+        slot += step
+    return slots
+
+
+def history_estimate(observations, slot, tolerance_minutes=HISTORY_TOLERANCE_MINUTES,
+                     min_observations=MIN_HISTORY_OBSERVATIONS):
+    """Median past duration for trips started near ``slot``'s time of day on the same kind of day, or None"""
+    slot_minutes = slot.hour * 60 + slot.minute
+    weekend = slot.weekday() >= 5
+    durations = []
+    for departed, seconds in observations:
+        if (departed.weekday() >= 5) != weekend:
+            continue
+        gap = abs(departed.hour * 60 + departed.minute - slot_minutes)
+        if min(gap, 1440 - gap) <= tolerance_minutes:
+            durations.append(seconds)
+    if len(durations) < min_observations:
+        return None
+    return round(median(durations))
+
+
+def prune_slots(slots, observations, margin=PRUNE_MARGIN):
+    """Split ``slots`` into those worth querying and ``{slot: estimate}`` for those history rules out"""
+    estimates = {slot: history_estimate(observations, slot) for slot in slots} if observations else {}
+    known = [estimate for estimate in estimates.values() if estimate is not None]
+    if not known:
+        return list(slots), {}
+    limit = min(known) * (1 + margin)
+    to_query = [slot for slot in slots if estimates[slot] is None or estimates[slot] <= limit]
+    pruned = {slot: estimates[slot] for slot in slots if estimates[slot] is not None and estimates[slot] > limit}
+    return to_query, pruned
+
+
+def leg_duration(directions_result):
+    """Trip seconds from a raw Directions result, with traffic when the API gave it"""
+    leg = directions_result[0]['legs'][0]
+    return (leg.get('duration_in_traffic') or leg['duration'])['value']
+
+
+class DepartureOptimizer:
+    """Find the departure time with the shortest predicted trip in a window.
+
+    Candidate slots are swept at ``step_minutes``; the user's past trips on
+    the route rule out slots that were clearly slow before any request is
+    made, and the rest are fetched concurrently, paced by the client's
+    ``ApiGateway``, through the directions cache, so re-running a search
+    mostly costs nothing.
+    """
+    
+    def __init__(self, client, cache=None, concurrency=DEFAULT_CONCURRENCY):
+        self.client = client
+        self.cache = cache
+        self.concurrency = concurrency
+    
+    def optimize(self, origin, destination, mode, window_start, window_end, step_minutes=DEFAULT_STEP_MINUTES,
+                 observations=(), cancel_event=None, on_slot=None, now=None):
+        """Sweep the window and return a ``DepartureResult``.
+
+        ``observations`` are ``(departure datetime, seconds)`` pairs from the
+        journey store. ``on_slot(slot)`` is called from worker threads as
+        each live estimate arrives.
+        """
+        cancel_event = cancel_event or threading.Event()
+        # The API only predicts traffic for future departures
+        window_start = max(window_start, now or datetime.now())
+        if mode in TIME_DEPENDENT_MODES:
+            # Finer steps would land in the same cache bucket and return the same estimate
+            slots = candidate_slots(window_start, window_end, max(step_minutes, DEPARTURE_BUCKET_MINUTES))
+        else:
+            slots = [window_start]
+        if not slots:
+            raise ValueError("The departure window has already passed")
+        
+        to_query, pruned = prune_slots(slots, observations)
+        live = {}
+        results = {}
+        errors = []
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='departure-slot') as pool:
+            futures = {
+                pool.submit(self._fetch_slot, origin, destination, mode, slot, cancel_event): slot
+                for slot in to_query
+            }
+            for future in as_completed(futures):
+                slot = futures[future]
+                if cancel_event.is_set():
+                    continue
+                try:
+                    directions_result = future.result()
+                    if not directions_result:
+                        raise RuntimeError("No route found between the specified locations")
+                    live[slot] = leg_duration(directions_result)
+                except Exception as e:
+                    errors.append(f"{slot:%H:%M}: {e}")
+                    continue
+                results[slot] = directions_result
+                if on_slot:
+                    on_slot(DepartureSlot(slot, live[slot], 'live'))
+        
+        if cancel_event.is_set():
+            raise RuntimeError("Cancelled")
+        if not live:
+            raise RuntimeError(errors[0] if errors else "No departure slots could be estimated")
+        
+        curve = sorted(
+            [DepartureSlot(slot, seconds, 'live') for slot, seconds in live.items()] +
+            [DepartureSlot(slot, seconds, 'history') for slot, seconds in pruned.items()]
+        )
+        # Earliest of equally fast slots, so nobody is told to wait for nothing
+        best_time = min(live, key=lambda slot: (live[slot], slot))
+        best = DepartureSlot(best_time, live[best_time], 'live')
+        directions_data = parse_directions(results[best_time], origin, destination, mode)
+        return DepartureResult(best, curve, directions_data, len(to_query), len(pruned), errors)
+    
+    def _fetch_slot(self, origin, destination, mode, slot, cancel_event):
+        if cancel_event.is_set():
+            raise RuntimeError("Cancelled")
+        return fetch_directions(self.client, origin, destination, mode, slot, cache=self.cache)
+
+
+def benchmark(window_hours=6, step_minutes=15, concurrency=8, queries_per_second=50, latency=0.05):
+    """Sweep a window against the local fake server: sequential, concurrent, cached and history-pruned"""
+    from Fake_maps_server import FakeMapsServer, FakeMapsClient, fake_leg, traffic_factor
+    from Directions_service import DirectionsCache
+    from Api_gateway import ApiGateway
+    import os
+    import tempfile
+    
+    origin, destination = "Malviya Nagar, Jaipur", "Jaipur Airport, Jaipur"
+    # Next Monday 07:30, so the window spans the morning peak
+    today = datetime.now().replace(hour=7, minute=30, second=0, microsecond=0)
+    window_start = today + timedelta(days=7 - today.weekday())
+    window_end = window_start + timedelta(hours=window_hours)
+    
+    # Past Monday trips on the route, as the journey store would return them
+    base = fake_leg(origin, destination)['duration']['value']
+    observations = []
+    for week in range(1, 5):
+        for minutes in range(0, window_hours * 60, 20):
+            departed = window_start - timedelta(weeks=week, minutes=-minutes)
+            observations.append((departed, int(base * traffic_factor(departed))))
+    
+    with FakeMapsServer(latency=latency) as server, tempfile.TemporaryDirectory() as folder:
+        gateway = ApiGateway()
+        gateway.configure('maps', queries_per_second=queries_per_second, burst=queries_per_second)
+        client = gateway.wrap(FakeMapsClient(server.url), 'maps')
+        cache = DirectionsCache(os.path.join(folder, 'bench_cache.json'))
+        runs = [
+            ("sequential", 1, None, ()),
+            (f"concurrency={concurrency}", concurrency, None, ()),
+            ("cached re-run", concurrency, cache, ()),
+            ("history-pruned", concurrency, None, observations),
+        ]
+        # Warm the cache for the re-run
+        DepartureOptimizer(client, cache, concurrency).optimize(
+            origin, destination, 'driving', window_start, window_end, step_minutes)
+        
+        for name, workers, run_cache, run_observations in runs:
+            optimizer = DepartureOptimizer(client, run_cache, workers)
+            requests_before = server.request_count
+            started = time.perf_counter()
+            result = optimizer.optimize(origin, destination, 'driving', window_start, window_end,
+                                        step_minutes, observations=run_observations)
+            elapsed = time.perf_counter() - started
+            print(f"{name:16s} {elapsed * 1000:7.1f} ms  {server.request_count - requests_before:3d} API requests  "
+                  f"{result.pruned:2d} pruned  best {result.best.departure_time:%H:%M} "
+                  f"({result.best.duration_s // 60} min)")
+    
+    print("\ncurve:")
+    longest = max(slot.duration_s for slot in result.curve)
+    for slot in result.curve:
+        bar = '█' * round(30 * slot.duration_s / longest)
+        print(f"  {slot.departure_time:%H:%M}  {slot.duration_s // 60:3d} min  {bar}{' (history)' if slot.source == 'history' else ''}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Departure_optimizer.py --bench")
@@ -0,0 +1,310 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import os
+import re
+import json
+import time
+import copy
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+# Route geometry and steps rarely change; live traffic goes stale quickly
+STATIC_TTL = 7 * 24 * 3600
+TRAFFIC_TTL = 5 * 60
+DEPARTURE_BUCKET_MINUTES = 15
+
+HTML_TAG_RE = re.compile('<.*?>')
+
+
+def clean_html_tags(text):
+    """Remove HTML tags from text"""
+    if not text:
+        return ""
+    return re.sub(HTML_TAG_RE, '', text)
+
+
+def normalize_place(text):
+    """Normalize a free-text place so trivially different spellings share a key"""
+    text = (text or '').lower()
+    text = re.sub(r'\s*,\s*', ', ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip(' ,.')
+
+
+def departure_bucket(departure_time, mode, bucket_minutes=DEPARTURE_BUCKET_MINUTES):
+    """Round a departure time down to the bucket used in cache keys"""
+    # Walking and cycling times do not depend on when you leave
+    if mode not in ('driving', 'transit'):
+        return None
+    departure_time = departure_time or datetime.now()
+    minutes = departure_time.hour * 60 + departure_time.minute
+    minutes -= minutes % bucket_minutes
+    return f"{departure_time:%Y-%m-%d}T{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def make_cache_key(origin, destination, mode, departure_time, alternatives=False):
+    """Build the cache key for a directions request"""
+    parts = [
+        normalize_place(origin),
+        normalize_place(destination),
+        mode,
+        departure_bucket(departure_time, mode) or '-'
+    ]
+    if alternatives:
+        parts.append('alternatives')
+    return '|'.join(parts)
+
+
+def parse_directions(directions_result, origin, destination, mode, route_index=0):
+    """Turn one route of a raw Directions API result into the app's directions_data dict"""
+    route = directions_result[route_index]
+    leg = route['legs'][0]
+    
+    directions_data = {
+        'origin': leg.get('start_address', origin),
+        'destination': leg.get('end_address', destination),
+        'mode': mode,
+        'duration': leg.get('duration', {}).get('text', 'Unknown'),
+        'distance': leg.get('distance', {}).get('text', 'Unknown'),
+        'duration_in_traffic': leg.get('duration_in_traffic', {}).get('text', 'N/A'),
+        # Seconds and meters, for arithmetic on saved journeys
+        'duration_value': leg.get('duration', {}).get('value'),
+        'distance_value': leg.get('distance', {}).get('value'),
+        'duration_in_traffic_value': leg.get('duration_in_traffic', {}).get('value'),
+        'steps': []
+    }
+    
+    # Process steps with HTML tag removal
+    for i, step in enumerate(leg.get('steps', []), 1):
+        directions_data['steps'].append({
+            'step': i,
+            'instruction': clean_html_tags(step.get('html_instructions', '')),
+            'distance': step.get('distance', {}).get('text', 'Unknown'),
+            'duration': step.get('duration', {}).get('text', 'Unknown'),
+            'duration_value': step.get('duration', {}).get('value'),
+            'distance_value': step.get('distance', {}).get('value')
+        })
+    
+    return directions_data
+
+
+class DirectionsCache:
+    """LRU cache of raw Directions API results, persisted to a JSON file.
+
+    Each entry records when its route and its traffic estimate were fetched,
+    so a driving route can be reused for a week while its
+    ``duration_in_traffic`` is refreshed every few minutes.
+    """
+    
+    def __init__(self, cache_file='directions_cache.json', max_entries=500,
+                 static_ttl=STATIC_TTL, traffic_ttl=TRAFFIC_TTL, save_every=10):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.static_ttl = static_ttl
+        self.traffic_ttl = traffic_ttl
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._unsaved = 0
+        self.load()
+    
+    def get(self, key, now=None):
+        """Return ``(result, state)`` where state is 'fresh', 'traffic_stale' or 'miss'"""
+        now = now or time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry['fetched_at'] > self.static_ttl:
+                self.misses += 1
+                return None, 'miss'
+            
+            self._entries.move_to_end(key)
+            if entry['has_traffic'] and now - entry['traffic_at'] > self.traffic_ttl:
+                self.misses += 1
+                return copy.deepcopy(entry['result']), 'traffic_stale'
+            
+            self.hits += 1
+            return copy.deepcopy(entry['result']), 'fresh'
+    
+    def put(self, key, result, now=None):
+        """Store a freshly fetched result"""
+        now = now or time.time()
+        has_traffic = any('duration_in_traffic' in leg for route in result for leg in route.get('legs', []))
+        with self._lock:
+            self._entries[key] = {
+                'result': result,
+                'fetched_at': now,
+                'traffic_at': now,
+                'has_traffic': has_traffic
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._unsaved += 1
+            should_save = self._unsaved >= self.save_every
+        
+        if should_save:
+            self.save()
+    
+    def update_traffic(self, key, durations_in_traffic, now=None):
+        """Patch refreshed ``duration_in_traffic`` values into a cached route"""
+        now = now or time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            legs = entry['result'][0]['legs']
+            for leg, duration_in_traffic in zip(legs, durations_in_traffic):
+                leg['duration_in_traffic'] = duration_in_traffic
+            entry['traffic_at'] = now
+            self._unsaved += 1
+            return copy.deepcopy(entry['result'])
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._unsaved += 1
+    
+    def load(self):
+        """Load cached entries from disk"""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            with self._lock:
+                self._entries = OrderedDict(entries)
+        except Exception as e:
+            print(f"Error loading directions cache: {e}")
+    
+    def save(self):
+        """Write cached entries to disk"""
+        with self._lock:
+            entries = list(self._entries.items())
+            self._unsaved = 0
+        try:
+            temp_file = self.cache_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(OrderedDict(entries), f, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            print(f"Error saving directions cache: {e}")
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+class StubDirectionsClient:
+    """Offline stand-in for ``googlemaps.Client`` that replays canned results"""
+    
+    def __init__(self, results=None, default=None):
+        self.results = results or {}
+        self.default = default
+        self.calls = []
+    
+    def directions(self, origin, destination, **kwargs):
+        self.calls.append(('directions', origin, destination, kwargs))
+        result = self.results.get((origin, destination), self.default)
+        return copy.deepcopy(result) if result is not None else []
+    
+    def distance_matrix(self, origins, destinations, **kwargs):
+        self.calls.append(('distance_matrix', origins, destinations, kwargs))
+        rows = []
+        for origin in origins:
+            elements = []
+            for destination in destinations:
+                result = self.results.get((origin, destination), self.default)
+                if not result:
+                    elements.append({'status': 'NOT_FOUND'})
+                    continue
+                leg = result[0]['legs'][0]
+                element = {'status': 'OK', 'duration': leg.get('duration'), 'distance': leg.get('distance')}
+                if 'duration_in_traffic' in leg:
+                    element['duration_in_traffic'] = leg['duration_in_traffic']
+                elements.append(element)
+            rows.append({'elements': elements})
+        return {'status': 'OK', 'rows': rows}
+
+
+def _cached_directions(cache, key, client, alternatives):
+    """``(result, refresh_traffic)``: a fresh cached route, else whether a matrix call can refresh a stale one"""
+    if cache is None:
+        return None, False
+    result, state = cache.get(key)
+    if state == 'fresh':
+        return result, False
+    # Only the live estimate is stale: refresh it with a one-element matrix call.
+    # A matrix element only describes the primary route, so alternatives are refetched.
+    return None, state == 'traffic_stale' and not alternatives and hasattr(client, 'distance_matrix')
+
+
+def _traffic_refresh_options(mode, departure_time):
+    return {'mode': mode, 'departure_time': departure_time, 'traffic_model': 'best_guess'}
+
+
+def _refreshed_directions(cache, key, matrix):
+    """The cached route with the matrix's live estimate patched in, or None if it has none"""
+    element = matrix['rows'][0]['elements'][0]
+    if element.get('status') == 'OK' and 'duration_in_traffic' in element:
+        return cache.update_traffic(key, [element['duration_in_traffic']])
+    return None
+
+
+def _directions_options(mode, departure_time, alternatives):
+    return {
+        'mode': mode,
+        'departure_time': departure_time,
+        'traffic_model': 'best_guess' if mode == 'driving' else None,
+        'alternatives': alternatives
+    }
+
+
+def fetch_directions(client, origin, destination, mode, departure_time, cache=None, alternatives=False):
+    """Fetch raw directions, serving from ``cache`` when possible"""
+    key = make_cache_key(origin, destination, mode, departure_time, alternatives)
+    result, refresh_traffic = _cached_directions(cache, key, client, alternatives)
+    if result is not None:
+        return result
+    if refresh_traffic:
+        try:
+            matrix = client.distance_matrix([origin], [destination], **_traffic_refresh_options(mode, departure_time))
+            result = _refreshed_directions(cache, key, matrix)
+            if result is not None:
+                return result
+        except Exception as e:
+            print(f"Traffic refresh failed, fetching full directions: {e}")
+    
+    directions_result = client.directions(origin, destination,
+                                          **_directions_options(mode, departure_time, alternatives))
+    if directions_result and cache is not None:
+        cache.put(key, directions_result)
+    return directions_result
+
+
+async def fetch_directions_async(client, origin, destination, mode, departure_time, cache=None, alternatives=False):
+    """``fetch_directions`` for an async client such as ``Async_core.AsyncMapsClient``"""
+    key = make_cache_key(origin, destination, mode, departure_time, alternatives)
+    result, refresh_traffic = _cached_directions(cache, key, client, alternatives)
+    if result is not None:
+        return result
+    if refresh_traffic:
+        try:
+            matrix = await client.distance_matrix([origin], [destination],
+                                                  **_traffic_refresh_options(mode, departure_time))
+            result = _refreshed_directions(cache, key, matrix)
+            if result is not None:
+                return result
+        except Exception as e:
+            print(f"Traffic refresh failed, fetching full directions: {e}")
+    
+    directions_result = await client.directions(origin, destination,
+                                                **_directions_options(mode, departure_time, alternatives))
+    if directions_result and cache is not None:
+        # ``put`` writes the cache file every ``save_every`` routes; keep that off the loop
+        await asyncio.to_thread(cache.put, key, directions_result)
+    return directions_result
@@ -0,0 +1,256 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from Directions_service import normalize_place, departure_bucket, STATIC_TTL, TRAFFIC_TTL
+
+# Distance Matrix API limits for a single request
+MAX_ORIGINS_PER_REQUEST = 25
+MAX_DESTINATIONS_PER_REQUEST = 25
+MAX_ELEMENTS_PER_REQUEST = 100
+
+DEFAULT_CONCURRENCY = 4
+
+
+class MatrixResult:
+    """Travel-time table: arrays are indexed [origin, destination], NaN where no route"""
+    
+    def __init__(self, origins, destinations, mode, durations, distances, durations_in_traffic):
+        self.origins = origins
+        self.destinations = destinations
+        self.mode = mode
+        self.durations = durations
+        self.distances = distances
+        self.durations_in_traffic = durations_in_traffic
+    
+    def best_durations(self):
+        """Traffic-aware durations where available, plain durations elsewhere"""
+        return np.where(np.isnan(self.durations_in_traffic), self.durations, self.durations_in_traffic)
+
+
+class MatrixCellCache:
+    """LRU cache of single (origin, destination) matrix cells"""
+    
+    def __init__(self, max_entries=20000, static_ttl=STATIC_TTL, traffic_ttl=TRAFFIC_TTL):
+        self.max_entries = max_entries
+        self.static_ttl = static_ttl
+        self.traffic_ttl = traffic_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._cells = OrderedDict()
+    
+    @staticmethod
+    def make_key(origin, destination, mode, departure_time):
+        return (normalize_place(origin), normalize_place(destination), mode, departure_bucket(departure_time, mode))
+    
+    def get(self, key, now=None):
+        now = now or time.time()
+        with self._lock:
+            cell = self._cells.get(key)
+            if cell is not None:
+                # A traffic estimate ages out much faster than the route itself
+                ttl = self.traffic_ttl if cell[2] is not None else self.static_ttl
+                if now - cell[3] <= ttl:
+                    self._cells.move_to_end(key)
+                    self.hits += 1
+                    return cell[:3]
+            self.misses += 1
+            return None
+    
+    def put(self, key, duration, distance, duration_in_traffic, now=None):
+        now = now or time.time()
+        with self._lock:
+            self._cells[key] = (duration, distance, duration_in_traffic, now)
+            self._cells.move_to_end(key)
+            while len(self._cells) > self.max_entries:
+                self._cells.popitem(last=False)
+    
+    def __len__(self):
+        return len(self._cells)
+
+
+def chunk_shape(origin_count, destination_count):
+    """Largest (origins, destinations) block that fits one request"""
+    destinations = min(destination_count, MAX_DESTINATIONS_PER_REQUEST, MAX_ELEMENTS_PER_REQUEST)
+    origins = min(origin_count, MAX_ORIGINS_PER_REQUEST, max(1, MAX_ELEMENTS_PER_REQUEST // destinations))
+    return origins, destinations
+
+
+def plan_chunks(origin_indices, destination_indices):
+    """Split the index lists into request-sized (origins, destinations) blocks"""
+    if not origin_indices or not destination_indices:
+        return []
+    origin_step, destination_step = chunk_shape(len(origin_indices), len(destination_indices))
+    return [
+        (origin_indices[i:i + origin_step], destination_indices[j:j + destination_step])
+        for i in range(0, len(origin_indices), origin_step)
+        for j in range(0, len(destination_indices), destination_step)
+    ]
+
+
+class DistanceMatrixService:
+    """Builds N×M travel-time tables from parallel, cached Distance Matrix calls.
+
+    The calls are paced by the ``ApiGateway`` the client is wrapped in.
+    """
+    
+    def __init__(self, client, cache=None, concurrency=DEFAULT_CONCURRENCY):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy is required for travel-time matrices. Install with: pip install numpy")
+        self.client = client
+        self.cache = cache if cache is not None else MatrixCellCache()
+        self.concurrency = concurrency
+    
+    def build(self, origins, destinations, mode='driving', departure_time=None, cancel_event=None):
+        """Return a MatrixResult for every origin/destination pair"""
+        departure_time = departure_time or datetime.now()
+        result, chunks = self._from_cache(origins, destinations, mode, departure_time)
+        if chunks:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='distance-matrix') as pool:
+                futures = [
+                    pool.submit(self._fetch_chunk, origins, destinations, chunk, mode, departure_time, cancel_event)
+                    for chunk in chunks
+                ]
+                for future in futures:
+                    _fill(result, future.result())
+        return result
+    
+    async def build_async(self, origins, destinations, mode='driving', departure_time=None, cancel_event=None):
+        """``build`` with an ``AsyncMapsClient``: every chunk is in flight at once on the event loop"""
+        departure_time = departure_time or datetime.now()
+        # Normalising every pair for the cache lookups is CPU work; keep it off the loop
+        result, chunks = await asyncio.to_thread(self._from_cache, origins, destinations, mode, departure_time)
+        
+        async def fetch(chunk):
+            if cancel_event is not None and cancel_event.is_set():
+                return []
+            query = self._chunk_query(origins, destinations, chunk, mode, departure_time)
+            response = await self.client.distance_matrix(**query)
+            return self._store_cells(origins, destinations, chunk, mode, departure_time, response)
+        
+        for cells in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+            _fill(result, cells)
+        return result
+    
+    def _from_cache(self, origins, destinations, mode, departure_time):
+        """A MatrixResult filled from the cache, and the request chunks covering its gaps"""
+        shape = (len(origins), len(destinations))
+        result = MatrixResult(list(origins), list(destinations), mode, np.full(shape, np.nan),
+                              np.full(shape, np.nan), np.full(shape, np.nan))
+        
+        # Collect the rows/columns that still have gaps
+        missing_origins, missing_destinations = set(), set()
+        cells = []
+        for i, origin in enumerate(origins):
+            for j, destination in enumerate(destinations):
+                cell = self.cache.get(MatrixCellCache.make_key(origin, destination, mode, departure_time))
+                if cell is None:
+                    missing_origins.add(i)
+                    missing_destinations.add(j)
+                    continue
+                cells.append((i, j) + cell)
+        _fill(result, cells)
+        return result, plan_chunks(sorted(missing_origins), sorted(missing_destinations))
+    
+    def _fetch_chunk(self, origins, destinations, chunk, mode, departure_time, cancel_event):
+        if cancel_event is not None and cancel_event.is_set():
+            return []
+        query = self._chunk_query(origins, destinations, chunk, mode, departure_time)
+        response = self.client.distance_matrix(**query)
+        return self._store_cells(origins, destinations, chunk, mode, departure_time, response)
+    
+    @staticmethod
+    def _chunk_query(origins, destinations, chunk, mode, departure_time):
+        """``distance_matrix`` arguments for one chunk"""
+        origin_indices, destination_indices = chunk
+        return {
+            'origins': [origins[i] for i in origin_indices],
+            'destinations': [destinations[j] for j in destination_indices],
+            'mode': mode,
+            'departure_time': departure_time,
+            'traffic_model': 'best_guess' if mode == 'driving' else None
+        }
+    
+    def _store_cells(self, origins, destinations, chunk, mode, departure_time, response):
+        """Cache the cells of one chunk's response and return them as (i, j, duration, distance, in_traffic)"""
+        origin_indices, destination_indices = chunk
+        cells = []
+        for row, i in zip(response.get('rows', []), origin_indices):
+            for element, j in zip(row.get('elements', []), destination_indices):
+                if element.get('status') != 'OK':
+                    cells.append((i, j, None, None, None))
+                    continue
+                duration = element.get('duration', {}).get('value')
+                distance = element.get('distance', {}).get('value')
+                duration_in_traffic = element.get('duration_in_traffic', {}).get('value')
+                self.cache.put(
+                    MatrixCellCache.make_key(origins[i], destinations[j], mode, departure_time),
+                    duration, distance, duration_in_traffic
+                )
+                cells.append((i, j, duration, distance, duration_in_traffic))
+        return cells
+
+
+def _fill(result, cells):
+    for i, j, duration, distance, duration_in_traffic in cells:
+        result.durations[i, j] = _nan_if_none(duration)
+        result.distances[i, j] = _nan_if_none(distance)
+        result.durations_in_traffic[i, j] = _nan_if_none(duration_in_traffic)
+
+
+def _nan_if_none(value):
+    return np.nan if value is None else value
+
+
+def benchmark(size=50, concurrency=8, latency=0.05):
+    """Time a size×size matrix against the local fake server, cold and warm, then cold on the event loop"""
+    from Fake_maps_server import FakeMapsServer, FakeMapsClient
+    from Async_core import ASYNC_NETWORKING, AsyncHttpClient, AsyncMapsClient
+    from Api_gateway import ApiGateway
+    
+    origins = [f"Origin {i}, Jaipur" for i in range(size)]
+    destinations = [f"Destination {j}, Jaipur" for j in range(size)]
+    
+    def report(label, started, result, server):
+        print(f"{label}: {size}x{size} matrix in {time.perf_counter() - started:.3f}s, "
+              f"{server.request_count} requests so far, {int(np.isnan(result.durations).sum())} gaps")
+    
+    with FakeMapsServer(latency=latency) as server:
+        service = DistanceMatrixService(FakeMapsClient(server.url), concurrency=concurrency)
+        for label in ('cold', 'warm'):
+            started = time.perf_counter()
+            report(label, started, service.build(origins, destinations), server)
+        
+        if ASYNC_NETWORKING:
+            async def build_async():
+                # Unthrottled, like the blocking client above
+                gateway = ApiGateway()
+                gateway.configure('maps', queries_per_second=10 ** 6, burst=10 ** 6)
+                http = AsyncHttpClient()
+                service = DistanceMatrixService(AsyncMapsClient('fake-key', http, server.url, gateway))
+                started = time.perf_counter()
+                report("cold, asyncio", started, await service.build_async(origins, destinations), server)
+                await http.aclose()
+            
+            asyncio.run(build_async())
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Distance_matrix.py --bench")
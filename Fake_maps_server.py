@@ -0,0 +1,358 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+"""Local stand-in for the Google Maps web services and Gemini's REST API, used by the benchmarks"""
+
+import sys
+import json
+import math
+import time
+import zlib
+import threading
+import urllib.parse
+import urllib.request
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def traffic_factor(departure_time):
+    """Congestion multiplier with morning and evening rush-hour peaks"""
+    if departure_time is None:
+        return 1.25
+    if not isinstance(departure_time, datetime):
+        departure_time = datetime.fromtimestamp(int(departure_time))
+    hour = departure_time.hour + departure_time.minute / 60
+    peaks = 0.6 * math.exp(-(hour - 9) ** 2 / 2) + 0.7 * math.exp(-(hour - 18) ** 2 / 2)
+    return 1.05 + (peaks if departure_time.weekday() < 5 else peaks / 3)
+
+
+def fake_leg(origin, destination, mode='driving', with_traffic=True, departure_time=None):
+    """Build a plausible Directions API leg derived from the place names"""
+    # Deterministic pseudo-distance so repeated runs return the same numbers
+    meters = 1000 + (sum(map(ord, origin + destination)) * 37) % 30000
+    speed = {'driving': 8.0, 'transit': 6.0, 'bicycling': 4.0, 'walking': 1.4}.get(mode, 8.0)
+    seconds = int(meters / speed)
+    leg = {
+        'start_address': origin,
+        'end_address': destination,
+        'distance': {'text': f"{meters / 1000:.1f} km", 'value': meters},
+        'duration': {'text': f"{max(1, round(seconds / 60))} mins", 'value': seconds},
+        'steps': [
+            {
+                'html_instructions': f"Head toward <b>{destination}</b>",
+                'distance': {'text': f"{meters / 2000:.1f} km", 'value': meters // 2},
+                'duration': {'text': f"{max(1, round(seconds / 120))} mins", 'value': seconds // 2}
+            },
+            {
+                'html_instructions': f"Arrive at <b>{destination}</b>",
+                'distance': {'text': f"{meters / 2000:.1f} km", 'value': meters - meters // 2},
+                'duration': {'text': f"{max(1, round(seconds / 120))} mins", 'value': seconds - seconds // 2}
+            }
+        ]
+    }
+    if with_traffic and mode == 'driving':
+        traffic_seconds = int(seconds * traffic_factor(departure_time))
+        leg['duration_in_traffic'] = {'text': f"{max(1, round(traffic_seconds / 60))} mins", 'value': traffic_seconds}
+    return leg
+
+
+# Alternative routes: (summary, distance factor, duration factor) relative to the main route
+FAKE_ALTERNATIVES = [('Ring Road', 1.25, 0.9), ('Old City', 0.85, 1.3)]
+
+
+def fake_alternative(leg, distance_factor, duration_factor):
+    """Scale a fake leg into a longer-but-faster or shorter-but-slower alternative"""
+    alternative = json.loads(json.dumps(leg))
+    for key, factor in (('distance', distance_factor), ('duration', duration_factor), ('duration_in_traffic', duration_factor)):
+        if key in alternative:
+            value = int(alternative[key]['value'] * factor)
+            text = f"{value / 1000:.1f} km" if key == 'distance' else f"{max(1, round(value / 60))} mins"
+            alternative[key] = {'text': text, 'value': value}
+    alternative['steps'].insert(1, {
+        'html_instructions': "Continue straight",
+        'distance': {'text': "0.5 km", 'value': 500},
+        'duration': {'text': "1 min", 'value': 60}
+    })
+    return alternative
+
+
+def fake_geocode(address):
+    """Build a plausible Geocoding API result; the same text always gets the same place"""
+    checksum = zlib.crc32(' '.join(address.lower().split()).encode('utf-8'))
+    formatted = ', '.join(part.strip().title() for part in address.split(',') if part.strip())
+    return {
+        'place_id': f"fake-{checksum:08x}",
+        'formatted_address': f"{formatted}, India",
+        'geometry': {'location': {'lat': 26.8 + (checksum % 2000) / 10000, 'lng': 75.7 + (checksum // 2000 % 2000) / 10000}}
+    }
+
+
+def fake_reply(prompt):
+    """A deterministic Gemini-style answer to ``prompt``"""
+    words = len(prompt.split())
+    return (f"Based on the {words} words of context you sent, leave ten minutes early, "
+            f"take the main road and check live traffic before you go.")
+
+
+def fake_candidates(text):
+    return {'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}, 'finishReason': 'STOP'}]}
+
+
+class _FakeMapsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Buffer each response and send it in one write; headers and body sent separately
+    # stall on delayed ACKs once a keep-alive connection is reused
+    wbufsize = -1
+    
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = {key: values[0] for key, values in urllib.parse.parse_qs(url.query).items()}
+        self.server.request_count += 1
+        self.server.wait_latency()
+        
+        failure = self.server.take_failure()
+        if failure is not None:
+            self._send_json({'status': 'UNKNOWN_ERROR', 'error_message': 'Injected failure'}, failure)
+            return
+        
+        if self.server.over_quota():
+            body = {'status': 'OVER_QUERY_LIMIT', 'error_message': 'You have exceeded your rate-limit for this API.'}
+        elif url.path.endswith('/geocode/json'):
+            result = fake_geocode(params.get('address', ''))
+            self.server.places[result['place_id']] = result['formatted_address']
+            body = {'status': 'OK', 'results': [result]}
+        elif url.path.endswith('/place/autocomplete/json'):
+            text = params.get('input', '').strip().title()
+            body = {'status': 'OK', 'predictions': [{'description': f"{text}{suffix}, Jaipur, Rajasthan, India"}
+                                                    for suffix in ('', ' Road', ' Market')]}
+        elif url.path.endswith('/directions/json'):
+            leg = fake_leg(self._place(params.get('origin', '')), self._place(params.get('destination', '')),
+                           params.get('mode', 'driving'), 'departure_time' in params, params.get('departure_time'))
+            routes = [{'summary': 'Main Road', 'legs': [leg]}]
+            if params.get('alternatives') == 'true':
+                routes += [{'summary': summary, 'legs': [fake_alternative(leg, distance_factor, duration_factor)]}
+                           for summary, distance_factor, duration_factor in FAKE_ALTERNATIVES]
+            body = {'status': 'OK', 'routes': routes}
+        elif url.path.endswith('/distancematrix/json'):
+            origins = params.get('origins', '').split('|')
+            destinations = params.get('destinations', '').split('|')
+            mode = params.get('mode', 'driving')
+            rows = []
+            for origin in origins:
+                elements = []
+                for destination in destinations:
+                    leg = fake_leg(origin, destination, mode, 'departure_time' in params, params.get('departure_time'))
+                    element = {'status': 'OK', 'duration': leg['duration'], 'distance': leg['distance']}
+                    if 'duration_in_traffic' in leg:
+                        element['duration_in_traffic'] = leg['duration_in_traffic']
+                    elements.append(element)
+                rows.append({'elements': elements})
+            body = {'status': 'OK', 'origin_addresses': origins, 'destination_addresses': destinations, 'rows': rows}
+        else:
+            body = {'status': 'INVALID_REQUEST'}
+        
+        self._send_json(body)
+    
+    def do_POST(self):
+        # Gemini's generateContent and streamGenerateContent (server-sent events)
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        self.server.request_count += 1
+        self.server.wait_latency()
+        
+        failure = self.server.take_failure()
+        if failure is not None:
+            self._send_json({'error': {'code': failure, 'status': 'UNAVAILABLE'}}, failure)
+            return
+        
+        prompt = ' '.join(part.get('text', '') for content in request.get('contents', [])
+                          for part in content.get('parts', []))
+        reply = fake_reply(prompt)
+        path = urllib.parse.urlparse(self.path).path
+        if path.endswith(':streamGenerateContent'):
+            words = reply.split(' ')
+            chunks = [' '.join(words[i:i + 4]) + (' ' if i + 4 < len(words) else '') for i in range(0, len(words), 4)]
+            payload = ''.join(f"data: {json.dumps(fake_candidates(chunk))}\r\n\r\n" for chunk in chunks).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        elif path.endswith(':generateContent'):
+            self._send_json(fake_candidates(reply))
+        else:
+            self._send_json({'error': {'code': 404, 'status': 'NOT_FOUND'}}, 404)
+    
+    def _send_json(self, body, code=200):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _place(self, text):
+        # "place_id:..." from an earlier geocode request stands for its address
+        if text.startswith('place_id:'):
+            return self.server.places.get(text[len('place_id:'):], text)
+        return text
+    
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+
+class _FakeMapsHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for a burst of concurrent connections from async benchmarks
+    request_queue_size = 256
+    
+    def __init__(self, address, latency, queries_per_second):
+        super().__init__(address, _FakeMapsHandler)
+        self.latency = latency
+        self.request_count = 0
+        self.places = {}
+        self.queries_per_second = queries_per_second
+        self.quota_errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.failures = deque()
+        self._recent = deque()
+        self._lock = threading.Lock()
+    
+    def wait_latency(self):
+        """Sleep for the simulated latency, counting the requests waiting at once"""
+        if not self.latency:
+            return
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+    
+    def take_failure(self):
+        """HTTP status of the next injected failure, or None"""
+        with self._lock:
+            return self.failures.popleft() if self.failures else None
+    
+    def over_quota(self):
+        """Whether this request goes over the per-second quota, like the real API's OVER_QUERY_LIMIT"""
+        if not self.queries_per_second:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] >= 1:
+                self._recent.popleft()
+            if len(self._recent) >= self.queries_per_second:
+                self.quota_errors += 1
+                return True
+            self._recent.append(now)
+            return False
+    
+    def handle_error(self, request, client_address):
+        # Clients that hang up early, such as cancelled requests, are not server errors
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeMapsServer:
+    """Threaded HTTP server answering directions, distance-matrix and geocoding requests.
+
+    ``queries_per_second`` enforces a quota the way the real API does, and
+    ``fail_next`` injects server errors, for exercising retry handling.
+    """
+    
+    def __init__(self, latency=0.05, host='127.0.0.1', port=0, queries_per_second=None):
+        self._server = _FakeMapsHTTPServer((host, port), latency, queries_per_second)
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    @property
+    def request_count(self):
+        return self._server.request_count
+    
+    @property
+    def quota_errors(self):
+        return self._server.quota_errors
+    
+    @property
+    def peak_in_flight(self):
+        """Most requests the server has held at once"""
+        return self._server.peak_in_flight
+    
+    def fail_next(self, count=1, code=503):
+        """Answer the next ``count`` requests with HTTP ``code``"""
+        with self._server._lock:
+            self._server.failures.extend([code] * count)
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeApiError(Exception):
+    """A non-OK response status, as ``googlemaps.exceptions.ApiError`` reports it"""
+    
+    def __init__(self, status, message=None):
+        super().__init__(f"{status} ({message})" if message else status)
+        self.status = status
+        self.message = message
+
+
+class FakeMapsClient:
+    """Minimal ``googlemaps.Client`` look-alike that talks to a FakeMapsServer"""
+    
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url
+        self.timeout = timeout
+    
+    def directions(self, origin, destination, mode='driving', departure_time=None, alternatives=False, **kwargs):
+        params = {'origin': origin, 'destination': destination, 'mode': mode}
+        if alternatives:
+            params['alternatives'] = 'true'
+        if departure_time is not None:
+            params['departure_time'] = _to_timestamp(departure_time)
+        return self._get('/maps/api/directions/json', params)['routes']
+    
+    def distance_matrix(self, origins, destinations, mode='driving', departure_time=None, **kwargs):
+        params = {'origins': '|'.join(origins), 'destinations': '|'.join(destinations), 'mode': mode}
+        if departure_time is not None:
+            params['departure_time'] = _to_timestamp(departure_time)
+        return self._get('/maps/api/distancematrix/json', params)
+    
+    def places_autocomplete(self, input_text, session_token=None, **kwargs):
+        return self._get('/maps/api/place/autocomplete/json', {'input': input_text})['predictions']
+    
+    def geocode(self, address, **kwargs):
+        return self._get('/maps/api/geocode/json', {'address': address})['results']
+    
+    def _get(self, path, params):
+        url = self.base_url + path + '?' + urllib.parse.urlencode(params)
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            body = json.loads(response.read().decode('utf-8'))
+        if body.get('status') not in ('OK', 'ZERO_RESULTS'):
+            raise FakeApiError(body.get('status'), body.get('error_message'))
+        return body
+
+
+def _to_timestamp(departure_time):
+    if isinstance(departure_time, datetime):
+        return str(int(departure_time.timestamp()))
+    return str(departure_time)
@@ -2,12 +2,13 @@
 # Licensed under the MIT License
 
 import google.generativeai as genai
+from Api_clients import get_api_gateway, GEMINI_ENDPOINTS
 
 # Configure with your Gemini API key
 genai.configure(api_key="your_gemini_api_key_here")
 
 # Select your model
-model = genai.GenerativeModel("models/gemini-1.5-pro-001")
+model = get_api_gateway().wrap(genai.GenerativeModel("models/gemini-1.5-pro-001"), 'gemini', GEMINI_ENDPOINTS)
 
 def chat_with_gemini():
     print("Welcome to Gemini Chatbot! (type 'exit' to quit)\n")
@@ -0,0 +1,429 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict, Counter, namedtuple
+
+from Directions_service import normalize_place
+from Response_cache import prompt_vector, cosine_similarity, NUMBER_RE
+
+# Places rarely move; re-geocode after this long anyway in case an ID was retired
+PLACE_TTL = 90 * 24 * 3600
+# Cosine similarity at which a misspelt place counts as a known one
+FUZZY_THRESHOLD = 0.8
+# Fuzzy candidates scored in full, picked by how many features they share with the query
+FUZZY_CANDIDATES = 20
+# N-grams found in more than this share of keys ("nagar", "jaipur") are too common to pick candidates by
+COMMON_FEATURE_SHARE = 0.05
+# A fuzzy match may differ by one edit per this many letters of each word beyond the first
+LETTERS_PER_TYPO = 4
+
+POSTAL_CODE_RE = re.compile(r'\b\d{5,6}\b')
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+
+Place = namedtuple('Place', ['place_id', 'address', 'lat', 'lng'])
+
+
+def place_key(text):
+    """Lookup key for free-text place input: normalized, without postal codes or punctuation"""
+    text = POSTAL_CODE_RE.sub(' ', normalize_place(text))
+    return ' '.join(PUNCTUATION_RE.sub(' ', text).split())
+
+
+def place_aliases(address):
+    """Keys a formatted address should answer to, dropping trailing components down to two.
+
+    "Vidyadhar Nagar, Jaipur, Rajasthan 302032, India" also answers to
+    "vidyadhar nagar jaipur rajasthan" and "vidyadhar nagar jaipur".
+    """
+    parts = [part for part in (place_key(part) for part in normalize_place(address).split(', ')) if part]
+    if not parts:
+        return []
+    return [' '.join(parts[:count]) for count in range(len(parts), min(2, len(parts)) - 1, -1)]
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between ``a`` and ``b``, or ``limit + 1`` once it must exceed ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def spelling_variant(key, known_key):
+    """Whether ``key`` reads as ``known_key`` misspelt: the same number of words, each a few typos off.
+
+    An extra or missing word ("raja park market" for "raja park") is a
+    different, usually more specific place, never a spelling variant.
+    """
+    words, known_words = key.split(), known_key.split()
+    if len(words) != len(known_words):
+        return False
+    for word, known_word in zip(words, known_words):
+        limit = (len(known_word) - 1) // LETTERS_PER_TYPO
+        if edit_distance(word, known_word, limit) > limit:
+            return False
+    return True
+
+
+def confirms_misspelling(text, key, known_key, address):
+    """Cheap check that a fuzzy match of ``text`` names the place at ``address`` before it is trusted online.
+
+    ``known_key`` must be one of the address's own forms, so misspellings
+    never build on each other. Only one word may be misspelt; the others,
+    including the last (usually the city), must match exactly, and any
+    postal code typed must be the place's own.
+    """
+    if known_key not in place_aliases(address):
+        return False
+    words, known_words = key.split(), known_key.split()
+    if len(words) < 2 or len(words) != len(known_words) or words[-1] != known_words[-1]:
+        return False
+    if sum(word != known_word for word, known_word in zip(words, known_words)) != 1:
+        return False
+    return all(code in address for code in POSTAL_CODE_RE.findall(text))
+
+
+def directions_query(place):
+    """Origin/destination string that pins the Directions API to ``place``"""
+    return f"place_id:{place.place_id}"
+
+
+class GeocodeCache:
+    """Free-text places resolved once to place IDs and coordinates, persisted to a JSON file.
+
+    Every spelling a place has been geocoded for, and the shorter forms of
+    its formatted address, are kept as keys. ``lookup`` can also fall back
+    to a misspelt key ("vidhaydhar nagar" for "Vidyadhar Nagar"), for
+    callers that must stay offline. ``resolve`` and ``query_for`` only take
+    a misspelling that ``confirms_misspelling`` accepts, and then keep it as
+    a key of that place; anything else is geocoded.
+    """
+    
+    def __init__(self, cache_file='geocode_cache.json', max_places=5000, ttl=PLACE_TTL,
+                 similarity_threshold=FUZZY_THRESHOLD, save_every=10):
+        self.cache_file = cache_file
+        self.max_places = max_places
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.save_every = save_every
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        # place_id -> {'address', 'lat', 'lng', 'fetched_at', 'aliases'}
+        self._places = OrderedDict()
+        self._aliases = {}
+        # Fuzzy index, built on a worker thread after loading: key -> n-gram vector, and
+        # hashed n-gram -> keys containing it, to find candidates without a full scan
+        self._vectors = None
+        self._postings = {}
+        self._unsaved = 0
+        self.load()
+        self._indexer = threading.Thread(target=self._build_index, name='geocode-index', daemon=True)
+        self._indexer.start()
+    
+    def lookup(self, text, now=None, fuzzy=True):
+        """Cached ``Place`` for ``text``, or None; never calls the API.
+
+        A fuzzy hit is a best guess and is not remembered as a key.
+        ``fuzzy=False`` skips the similarity search, for callers that need
+        the exact place. Until the index is built, there are no fuzzy hits.
+        """
+        return self._lookup(text, now, fuzzy, confirm=False)
+    
+    def known_place(self, text, now=None):
+        """Cached ``Place`` for ``text`` that may be sent to Directions: an exact key or a confirmed misspelling"""
+        return self._lookup(text, now, True, confirm=True)
+    
+    def resolve(self, text, client, now=None):
+        """``Place`` for ``text``, geocoding through ``client`` unless ``text`` is a known place"""
+        place = self.known_place(text, now)
+        if place is not None or client is None or not hasattr(client, 'geocode'):
+            return place
+        results = client.geocode(text)
+        if not results:
+            return None
+        return self.put(text, results[0], now)
+    
+    def query_for(self, text, client):
+        """Directions origin/destination for ``text``: a place ID when it resolves, else the text itself"""
+        try:
+            place = self.resolve(text, client)
+        except Exception as e:
+            print(f"Geocoding failed, using the address as typed: {e}")
+            return text
+        return directions_query(place) if place is not None else text
+    
+    async def query_for_async(self, text, client):
+        """``query_for`` with an async client; only a cache miss goes online"""
+        try:
+            place = self.known_place(text)
+            if place is None:
+                results = await client.geocode(text)
+                # ``put`` may write the cache file, so it runs off the event loop
+                place = await asyncio.to_thread(self.put, text, results[0]) if results else None
+        except Exception as e:
+            print(f"Geocoding failed, using the address as typed: {e}")
+            return text
+        return directions_query(place) if place is not None else text
+    
+    def coordinates(self, text):
+        """``(lat, lng)`` of a cached place, for callers that must not go online"""
+        place = self.lookup(text)
+        return (place.lat, place.lng) if place is not None else None
+    
+    def put(self, text, geocode_result, now=None):
+        """Store one Geocoding API result for ``text`` and return it as a ``Place``"""
+        now = now or time.time()
+        location = geocode_result['geometry']['location']
+        place_id = geocode_result['place_id']
+        address = geocode_result.get('formatted_address') or text
+        with self._lock:
+            entry = self._places.get(place_id)
+            if entry is None:
+                entry = {'aliases': []}
+                self._places[place_id] = entry
+            entry.update({'address': address, 'lat': location['lat'], 'lng': location['lng'], 'fetched_at': now})
+            self._places.move_to_end(place_id)
+            for key in [place_key(text)] + place_aliases(address):
+                if key:
+                    self._add_alias(key, place_id)
+            while len(self._places) > self.max_places:
+                self._evict(next(iter(self._places)))
+            self._unsaved += 1
+            should_save = self._unsaved >= self.save_every
+            place = self._place(place_id)
+        
+        if should_save:
+            self.save()
+        return place
+    
+    def link(self, text, known_text):
+        """Let ``text``, e.g. an address from a Directions leg, resolve to the place ``known_text`` names"""
+        key, known_key = place_key(text), place_key(known_text)
+        with self._lock:
+            place_id = self._aliases.get(known_key)
+            if key and place_id is not None and self._aliases.get(key) != place_id:
+                self._add_alias(key, place_id)
+                self._unsaved += 1
+    
+    def clear(self):
+        with self._lock:
+            self._places.clear()
+            self._aliases.clear()
+            self._vectors = {}
+            self._postings = {}
+            self._unsaved += 1
+    
+    def load(self):
+        """Load cached places from disk"""
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                places = json.load(f)
+            with self._lock:
+                for place_id, entry in places.items():
+                    aliases = entry.get('aliases', [])
+                    entry['aliases'] = []
+                    self._places[place_id] = entry
+                    for key in aliases:
+                        self._add_alias(key, place_id)
+        except Exception as e:
+            print(f"Error loading geocode cache: {e}")
+    
+    def save(self):
+        """Write cached places to disk"""
+        with self._lock:
+            places = OrderedDict((place_id, dict(entry)) for place_id, entry in self._places.items())
+            self._unsaved = 0
+        try:
+            temp_file = self.cache_file + '.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(places, f, ensure_ascii=False)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            print(f"Error saving geocode cache: {e}")
+    
+    def __len__(self):
+        return len(self._places)
+    
+    def _lookup(self, text, now, fuzzy, confirm):
+        key = place_key(text)
+        if not key:
+            return None
+        now = now or time.time()
+        with self._lock:
+            place_id = self._aliases.get(key)
+            if place_id is not None and self._fresh(place_id, now):
+                self.hits += 1
+                return self._place(place_id)
+            
+            place_id = None
+            if fuzzy and self.similarity_threshold is not None:
+                place_id = self._nearest(key, now, text if confirm else None)
+            if place_id is not None:
+                if confirm:
+                    # Next time this spelling is an exact key
+                    self._add_alias(key, place_id)
+                    self._unsaved += 1
+                self.fuzzy_hits += 1
+                return self._place(place_id)
+            
+            self.misses += 1
+            return None
+    
+    def _place(self, place_id):
+        entry = self._places[place_id]
+        return Place(place_id, entry['address'], entry['lat'], entry['lng'])
+    
+    def _fresh(self, place_id, now):
+        entry = self._places.get(place_id)
+        return entry is not None and now - entry['fetched_at'] <= self.ttl
+    
+    def _add_alias(self, key, place_id):
+        previous = self._aliases.get(key)
+        if previous is not None and previous in self._places:
+            # The key now names a different place
+            self._places[previous]['aliases'].remove(key)
+        self._aliases[key] = place_id
+        self._places[place_id]['aliases'].append(key)
+        if self._vectors is not None and key not in self._vectors:
+            self._index(key)
+    
+    def _index(self, key):
+        vector = prompt_vector(key)
+        self._vectors[key] = vector
+        for feature in vector:
+            self._postings.setdefault(feature, set()).add(key)
+    
+    def _evict(self, place_id):
+        for key in self._places.pop(place_id)['aliases']:
+            self._aliases.pop(key, None)
+            if self._vectors is not None:
+                self._unindex(key)
+    
+    def _unindex(self, key):
+        for feature in self._vectors.pop(key, ()):
+            keys = self._postings.get(feature)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[feature]
+    
+    def _build_index(self):
+        with self._lock:
+            keys = list(self._aliases)
+        # The n-grams of every key are worked out without holding the lock
+        vectors = {key: prompt_vector(key) for key in keys}
+        postings = {}
+        for key, vector in vectors.items():
+            for feature in vector:
+                postings.setdefault(feature, set()).add(key)
+        with self._lock:
+            self._vectors, self._postings = vectors, postings
+            # Keys evicted or added while the index was being built
+            for key in [key for key in vectors if key not in self._aliases]:
+                self._unindex(key)
+            for key in self._aliases:
+                if key not in self._vectors:
+                    self._index(key)
+    
+    def _nearest(self, key, now, confirm_text=None):
+        """Place ID of the closest fresh key ``key`` misspells; with ``confirm_text``, only confirmed ones"""
+        if self._vectors is None:
+            return None
+        vector = prompt_vector(key)
+        common = max(FUZZY_CANDIDATES, len(self._vectors) * COMMON_FEATURE_SHARE)
+        shared = Counter()
+        for feature in vector:
+            keys = self._postings.get(feature, ())
+            if len(keys) <= common:
+                shared.update(keys)
+        numbers = NUMBER_RE.findall(key)
+        best_id, best_score = None, self.similarity_threshold
+        for candidate, _ in shared.most_common(FUZZY_CANDIDATES):
+            # "Sector 5" must not answer for "Sector 6", nor "Raja Park" for "Raja Park Market"
+            if NUMBER_RE.findall(candidate) != numbers or not spelling_variant(key, candidate):
+                continue
+            place_id = self._aliases.get(candidate)
+            if place_id is None or not self._fresh(place_id, now):
+                continue
+            if confirm_text is not None and not confirms_misspelling(confirm_text, key, candidate,
+                                                                      self._places[place_id]['address']):
+                continue
+            score = cosine_similarity(vector, self._vectors[candidate])
+            if score >= best_score:
+                best_id, best_score = place_id, score
+        return best_id
+
+
+def benchmark(places=4000, lookups=2000):
+    """Resolve misspelt repeat places against the fake server and time cached lookups"""
+    from Fake_maps_server import FakeMapsServer, FakeMapsClient
+    import random
+    import tempfile
+    
+    localities = ["Vidyadhar Nagar", "Malviya Nagar", "Vaishali Nagar", "Mansarovar", "Raja Park", "Jagatpura",
+                  "Sitapura", "C Scheme", "Bani Park", "Sodala", "Tonk Phatak", "Shastri Nagar"]
+    typed = ["vidhaydhar nagar, jaipur", "Vidyadhar Nagar Jaipur", "VIDYADHAR NAGAR, JAIPUR, RAJASTHAN 302039",
+             "malviya nagar , jaipur", "Malviya Nagar, Jaipur, Rajasthan, India", "malviy nagar jaipur",
+             "c-scheme, jaipur", "C Scheme, Jaipur", "raja park, jaipur", "Raja Park, Jaipur, Rajasthan"]
+    
+    with FakeMapsServer(latency=0.02) as server, tempfile.TemporaryDirectory() as folder:
+        client = FakeMapsClient(server.url)
+        cache = GeocodeCache(os.path.join(folder, 'geocode_cache.json'), save_every=1000)
+        for locality in localities:
+            cache.resolve(f"{locality}, Jaipur", client)
+        requests_before = server.request_count
+        for text in typed:
+            place = cache.resolve(text, client)
+            print(f"  {text!r:48} -> {place.address}")
+        print(f"{len(typed)} spellings of known places: {server.request_count - requests_before} geocode requests")
+        
+        # Fill up with distinct places and time lookups against a full cache
+        rng = random.Random(5)
+        for i in range(places):
+            cache.put(f"Plot {i}, Sector {i % 40}, Jaipur",
+                      {'place_id': f"bench-{i}", 'formatted_address': f"Plot {i}, Sector {i % 40}, Jaipur, Rajasthan, India",
+                       'geometry': {'location': {'lat': 26.9 + i * 1e-5, 'lng': 75.8}}})
+        cache.save()
+        started = time.perf_counter()
+        reloaded = GeocodeCache(cache.cache_file)
+        print(f"reloaded {len(reloaded)} places in {(time.perf_counter() - started) * 1000:.1f} ms")
+        queries = [rng.choice(typed) for _ in range(lookups // 2)] + [
+            f"plot {i} sectr {i % 40} jaipur" for i in rng.sample(range(places), lookups // 2)]
+        started = time.perf_counter()
+        reloaded._indexer.join()
+        print(f"fuzzy index ready {(time.perf_counter() - started) * 1000:.1f} ms later, built on a worker thread")
+        started = time.perf_counter()
+        reloaded.lookup("vaishalli nagar jaipur")
+        print(f"first fuzzy lookup: {(time.perf_counter() - started) * 1000:.1f} ms")
+        started = time.perf_counter()
+        for text in queries:
+            reloaded.lookup(text)
+        elapsed = time.perf_counter() - started
+        print(f"lookup: {elapsed / len(queries) * 1000:.3f} ms average  "
+              f"({reloaded.hits} exact, {reloaded.fuzzy_hits} fuzzy, {reloaded.misses} misses)")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Geocode_cache.py --bench")
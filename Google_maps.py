@@ -4,9 +4,14 @@
 import googlemaps
 from datetime import datetime
 import re
+from Geocode_cache import GeocodeCache
+from Api_clients import get_api_gateway
 
 API_KEY = 'your_google_maps_api_key_here'  # Replace with your actual key
-gmaps = googlemaps.Client(key=API_KEY)
+# Rate-limited and retried by the shared gateway, which handles quota errors itself
+gmaps = get_api_gateway().wrap(googlemaps.Client(key=API_KEY, retry_over_query_limit=False), 'maps')
+# Shared with the desktop app, so places resolved there need no geocode request here
+geocode_cache = GeocodeCache('geocode_cache.json')
 
 def remove_html_tags(text):
     clean = re.compile('<.*?>')
@@ -25,8 +30,8 @@ def get_directions(origin, destination, mode, departure_choice):
             departure_time = datetime.now()
 
     directions_result = gmaps.directions(
-        origin,
-        destination,
+        geocode_cache.query_for(origin, gmaps),
+        geocode_cache.query_for(destination, gmaps),
         mode=mode,
         departure_time=departure_time,
         traffic_model='best_guess' if mode == 'driving' else None,
@@ -64,6 +69,7 @@ def main():
         departure_choice = "now"
 
     get_directions(origin, destination, mode, departure_choice)
+    geocode_cache.save()
 
 if __name__ == '__main__':
     main()
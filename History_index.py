@@ -0,0 +1,200 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import time
+import math
+import threading
+from collections import Counter
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from Conversation_memory import content_words
+from Prompt_context import format_journey_line
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_TOP_K = 5
+
+
+def journey_record(journey, step_instructions=()):
+    """(searchable text, prompt line) for a saved journey entry"""
+    data = journey.get('data', {})
+    line = "Journey " + format_journey_line(journey).rstrip('\n')
+    steps = step_instructions or [step.get('instruction', '') for step in data.get('steps', [])]
+    text = ' '.join([line, data.get('distance') or ''] + list(steps))
+    return text, line
+
+
+def conversation_record(conversation):
+    """(searchable text, prompt line) for a saved AI conversation"""
+    timestamp = (conversation.get('timestamp') or '')[:16].replace('T', ' ')
+    question = conversation.get('user_message') or ''
+    answer = ' '.join((conversation.get('ai_response') or '').split())
+    # Keep the prompt line short; the full answer is only used for matching
+    snippet = answer if len(answer) <= 200 else answer[:197] + "..."
+    line = f"Conversation {timestamp}: " + (f'asked "{question}"; ' if question else '') + f"AI said: {snippet}"
+    return f"{question} {answer}", line
+
+
+class HistoryIndex:
+    """BM25 inverted index over a user's journeys and conversations.
+
+    Postings are appended as records are saved and packed into NumPy arrays
+    the first time a term is searched afterwards, so a lookup costs a few
+    vectorized passes over the postings of the query terms only.
+    """
+    
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy is required for the history index. Install with: pip install numpy")
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self.clear()
+    
+    def clear(self):
+        with self._lock:
+            self._lines = []
+            self._lengths = np.zeros(1024, dtype=np.float32)
+            self._total_length = 0
+            # term -> [doc ids, term frequencies, used length] with spare capacity,
+            # plus the postings added since each term was last packed
+            self._packed = {}
+            self._pending = {}
+    
+    def __len__(self):
+        return len(self._lines)
+    
+    def add(self, text, line):
+        """Index one record; ``line`` is what ``search`` returns for it"""
+        counts = Counter(content_words(text))
+        with self._lock:
+            doc_id = len(self._lines)
+            self._lines.append(line)
+            if doc_id >= len(self._lengths):
+                self._lengths = np.concatenate([self._lengths, np.zeros(len(self._lengths), dtype=np.float32)])
+            length = sum(counts.values())
+            self._lengths[doc_id] = length
+            self._total_length += length
+            for term, frequency in counts.items():
+                self._pending.setdefault(term, []).append((doc_id, frequency))
+        return doc_id
+    
+    def add_journey(self, journey, step_instructions=()):
+        return self.add(*journey_record(journey, step_instructions))
+    
+    def add_conversation(self, conversation):
+        return self.add(*conversation_record(conversation))
+    
+    def search(self, query, k=DEFAULT_TOP_K):
+        """Prompt lines of the ``k`` best-matching records, best first"""
+        terms = set(content_words(query))
+        with self._lock:
+            count = len(self._lines)
+            if not terms or not count:
+                return []
+            average_length = self._total_length / count or 1.0
+            norms = self.k1 * (1 - self.b + self.b * self._lengths[:count] / average_length)
+            scores = None
+            for term in terms:
+                postings = self._postings(term)
+                if postings is None:
+                    continue
+                doc_ids, frequencies = postings
+                df = len(doc_ids)
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                if scores is None:
+                    scores = np.zeros(count, dtype=np.float32)
+                scores[doc_ids] += idf * frequencies * (self.k1 + 1) / (frequencies + norms[doc_ids])
+            if scores is None:
+                return []
+            
+            # Repeated commutes give identical lines, so look a little deeper and skip repeats
+            depth = min(k * 4, count)
+            top = np.argpartition(scores, -depth)[-depth:]
+            top = top[np.argsort(scores[top])[::-1]]
+            results = []
+            for i in top:
+                line = self._lines[i]
+                if scores[i] <= 0 or len(results) == k:
+                    break
+                if line not in results:
+                    results.append(line)
+            return results
+    
+    def _postings(self, term):
+        pending = self._pending.pop(term, None)
+        packed = self._packed.get(term)
+        if pending:
+            if packed is None:
+                packed = [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), 0]
+                self._packed[term] = packed
+            used = packed[2]
+            needed = used + len(pending)
+            if needed > len(packed[0]):
+                # Grow geometrically so frequent terms are not copied on every new record
+                capacity = max(needed, 2 * len(packed[0]), 8)
+                packed[0] = np.concatenate([packed[0][:used], np.zeros(capacity - used, dtype=np.int64)])
+                packed[1] = np.concatenate([packed[1][:used], np.zeros(capacity - used, dtype=np.float32)])
+            packed[0][used:needed] = [doc_id for doc_id, _ in pending]
+            packed[1][used:needed] = [frequency for _, frequency in pending]
+            packed[2] = needed
+        if packed is None:
+            return None
+        return packed[0][:packed[2]], packed[1][:packed[2]]
+
+
+def benchmark(records=100000, queries=200):
+    """Index ``records`` synthetic journeys and conversations and time lookups"""
+    places = ["Malviya Nagar", "Jaipur Airport", "World Trade Park", "Vaishali Nagar", "Mansarovar",
+              "Hawa Mahal", "Amer Fort", "Sindhi Camp", "C Scheme", "Raja Park", "Jagatpura", "Sitapura"]
+    roads = ["JLN Marg", "Tonk Road", "Ajmer Road", "MI Road", "Gopalpura Bypass", "Sikar Road"]
+    index = HistoryIndex()
+    
+    started = time.perf_counter()
+    for i in range(records):
+        if i % 5 == 4:
+            index.add_conversation({
+                'timestamp': f"2025-03-{i % 28 + 1:02d}T09:00:00",
+                'user_message': f"Best time to leave for {places[i % len(places)]}?",
+                'ai_response': f"Leave before 8:30 and take {roads[i % len(roads)]} to skip the jam near {places[(i * 7) % len(places)]}."
+            })
+        else:
+            index.add_journey({
+                'timestamp': f"2025-03-{i % 28 + 1:02d}T{i % 24:02d}:00:00",
+                'data': {'origin': f"{places[i % len(places)]}, Jaipur",
+                         'destination': f"{places[(i * 5 + 3) % len(places)]}, Jaipur",
+                         'mode': 'driving', 'duration': f"{10 + i % 40} mins", 'distance': f"{2 + i % 20} km",
+                         'steps': [{'instruction': f"Head south on {roads[i % len(roads)]}"},
+                                   {'instruction': f"Turn left onto {roads[(i + 2) % len(roads)]}"}]}
+            })
+    print(f"indexed {records} records in {time.perf_counter() - started:.2f}s")
+    
+    questions = ["How long does Tonk Road to the airport take?", "What about Amer Fort in the evening?",
+                 "Is MI Road busy near Hawa Mahal?", "When should I leave Mansarovar?"]
+    index.search(questions[0])
+    started = time.perf_counter()
+    for i in range(queries):
+        results = index.search(questions[i % len(questions)])
+    print(f"search: {(time.perf_counter() - started) / queries * 1000:.2f} ms per query")
+    print("top results:", *results, sep="\n  ")
+    
+    # A new record only touches its own terms, which are repacked on the next search
+    started = time.perf_counter()
+    for i in range(100):
+        index.add_conversation({'timestamp': "2025-04-01T09:00:00", 'user_message': "Parking near Amer Fort?",
+                                'ai_response': "Use the lot below the fort."})
+        index.search(questions[1])
+    print(f"add + search: {(time.perf_counter() - started) / 100 * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python History_index.py --bench")
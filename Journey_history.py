@@ -0,0 +1,148 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import time
+from datetime import datetime
+from PyQt5.QtWidgets import QApplication, QListView
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+from Travel_storage import JourneySummary
+
+JOURNEY_ID_ROLE = Qt.UserRole
+
+EMPTY_HISTORY_TEXT = "No journey history available yet.\nPlan your first journey using the Smart Maps tab!"
+
+
+def format_journey_summary(summary):
+    """Multi-line list text for one journey"""
+    timestamp = summary.timestamp or ''
+    
+    # Format timestamp
+    try:
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        time_str = dt.strftime("%Y-%m-%d %H:%M")
+    except ValueError:
+        time_str = timestamp[:16] if timestamp else "Unknown time"
+    
+    origin = summary.origin or 'Unknown'
+    destination = summary.destination or 'Unknown'
+    mode = (summary.mode or 'unknown').title()
+    
+    # Truncate long addresses
+    if len(origin) > 40:
+        origin = origin[:37] + "..."
+    if len(destination) > 40:
+        destination = destination[:37] + "..."
+    
+    return f"""🕒 {time_str}
+📍 From: {origin}
+🎯 To: {destination}
+🚗 Mode: {mode} • ⏱️ {summary.duration or 'Unknown'} • 📏 {summary.distance or 'Unknown'}"""
+
+
+class JourneyHistoryModel(QAbstractListModel):
+    """Most-recent-first list model over a compact journey index.
+
+    Rows are plain ``JourneySummary`` tuples and their text is only built
+    when the view paints them, so the cost of a repaint does not depend on
+    how many journeys are stored.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Kept oldest-first so a new journey is a cheap append; rows are read in reverse
+        self._journeys = []
+    
+    def set_journeys(self, summaries):
+        """Replace the index; ``summaries`` may be in any order"""
+        self.beginResetModel()
+        self._journeys = sorted(summaries, key=lambda s: (s.timestamp or '', s.journey_id or 0))
+        self.endResetModel()
+    
+    def add_journey(self, summary):
+        """Show a newly saved journey at the top without rebuilding the list"""
+        if not self._journeys:
+            # Replace the empty-history row
+            self.beginResetModel()
+            self._journeys.append(summary)
+            self.endResetModel()
+            return
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._journeys.append(summary)
+        self.endInsertRows()
+    
+    def clear(self):
+        self.set_journeys([])
+    
+    def journey_at(self, row):
+        if 0 <= row < len(self._journeys):
+            return self._journeys[len(self._journeys) - 1 - row]
+        return None
+    
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        # An empty history still shows one hint row
+        return len(self._journeys) or 1
+    
+    def flags(self, index):
+        if not self._journeys:
+            return Qt.NoItemFlags
+        return super().flags(index)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        summary = self.journey_at(index.row())
+        if role == Qt.DisplayRole:
+            return EMPTY_HISTORY_TEXT if summary is None else format_journey_summary(summary)
+        if role == JOURNEY_ID_ROLE:
+            return None if summary is None else summary.journey_id
+        return None
+
+
+def benchmark(count=100000):
+    """Load ``count`` journeys into the history view and time scrolling through it"""
+    app = QApplication.instance() or QApplication(sys.argv)
+    model = JourneyHistoryModel()
+    view = QListView()
+    view.setUniformItemSizes(True)
+    view.setModel(model)
+    view.resize(600, 800)
+    view.show()
+    
+    summaries = [
+        JourneySummary(i, f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}T{i % 24:02d}:{i % 60:02d}:00",
+                       f"Origin {i % 500}, Jaipur", f"Destination {i % 700}, Jaipur",
+                       'driving', f"{10 + i % 50} mins", f"{1 + i % 30}.0 km")
+        for i in range(count)
+    ]
+    
+    started = time.perf_counter()
+    model.set_journeys(summaries)
+    app.processEvents()
+    print(f"load {count} journeys: {(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    # Jump through the whole list and repaint each time, as a fast scroll would
+    scrollbar = view.verticalScrollBar()
+    steps = 200
+    started = time.perf_counter()
+    for i in range(steps + 1):
+        scrollbar.setValue(scrollbar.maximum() * i // steps)
+        view.viewport().repaint()
+    print(f"scroll: {(time.perf_counter() - started) / (steps + 1) * 1000:.2f} ms per repaint")
+    
+    started = time.perf_counter()
+    for i in range(100):
+        model.add_journey(summaries[i]._replace(journey_id=count + i))
+    app.processEvents()
+    print(f"insert: {(time.perf_counter() - started) / 100 * 1000:.3f} ms per new journey")
+    return app
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Journey_history.py --bench")
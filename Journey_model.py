@@ -0,0 +1,380 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import re
+import sys
+import time
+import tracemalloc
+from array import array
+from datetime import datetime, timedelta, timezone
+
+# Naive local times are stored as whole microseconds since this instant, which
+# round-trips isoformat() strings exactly and avoids DST surprises
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+DURATION_UNITS = {'day': 86400, 'hour': 3600, 'hr': 3600, 'min': 60, 'sec': 1, 's': 1}
+DISTANCE_UNITS = {'km': 1000.0, 'm': 1.0, 'mi': 1609.344, 'ft': 0.3048}
+QUANTITY_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*([a-z]+)')
+
+# Missing values in the array-backed columns
+MISSING = -1
+
+
+def parse_duration(text):
+    """Seconds in a Directions API duration text such as ``"1 hour 5 mins"``, or None"""
+    if not text:
+        return None
+    total = 0.0
+    found = False
+    for amount, unit in QUANTITY_RE.findall(text.lower()):
+        unit = unit.rstrip('s') or unit
+        seconds = DURATION_UNITS.get(unit) or DURATION_UNITS.get(unit[:3])
+        if seconds is None:
+            continue
+        total += float(amount.replace(',', '.')) * seconds
+        found = True
+    return round(total) if found else None
+
+
+def parse_distance(text):
+    """Meters in a distance text such as ``"4.8 km"`` or ``"850 m"``, or None"""
+    if not text:
+        return None
+    for amount, unit in QUANTITY_RE.findall(text.lower().replace(',', '')):
+        meters = DISTANCE_UNITS.get(unit)
+        if meters is not None:
+            return round(float(amount) * meters)
+    return None
+
+
+def format_duration(seconds):
+    """Directions-style text for a duration in seconds"""
+    if seconds is None:
+        return 'Unknown'
+    minutes = max(1, round(seconds / 60))
+    days, minutes = divmod(minutes, 1440)
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    for amount, unit in ((days, 'day'), (hours, 'hour'), (minutes, 'min')):
+        if amount:
+            parts.append(f"{amount} {unit}{'s' if amount != 1 else ''}")
+    # The API leaves out minutes once a trip is measured in days
+    return ' '.join(parts[:2])
+
+
+def format_distance(meters):
+    """Directions-style text for a distance in meters"""
+    if meters is None:
+        return 'Unknown'
+    if meters < 1000:
+        return f"{round(meters)} m"
+    return f"{meters / 1000:.1f} km"
+
+
+def parse_timestamp(timestamp):
+    """Microseconds since ``EPOCH`` for an ISO timestamp, or None"""
+    if not timestamp:
+        return None
+    try:
+        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - EPOCH) // MICROSECOND
+
+
+def format_timestamp(micros):
+    if micros is None:
+        return None
+    return (EPOCH + micros * MICROSECOND).isoformat()
+
+
+def _intern(text):
+    return sys.intern(text) if isinstance(text, str) else text
+
+
+def _value(data, key, parse):
+    value = data.get(key + '_value')
+    if value is None:
+        value = parse(data.get(key))
+    return value
+
+
+class JourneyStep:
+    """One turn-by-turn step with its duration and distance as numbers"""
+    
+    __slots__ = ('instruction', 'duration_s', 'distance_m')
+    
+    def __init__(self, instruction, duration_s=None, distance_m=None):
+        # Repeated commutes share their instructions
+        self.instruction = _intern(instruction or '')
+        self.duration_s = duration_s
+        self.distance_m = distance_m
+    
+    @classmethod
+    def from_entry(cls, step):
+        return cls(step.get('instruction'), _value(step, 'duration', parse_duration),
+                   _value(step, 'distance', parse_distance))
+    
+    def to_entry(self, number):
+        return {
+            'step': number,
+            'instruction': self.instruction,
+            'distance': format_distance(self.distance_m),
+            'duration': format_duration(self.duration_s)
+        }
+
+
+class Journey:
+    """A saved journey with numeric fields and interned place names.
+
+    Durations are seconds and distances meters, taken from the API's
+    ``value`` fields where available and parsed from the display text
+    otherwise. ``steps`` is None when they were not loaded.
+    """
+    
+    __slots__ = ('journey_id', 'time_us', 'origin', 'destination', 'mode',
+                 'duration_s', 'distance_m', 'traffic_s', 'steps')
+    
+    def __init__(self, origin, destination, mode, duration_s=None, distance_m=None, traffic_s=None,
+                 time_us=None, journey_id=None, steps=None):
+        self.journey_id = journey_id
+        self.time_us = time_us
+        self.origin = _intern(origin)
+        self.destination = _intern(destination)
+        self.mode = _intern(mode)
+        self.duration_s = duration_s
+        self.distance_m = distance_m
+        self.traffic_s = traffic_s
+        self.steps = steps
+    
+    @property
+    def timestamp(self):
+        return format_timestamp(self.time_us)
+    
+    @property
+    def route(self):
+        return (self.origin, self.destination, self.mode)
+    
+    @classmethod
+    def from_directions(cls, directions_data, timestamp=None, journey_id=None):
+        """From the app's ``directions_data`` dict"""
+        steps = directions_data.get('steps')
+        return cls(
+            directions_data.get('origin'),
+            directions_data.get('destination'),
+            directions_data.get('mode'),
+            _value(directions_data, 'duration', parse_duration),
+            _value(directions_data, 'distance', parse_distance),
+            _value(directions_data, 'duration_in_traffic', parse_duration),
+            parse_timestamp(timestamp),
+            journey_id,
+            None if steps is None else tuple(JourneyStep.from_entry(step) for step in steps)
+        )
+    
+    @classmethod
+    def from_entry(cls, journey_entry, journey_id=None):
+        """From a ``{'timestamp': ..., 'data': {...}}`` entry of enhanced_travel_data.json or journeys.json"""
+        data = journey_entry.get('data')
+        if data is None:
+            # journeys.json keeps the fields next to the timestamp
+            data = journey_entry
+        return cls.from_directions(data, journey_entry.get('timestamp'), journey_id)
+    
+    @classmethod
+    def from_travel_record(cls, record):
+        """From a journey of user_travel_data.json (``start``/``end``, ``distance_km``, ``duration_min``)"""
+        duration_min = record.get('duration_min')
+        distance_km = record.get('distance_km')
+        return cls(
+            record.get('start'),
+            record.get('end'),
+            record.get('mode'),
+            round(duration_min * 60) if duration_min is not None else None,
+            round(distance_km * 1000) if distance_km is not None else None,
+            time_us=parse_timestamp(record.get('timestamp')),
+            steps=()
+        )
+    
+    def to_directions(self):
+        """The app's ``directions_data`` dict, with the numeric values alongside the text"""
+        return {
+            'origin': self.origin,
+            'destination': self.destination,
+            'mode': self.mode,
+            'duration': format_duration(self.duration_s),
+            'distance': format_distance(self.distance_m),
+            'duration_in_traffic': format_duration(self.traffic_s) if self.traffic_s is not None else 'N/A',
+            'duration_value': self.duration_s,
+            'distance_value': self.distance_m,
+            'duration_in_traffic_value': self.traffic_s,
+            'steps': [step.to_entry(i) for i, step in enumerate(self.steps or (), 1)]
+        }
+    
+    def to_entry(self):
+        return {'timestamp': self.timestamp, 'data': self.to_directions()}
+    
+    def to_travel_record(self):
+        return {
+            'start': self.origin,
+            'end': self.destination,
+            'mode': self.mode,
+            'distance_km': self.distance_m / 1000 if self.distance_m is not None else None,
+            'duration_min': self.duration_s / 60 if self.duration_s is not None else None,
+            'timestamp': self.timestamp
+        }
+    
+    def __repr__(self):
+        return (f"Journey({self.origin!r} → {self.destination!r}, {self.mode}, "
+                f"{self.duration_s}s, {self.distance_m}m, at {self.timestamp})")
+
+
+class JourneyTable:
+    """Journeys as parallel typed arrays, for history-wide numeric work.
+
+    Place names and modes are stored once in a string table and referenced
+    by index, so a row costs a few dozen bytes however long its addresses
+    are. Missing numbers are ``MISSING``.
+    """
+    
+    def __init__(self, journeys=()):
+        self.strings = []
+        self._codes = {}
+        self.journey_id = array('q')
+        self.time_us = array('q')
+        self.origin = array('l')
+        self.destination = array('l')
+        self.mode = array('l')
+        self.duration_s = array('l')
+        self.distance_m = array('l')
+        self.traffic_s = array('l')
+        self.extend(journeys)
+    
+    def __len__(self):
+        return len(self.time_us)
+    
+    def code(self, text):
+        code = self._codes.get(text)
+        if code is None:
+            code = self._codes[text] = len(self.strings)
+            self.strings.append(text)
+        return code
+    
+    def append(self, journey):
+        self.append_row(journey.journey_id, journey.time_us, journey.origin, journey.destination, journey.mode,
+                        journey.duration_s, journey.distance_m, journey.traffic_s)
+    
+    def append_row(self, journey_id, time_us, origin, destination, mode, duration_s, distance_m, traffic_s):
+        """Add one row from plain values, without building a ``Journey``"""
+        self.journey_id.append(MISSING if journey_id is None else journey_id)
+        self.time_us.append(MISSING if time_us is None else time_us)
+        self.origin.append(self.code(origin))
+        self.destination.append(self.code(destination))
+        self.mode.append(self.code(mode))
+        self.duration_s.append(MISSING if duration_s is None else duration_s)
+        self.distance_m.append(MISSING if distance_m is None else distance_m)
+        self.traffic_s.append(MISSING if traffic_s is None else traffic_s)
+    
+    def extend(self, journeys):
+        for journey in journeys:
+            self.append(journey)
+    
+    def journey(self, row):
+        """Row ``row`` as a ``Journey`` without steps"""
+        def value(column):
+            number = column[row]
+            return None if number == MISSING else number
+        return Journey(self.strings[self.origin[row]], self.strings[self.destination[row]],
+                       self.strings[self.mode[row]], value(self.duration_s), value(self.distance_m),
+                       value(self.traffic_s), value(self.time_us), value(self.journey_id))
+    
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.journey(row)
+    
+    def total_distance_m(self):
+        return sum(value for value in self.distance_m if value != MISSING)
+    
+    def total_duration_s(self):
+        return sum(value for value in self.duration_s if value != MISSING)
+    
+    def route_durations(self):
+        """``{(origin, destination, mode): [seconds, ...]}`` over rows with a known duration"""
+        routes = {}
+        strings = self.strings
+        for origin, destination, mode, seconds in zip(self.origin, self.destination, self.mode, self.duration_s):
+            if seconds != MISSING:
+                routes.setdefault((strings[origin], strings[destination], strings[mode]), []).append(seconds)
+        return routes
+
+
+def _synthetic_entries(count):
+    places = ["Malviya Nagar, Jaipur, Rajasthan, India", "Jaipur International Airport, Sanganer, Jaipur, Rajasthan",
+              "World Trade Park, JLN Marg, Jaipur, Rajasthan", "Vaishali Nagar, Jaipur, Rajasthan, India",
+              "Hawa Mahal, Badi Choupad, Pink City, Jaipur, Rajasthan", "Amer Fort, Devisinghpura, Amer, Rajasthan"]
+    roads = ["JLN Marg", "Tonk Road", "Ajmer Road", "MI Road"]
+    entries = []
+    for i in range(count):
+        minutes = 10 + i % 50
+        entries.append({
+            'timestamp': (datetime(2025, 1, 1) + timedelta(minutes=37 * i)).isoformat(),
+            'data': {
+                # Built per journey, as json.load would, so equal names are separate objects
+                'origin': ''.join(places[i % len(places)]),
+                'destination': ''.join(places[(i * 5 + 1) % len(places)]),
+                'mode': ''.join('driving'),
+                'duration': f"{minutes} mins",
+                'distance': f"{minutes * 0.4:.1f} km",
+                'duration_in_traffic': f"{minutes + i % 9} mins",
+                'steps': [{'step': n, 'instruction': f"Turn left onto {roads[(i + n) % len(roads)]}",
+                           'distance': f"{n * 0.7:.1f} km", 'duration': f"{n + 1} mins"} for n in range(1, 9)]
+            }
+        })
+    return entries
+
+
+def _measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def benchmark(count=20000):
+    """Compare memory per journey for dict entries, ``Journey`` objects and a ``JourneyTable``"""
+    entries, dict_bytes, _ = _measure(lambda: _synthetic_entries(count))
+    journeys, journey_bytes, elapsed = _measure(lambda: [Journey.from_entry(entry) for entry in entries])
+    print(f"dict entries:      {dict_bytes / count:7.0f} bytes per journey")
+    print(f"Journey objects:   {journey_bytes / count:7.0f} bytes per journey "
+          f"(converted in {elapsed / count * 1e6:.1f} µs each)")
+    
+    summaries = [Journey.from_entry({'timestamp': entry['timestamp'],
+                                     'data': {k: v for k, v in entry['data'].items() if k != 'steps'}})
+                 for entry in entries]
+    table, table_bytes, _ = _measure(lambda: JourneyTable(summaries))
+    print(f"JourneyTable rows: {table_bytes / count:7.0f} bytes per journey (without steps)")
+    
+    started = time.perf_counter()
+    total_by_parsing = sum(parse_distance(entry['data']['distance']) for entry in entries)
+    parse_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    total = table.total_distance_m()
+    table_ms = (time.perf_counter() - started) * 1000
+    print(f"total distance: {parse_ms:.1f} ms parsing strings, {table_ms:.1f} ms from the table "
+          f"({total / 1000:.0f} km, {'matches' if total == total_by_parsing else 'MISMATCH'})")
+    
+    # Round trip back to the stored layout
+    assert Journey.from_entry(journeys[0].to_entry()).to_entry() == journeys[0].to_entry()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Journey_model.py --bench")
@@ -0,0 +1,554 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+"""Offline shortest-path routing over a preprocessed OpenStreetMap road graph"""
+
+import os
+import re
+import sys
+import json
+import math
+import heapq
+import time
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from Directions_service import normalize_place
+from Journey_model import format_duration, format_distance
+
+EARTH_RADIUS_M = 6371000.0
+# Typical speeds by OSM highway class, km/h, when a way has no usable maxspeed
+HIGHWAY_SPEEDS = {
+    'motorway': 90, 'motorway_link': 50, 'trunk': 70, 'trunk_link': 40, 'primary': 50, 'primary_link': 35,
+    'secondary': 40, 'secondary_link': 30, 'tertiary': 35, 'tertiary_link': 25, 'unclassified': 25,
+    'residential': 25, 'living_street': 10, 'service': 15, 'road': 25
+}
+# Paths only usable on foot or by bike; stored with speed 0 so driving skips them
+NON_MOTOR_HIGHWAYS = ('footway', 'pedestrian', 'path', 'cycleway', 'steps', 'track')
+# Fixed speeds for modes that ignore the road's speed, km/h
+MODE_SPEEDS = {'walking': 5.0, 'bicycling': 15.0}
+# Bearing changes, in degrees, that read as a turn rather than carrying on
+SLIGHT_TURN_DEGREES = 30
+SHARP_TURN_DEGREES = 120
+COMPASS = ['north', 'northeast', 'east', 'southeast', 'south', 'southwest', 'west', 'northwest']
+
+# Default folder for the imported graph, relative to the working directory
+OFFLINE_GRAPH_DIR = 'offline_graph'
+GRAPH_ARRAYS = ('offsets', 'targets', 'lengths', 'speeds', 'names', 'lat', 'lon')
+# Landmarks for the ALT heuristic; more prune A* harder but cost preprocessing time and disk
+DEFAULT_LANDMARKS = 16
+# Stands in for "unreachable" in the landmark tables; larger than any real trip in seconds
+UNREACHABLE_S = 1e7
+COORDINATES_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+class OfflineRoutingError(RuntimeError):
+    """Raised when a route cannot be computed from the local graph"""
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _maxspeed(tags):
+    value = tags.get('maxspeed', '')
+    match = re.match(r'(\d+)\s*(mph)?', value)
+    if match:
+        return float(match.group(1)) * (1.609 if match.group(2) else 1.0)
+    return HIGHWAY_SPEEDS.get(tags.get('highway'))
+
+
+def write_graph(folder, lat, lon, edges, names, region=None, landmarks=DEFAULT_LANDMARKS):
+    """Write a CSR road graph, and its landmark tables, to ``folder``.
+
+    ``edges`` holds directed ``(source, target, length_m, speed_kmh, name_index)``
+    rows over node indices; ``names`` lists the street names they refer to.
+    A speed of 0 marks a direction cars may not use, such as the wrong way
+    down a one-way street; walking and cycling routes still may.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("NumPy is required for offline routing. Install with: pip install numpy")
+    os.makedirs(folder, exist_ok=True)
+    edges = np.asarray(edges, dtype=np.float64).reshape(-1, 5)
+    order = np.argsort(edges[:, 0], kind='stable')
+    edges = edges[order]
+    sources = edges[:, 0].astype(np.int64)
+    offsets = np.zeros(len(lat) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(lat)), out=offsets[1:])
+    arrays = {
+        'offsets': offsets,
+        'targets': edges[:, 1].astype(np.int32),
+        'lengths': edges[:, 2].astype(np.float32),
+        'speeds': edges[:, 3].astype(np.float32),
+        'names': edges[:, 4].astype(np.int32),
+        'lat': np.asarray(lat, dtype=np.float64),
+        'lon': np.asarray(lon, dtype=np.float64)
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(folder, name + '.npy'), array)
+    if landmarks:
+        distances_from, distances_to = landmark_tables(arrays, landmarks)
+        np.save(os.path.join(folder, 'landmark_from.npy'), distances_from)
+        np.save(os.path.join(folder, 'landmark_to.npy'), distances_to)
+    with open(os.path.join(folder, 'graph.json'), 'w', encoding='utf-8') as f:
+        json.dump({'region': region, 'nodes': len(lat), 'edges': len(edges), 'street_names': names},
+                  f, ensure_ascii=False)
+
+
+def landmark_tables(arrays, count):
+    """Driving seconds from and to ``count`` spread-out landmarks, as two (nodes, count) tables"""
+    lat, lon = arrays['lat'], arrays['lon']
+    node_count = len(lat)
+    x = (lon - lon.mean()) * math.cos(math.radians(float(lat.mean())))
+    y = lat - lat.mean()
+    # Farthest-point picks put the landmarks around the edge of the map, where they prune best
+    chosen = [int(np.argmax(x * x + y * y))]
+    nearest = np.full(node_count, np.inf)
+    for _ in range(min(count, node_count) - 1):
+        nearest = np.minimum(nearest, (x - x[chosen[-1]]) ** 2 + (y - y[chosen[-1]]) ** 2)
+        chosen.append(int(np.argmax(nearest)))
+    
+    offsets, targets = arrays['offsets'], arrays['targets']
+    with np.errstate(divide='ignore'):
+        weights = arrays['lengths'].astype(np.float64) * 3.6 / arrays['speeds']
+    sources = np.repeat(np.arange(node_count), np.diff(offsets))
+    order = np.argsort(targets, kind='stable')
+    reverse_offsets = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=node_count), out=reverse_offsets[1:])
+    
+    forward = (offsets.tolist(), targets.tolist(), weights.tolist())
+    backward = (reverse_offsets.tolist(), sources[order].tolist(), weights[order].tolist())
+    distances_from = np.empty((node_count, len(chosen)), dtype=np.float32)
+    distances_to = np.empty((node_count, len(chosen)), dtype=np.float32)
+    for column, landmark in enumerate(chosen):
+        distances_from[:, column] = _dijkstra(*forward, landmark)
+        # Searching the reversed graph gives the distance from every node to the landmark
+        distances_to[:, column] = _dijkstra(*backward, landmark)
+    return distances_from, distances_to
+
+
+def _dijkstra(offsets, targets, weights, source):
+    distances = [UNREACHABLE_S] * (len(offsets) - 1)
+    distances[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if cost > distances[node]:
+            continue
+        for edge in range(offsets[node], offsets[node + 1]):
+            new_cost = cost + weights[edge]
+            neighbour = targets[edge]
+            if new_cost < distances[neighbour]:
+                distances[neighbour] = new_cost
+                heapq.heappush(heap, (new_cost, neighbour))
+    return distances
+
+
+def import_osm(osm_file, folder, region=None):
+    """Preprocess an OSM XML extract into a CSR graph in ``folder``; returns (nodes, edges)"""
+    coordinates = {}
+    ways = []
+    # Stream the file; city extracts do not fit comfortably in a DOM
+    for _, element in ET.iterparse(osm_file, events=('end',)):
+        if element.tag == 'node':
+            coordinates[int(element.get('id'))] = (float(element.get('lat')), float(element.get('lon')))
+            element.clear()
+        elif element.tag == 'way':
+            tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+            highway = tags.get('highway')
+            speed = _maxspeed(tags) if highway in HIGHWAY_SPEEDS else (0 if highway in NON_MOTOR_HIGHWAYS else None)
+            if speed is not None:
+                refs = [int(nd.get('ref')) for nd in element.iter('nd')]
+                oneway = tags.get('oneway') in ('yes', '1', 'true') or tags.get('highway') == 'motorway'
+                reverse = tags.get('oneway') == '-1'
+                ways.append((refs[::-1] if reverse else refs, speed, tags.get('name') or tags.get('ref') or '',
+                             oneway or reverse))
+            element.clear()
+    
+    index = {}
+    lat, lon, edges = [], [], []
+    names = ['']
+    name_index = {'': 0}
+    
+    def node(osm_id):
+        if osm_id not in index:
+            index[osm_id] = len(lat)
+            lat.append(coordinates[osm_id][0])
+            lon.append(coordinates[osm_id][1])
+        return index[osm_id]
+    
+    for refs, speed, name, oneway in ways:
+        refs = [ref for ref in refs if ref in coordinates]
+        if name not in name_index:
+            name_index[name] = len(names)
+            names.append(name)
+        for a, b in zip(refs, refs[1:]):
+            length = haversine_m(*coordinates[a], *coordinates[b])
+            u, v = node(a), node(b)
+            edges.append((u, v, length, speed, name_index[name]))
+            edges.append((v, u, length, 0 if oneway else speed, name_index[name]))
+    
+    write_graph(folder, lat, lon, edges, names, region)
+    return len(lat), len(edges)
+
+
+class RoadGraph:
+    """A CSR road graph memory-mapped from the files ``write_graph`` produced.
+
+    Only the pages a query touches are read from disk, so opening a city
+    graph is instant and several processes share one copy in the page cache.
+    Driving queries use A* with landmark (ALT) lower bounds when the graph
+    has them, which settles far fewer nodes than straight-line distance.
+    """
+    
+    def __init__(self, folder):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy is required for offline routing. Install with: pip install numpy")
+        with open(os.path.join(folder, 'graph.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.folder = folder
+        self.region = meta.get('region')
+        self.street_names = meta['street_names']
+        for name in GRAPH_ARRAYS:
+            # Plain ndarray views of the mapping; slicing a np.memmap costs several times more
+            setattr(self, name, np.asarray(np.load(os.path.join(folder, name + '.npy'), mmap_mode='r')))
+        self.landmark_from = self.landmark_to = None
+        if os.path.exists(os.path.join(folder, 'landmark_from.npy')):
+            self.landmark_from = np.asarray(np.load(os.path.join(folder, 'landmark_from.npy'), mmap_mode='r'))
+            self.landmark_to = np.asarray(np.load(os.path.join(folder, 'landmark_to.npy'), mmap_mode='r'))
+        self.node_count = len(self.lat)
+        self.max_speed_ms = float(self.speeds.max()) / 3.6 if len(self.speeds) else 1.0
+        # Equirectangular projection around the graph's middle latitude, for a cheap A* heuristic
+        self._origin_lat = float(self.lat[self.node_count // 2]) if self.node_count else 0.0
+        self._x_scale = math.radians(1) * EARTH_RADIUS_M * math.cos(math.radians(self._origin_lat))
+        self._y_scale = math.radians(1) * EARTH_RADIUS_M
+        self._street_nodes = None
+        # (drivable only, arriving) -> boolean mask over nodes, built on first use
+        self._usable_nodes = {}
+        self._lock = threading.Lock()
+    
+    def usable_nodes(self, mode='driving', arriving=False):
+        """Nodes a ``mode`` trip can leave from, or arrive at with ``arriving``, as a boolean mask"""
+        key = (mode == 'driving', arriving)
+        with self._lock:
+            mask = self._usable_nodes.get(key)
+            if mask is None:
+                # Car-free directions (speed 0) only count for walking and cycling
+                usable = np.asarray(self.speeds) > 0 if key[0] else np.ones(len(self.speeds), dtype=bool)
+                if arriving:
+                    ends = np.asarray(self.targets)
+                else:
+                    ends = np.repeat(np.arange(self.node_count), np.diff(np.asarray(self.offsets)))
+                mask = self._usable_nodes[key] = np.bincount(ends, weights=usable, minlength=self.node_count) > 0
+        return mask
+    
+    def nearest_node(self, lat, lon, usable=None):
+        """Closest node to ``(lat, lon)`` and its distance in meters, among ``usable`` nodes when given"""
+        dx = (np.asarray(self.lon) - lon) * self._x_scale
+        dy = (np.asarray(self.lat) - lat) * self._y_scale
+        squared = dx * dx + dy * dy
+        if usable is not None:
+            squared = np.where(usable, squared, np.inf)
+        node = int(np.argmin(squared))
+        return node, math.sqrt(squared[node])
+    
+    def street_node(self, name):
+        """A node on the street called ``name``, or None"""
+        with self._lock:
+            if self._street_nodes is None:
+                first_edges = {}
+                names = np.asarray(self.names)
+                unique, first = np.unique(names, return_index=True)
+                for name_index, edge in zip(unique.tolist(), first.tolist()):
+                    first_edges[normalize_place(self.street_names[name_index])] = edge
+                # Source node of each street's first edge
+                sources = np.searchsorted(np.asarray(self.offsets), list(first_edges.values()), side='right') - 1
+                self._street_nodes = dict(zip(first_edges, sources.tolist()))
+        return self._street_nodes.get(normalize_place(name))
+    
+    def shortest_path(self, source, target, speed_ms=None):
+        """A* from ``source`` to ``target``; returns the edge indices along the path.
+
+        Weights are travel seconds at each road's speed, or at ``speed_ms``
+        for every road when given.
+        """
+        if source == target:
+            return []
+        offsets, targets, lengths, speeds = self.offsets, self.targets, self.lengths, self.speeds
+        estimate = self._lower_bounds(target, speed_ms)
+        
+        best = {source: 0.0}
+        via = {source: -1}
+        bounds = {}
+        done = set()
+        # Ties on the estimate go to the node furthest along, which keeps A* off equal-cost plateaus
+        heap = [(estimate([source])[0], -0.0, source)]
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            cost = -cost
+            if node == target:
+                break
+            if node in done:
+                continue
+            done.add(node)
+            start, end = int(offsets[node]), int(offsets[node + 1])
+            if start == end:
+                continue
+            if speed_ms:
+                weights = (lengths[start:end] / speed_ms).tolist()
+            else:
+                with np.errstate(divide='ignore'):
+                    # Car-free directions come out as infinity and are never taken
+                    weights = (lengths[start:end] * 3.6 / speeds[start:end]).tolist()
+            improved = []
+            for i, neighbour in enumerate(targets[start:end].tolist()):
+                if neighbour in done:
+                    continue
+                new_cost = cost + weights[i]
+                if new_cost < best.get(neighbour, math.inf):
+                    best[neighbour] = new_cost
+                    via[neighbour] = start + i
+                    improved.append(neighbour)
+            # Bounds for newly seen nodes are computed together, one vectorized call per expansion
+            unseen = [neighbour for neighbour in improved if neighbour not in bounds]
+            if unseen:
+                bounds.update(zip(unseen, estimate(unseen)))
+            for neighbour in improved:
+                heapq.heappush(heap, (best[neighbour] + bounds[neighbour], -best[neighbour], neighbour))
+        else:
+            raise OfflineRoutingError("No route found between the specified locations in the offline map")
+        
+        path = []
+        node = target
+        while via[node] != -1:
+            edge = via[node]
+            path.append(edge)
+            node = self.edge_source(edge)
+        path.reverse()
+        return path
+    
+    def _lower_bounds(self, target, speed_ms=None):
+        """Function giving admissible seconds-to-``target`` estimates for a list of nodes"""
+        lat, lon = self.lat, self.lon
+        x_scale, y_scale = self._x_scale, self._y_scale
+        goal_x, goal_y = float(lon[target]) * x_scale, float(lat[target]) * y_scale
+        top_speed = speed_ms or self.max_speed_ms
+        use_landmarks = self.landmark_from is not None and speed_ms is None
+        if use_landmarks:
+            from_target = self.landmark_from[target]
+            to_target = self.landmark_to[target]
+        
+        def estimate(nodes):
+            nodes = np.asarray(nodes)
+            bound = np.hypot(lon[nodes] * x_scale - goal_x, lat[nodes] * y_scale - goal_y) / top_speed
+            if use_landmarks:
+                # Triangle inequality: d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) - d(t, L)
+                bound = np.maximum(bound, (from_target - self.landmark_from[nodes]).max(axis=1))
+                bound = np.maximum(bound, (self.landmark_to[nodes] - to_target).max(axis=1))
+            return bound.tolist()
+        return estimate
+    
+    def edge_source(self, edge):
+        return int(np.searchsorted(self.offsets, edge, side='right')) - 1
+    
+    def bearing(self, a, b):
+        dx = (float(self.lon[b]) - float(self.lon[a])) * self._x_scale
+        dy = (float(self.lat[b]) - float(self.lat[a])) * self._y_scale
+        return math.degrees(math.atan2(dx, dy)) % 360
+
+
+def _turn(change):
+    change = (change + 180) % 360 - 180
+    if abs(change) < SLIGHT_TURN_DEGREES:
+        return 'Continue onto'
+    side = 'right' if change > 0 else 'left'
+    if abs(change) > SHARP_TURN_DEGREES:
+        return f'Make a sharp {side} onto'
+    return f'Turn {side} onto'
+
+
+class OfflineRouter:
+    """Directions from the local graph, in the same ``directions_data`` shape as the Google path.
+
+    Places resolve from ``"lat,lng"`` text, then the optional ``geocoder``
+    (a callable returning ``(lat, lng)`` or None), then street names in the map.
+    """
+    
+    def __init__(self, graph, geocoder=None, max_snap_m=2000):
+        self.graph = graph if isinstance(graph, RoadGraph) else RoadGraph(graph)
+        self.geocoder = geocoder
+        self.max_snap_m = max_snap_m
+    
+    def resolve(self, place, mode='driving', arriving=False):
+        """Node for ``place`` that a ``mode`` trip can leave from, or arrive at with ``arriving``"""
+        usable = self.graph.usable_nodes(mode, arriving)
+        match = COORDINATES_RE.match(place or '')
+        coordinates = (float(match.group(1)), float(match.group(2))) if match else None
+        if coordinates is None and self.geocoder is not None:
+            coordinates = self.geocoder(place)
+        if coordinates is None:
+            # "MI Road, Jaipur" -> try the street part on its own as well
+            for candidate in (place, (place or '').split(',')[0]):
+                node = self.graph.street_node(candidate)
+                if node is not None:
+                    if usable[node]:
+                        return node
+                    # A footway's name, say, when driving: use the nearest road the mode can take instead
+                    coordinates = (float(self.graph.lat[node]), float(self.graph.lon[node]))
+                    break
+            else:
+                raise OfflineRoutingError(f"Could not find {place} in the offline map")
+        
+        node, distance = self.graph.nearest_node(*coordinates, usable=usable)
+        if distance > self.max_snap_m:
+            raise OfflineRoutingError(f"{place} is not within {self.max_snap_m} m of a road usable for {mode} "
+                                      f"in the offline map")
+        return node
+    
+    def route(self, origin, destination, mode='driving'):
+        if mode not in ('driving', 'walking', 'bicycling'):
+            raise OfflineRoutingError(f"Offline routing does not support {mode}")
+        speed_ms = MODE_SPEEDS[mode] / 3.6 if mode in MODE_SPEEDS else None
+        source, target = self.resolve(origin, mode), self.resolve(destination, mode, arriving=True)
+        path = self.graph.shortest_path(source, target, speed_ms)
+        return self.directions_data(path, origin, destination, mode, speed_ms)
+    
+    def directions_data(self, path, origin, destination, mode, speed_ms=None):
+        graph = self.graph
+        steps = []
+        total_seconds = total_meters = 0.0
+        previous_bearing = None
+        for edge in path:
+            length = float(graph.lengths[edge])
+            seconds = length / speed_ms if speed_ms else length * 3.6 / float(graph.speeds[edge])
+            name = graph.street_names[int(graph.names[edge])] or 'the road'
+            source = graph.edge_source(edge)
+            bearing = graph.bearing(source, int(graph.targets[edge]))
+            # Consecutive edges of one street make a single step
+            if steps and steps[-1]['name'] == name:
+                steps[-1]['meters'] += length
+                steps[-1]['seconds'] += seconds
+            else:
+                if previous_bearing is None:
+                    instruction = f"Head {COMPASS[round(bearing / 45) % 8]} on {name}"
+                else:
+                    instruction = f"{_turn(bearing - previous_bearing)} {name}"
+                steps.append({'name': name, 'instruction': instruction, 'meters': length, 'seconds': seconds})
+            previous_bearing = bearing
+            total_seconds += seconds
+            total_meters += length
+        
+        return {
+            'origin': origin,
+            'destination': destination,
+            'mode': mode,
+            'duration': format_duration(total_seconds),
+            'distance': format_distance(total_meters),
+            'duration_in_traffic': 'N/A',
+            'duration_value': round(total_seconds),
+            'distance_value': round(total_meters),
+            'duration_in_traffic_value': None,
+            'offline': True,
+            'steps': [
+                {
+                    'step': i,
+                    'instruction': step['instruction'],
+                    'distance': format_distance(step['meters']),
+                    'duration': format_duration(step['seconds']),
+                    'duration_value': round(step['seconds']),
+                    'distance_value': round(step['meters'])
+                }
+                for i, step in enumerate(steps, 1)
+            ]
+        }
+
+
+def synthetic_city(folder, size=400, spacing_m=120, seed=11):
+    """Write a ``size`` x ``size`` street grid with arterials and one-way streets, about a city's worth of nodes"""
+    rng = np.random.default_rng(seed)
+    lat0, lon0 = 26.85, 75.75
+    rows, cols = np.divmod(np.arange(size * size), size)
+    jitter = rng.normal(0, spacing_m * 0.08, (2, size * size))
+    lat = lat0 + (rows * spacing_m + jitter[0]) / 111320.0
+    lon = lon0 + (cols * spacing_m + jitter[1]) / (111320.0 * math.cos(math.radians(lat0)))
+    
+    names = [''] + [f"Street {i}" for i in range(size)] + [f"Avenue {i}" for i in range(size)]
+    edges = []
+    node = np.arange(size * size).reshape(size, size)
+    for horizontal in (True, False):
+        a = node[:, :-1] if horizontal else node[:-1, :]
+        b = node[:, 1:] if horizontal else node[1:, :]
+        line = np.broadcast_to(np.arange(size)[:, None] if horizontal else np.arange(size)[None, :], a.shape)
+        # Every tenth line is a fast arterial; a third of the others are one-way
+        speed = np.where(line % 10 == 0, 60.0, 30.0)
+        name = (1 + line) if horizontal else (1 + size + line)
+        a, b, speed, name, line = a.ravel(), b.ravel(), speed.ravel(), name.ravel(), line.ravel()
+        length = np.hypot((lat[a] - lat[b]) * 111320.0,
+                          (lon[a] - lon[b]) * 111320.0 * math.cos(math.radians(lat0)))
+        edges.append(np.stack([a, b, length, speed, name], axis=1))
+        one_way = (line % 3 == 1) & (line % 10 != 0)
+        edges.append(np.stack([b, a, length, np.where(one_way, 0.0, speed), name], axis=1))
+    write_graph(folder, lat, lon, np.concatenate(edges), names, region='Synthetic city')
+    return lat, lon
+
+
+def benchmark(size=400, queries=50):
+    """Query latency on a synthetic city-sized graph (160k nodes by default)"""
+    with tempfile.TemporaryDirectory() as folder:
+        started = time.perf_counter()
+        lat, lon = synthetic_city(folder, size)
+        print(f"built {size * size} node graph in {time.perf_counter() - started:.2f}s")
+        
+        started = time.perf_counter()
+        router = OfflineRouter(folder)
+        print(f"opened (memory-mapped) in {(time.perf_counter() - started) * 1000:.1f} ms, "
+              f"{router.graph.node_count} nodes, {len(router.graph.targets)} edges")
+        
+        rng = np.random.default_rng(3)
+        pairs = rng.integers(0, len(lat), (queries, 2))
+        timings = []
+        for a, b in pairs:
+            started = time.perf_counter()
+            directions_data = router.route(f"{lat[a]:.6f},{lon[a]:.6f}", f"{lat[b]:.6f},{lon[b]:.6f}")
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        print(f"{queries} cross-city queries: p50 {timings[len(timings) // 2] * 1000:.0f} ms, "
+              f"p95 {timings[int(len(timings) * 0.95)] * 1000:.0f} ms, max {timings[-1] * 1000:.0f} ms")
+        print(f"last route: {directions_data['distance']}, {directions_data['duration']}, "
+              f"{len(directions_data['steps'])} steps")
+        del router
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+        return
+    
+    if len(sys.argv) > 2 and sys.argv[1] == '--import':
+        folder = sys.argv[3] if len(sys.argv) > 3 else OFFLINE_GRAPH_DIR
+        nodes, edges = import_osm(sys.argv[2], folder, region=os.path.basename(sys.argv[2]))
+        print(f"Wrote {nodes} nodes and {edges} edges to {folder}")
+        return
+    
+    if len(sys.argv) < 3:
+        print("Usage: python Offline_router.py ORIGIN DESTINATION [mode] | --import region.osm [folder] | --bench")
+        return
+    
+    router = OfflineRouter(OFFLINE_GRAPH_DIR)
+    directions_data = router.route(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else 'driving')
+    print(f"{directions_data['distance']}, {directions_data['duration']}")
+    for step in directions_data['steps']:
+        print(f"  {step['step']}. {step['instruction']} ({step['distance']})")
+
+
+if __name__ == '__main__':
+    main()
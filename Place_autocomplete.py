@@ -0,0 +1,269 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import time
+import uuid
+import heapq
+import bisect
+import threading
+from PyQt5.QtWidgets import QCompleter
+from PyQt5.QtCore import Qt, QObject, QTimer, QStringListModel, pyqtSignal
+
+from Geocode_cache import place_key
+
+DEFAULT_SUGGESTIONS = 8
+# Quiet time after the last keystroke before asking the Places API
+REMOTE_DEBOUNCE_MS = 350
+MIN_REMOTE_CHARS = 3
+# Word starts a lookup ranks in full; prefixes matching more keep their best keys ranked in advance
+SCAN_LIMIT = 512
+# Length of those precomputed lists, and so the most suggestions they can answer
+TOP_SUGGESTIONS = 16
+
+
+def word_suffixes(key):
+    """``key`` from each of its word starts on: "jaipur airport" gives itself and "airport" too"""
+    words = key.split(' ')
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    """Sorted prefix index over known addresses, ranked by how often each was used.
+
+    Every word start of an address is a key, so "airport" finds
+    "Jaipur Airport". A lookup is two binary searches for the range of
+    matching keys, and only that range is ranked. Short or common prefixes
+    ("s", "jaipur") match thousands of keys, so their best keys are kept
+    ranked in advance instead.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+    
+    def clear(self):
+        with self._lock:
+            # place key -> [display text, uses]
+            self._entries = {}
+            # Text from each word start of each key, sorted, and the key it belongs to
+            self._suffixes = []
+            self._suffix_keys = []
+            # Prefix matching more than SCAN_LIMIT word starts -> its best keys, in order
+            self._top = {}
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def add(self, address, count=1):
+        """Record ``count`` more uses of ``address``; 0 just makes it known"""
+        key = place_key(address)
+        if not key:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] += count
+            else:
+                self._entries[key] = [address.strip(), count]
+                for suffix in word_suffixes(key):
+                    position = bisect.bisect_right(self._suffixes, suffix)
+                    self._suffixes.insert(position, suffix)
+                    self._suffix_keys.insert(position, key)
+            self._promote(key)
+    
+    def extend(self, addresses, count=1):
+        """Add many addresses at once, sorting the keys a single time"""
+        with self._lock:
+            added = []
+            for address in addresses:
+                key = place_key(address)
+                if not key:
+                    continue
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry[1] += count
+                    continue
+                self._entries[key] = [address.strip(), count]
+                added.extend((suffix, key) for suffix in word_suffixes(key))
+            if added:
+                pairs = sorted(list(zip(self._suffixes, self._suffix_keys)) + added)
+                self._suffixes = [suffix for suffix, _ in pairs]
+                self._suffix_keys = [key for _, key in pairs]
+            self._build_top()
+    
+    def complete(self, text, limit=DEFAULT_SUGGESTIONS):
+        """Up to ``limit`` known addresses matching ``text``, most used first"""
+        prefix = place_key(text)
+        if not prefix:
+            return []
+        with self._lock:
+            best = self._top.get(prefix) if limit <= TOP_SUGGESTIONS else None
+            if best is None:
+                start = bisect.bisect_left(self._suffixes, prefix)
+                end = bisect.bisect_left(self._suffixes, prefix + '\U0010ffff', start)
+                if end - start > SCAN_LIMIT and limit <= TOP_SUGGESTIONS:
+                    # Grown past the limit through ``add``; ranked once here, then kept up to date
+                    best = self._top[prefix] = self._ranked(prefix, start, end, TOP_SUGGESTIONS)
+                else:
+                    best = self._ranked(prefix, start, end, limit)
+            return [self._entries[key][0] for key in best[:limit]]
+    
+    def _rank(self, prefix):
+        # Most used first; among equals, addresses that start with the text, then shorter ones
+        return lambda key: (-self._entries[key][1], not key.startswith(prefix), len(key), key)
+    
+    def _ranked(self, prefix, start, end, limit):
+        return heapq.nsmallest(limit, set(self._suffix_keys[start:end]), key=self._rank(prefix))
+    
+    def _build_top(self):
+        """Rank the best keys of every prefix matching more than SCAN_LIMIT word starts"""
+        suffixes = self._suffixes
+        self._top = {}
+        # Runs of suffixes sharing their first ``depth`` characters
+        runs = [(0, len(suffixes), 0)]
+        while runs:
+            start, end, depth = runs.pop()
+            i = start
+            while i < end:
+                if len(suffixes[i]) == depth:
+                    # The run's prefix as a whole word; it sorts before everything longer
+                    i = bisect.bisect_right(suffixes, suffixes[i], i, end)
+                    continue
+                prefix = suffixes[i][:depth + 1]
+                run_end = bisect.bisect_left(suffixes, prefix + '\U0010ffff', i, end)
+                if run_end - i > SCAN_LIMIT:
+                    self._top[prefix] = self._ranked(prefix, i, run_end, TOP_SUGGESTIONS)
+                    runs.append((i, run_end, depth + 1))
+                i = run_end
+    
+    def _promote(self, key):
+        # Uses only grow, so ``key`` is the one key whose place in the ranked lists can change
+        for suffix in word_suffixes(key):
+            for length in range(1, len(suffix) + 1):
+                best = self._top.get(suffix[:length])
+                if best is None:
+                    continue
+                if key not in best:
+                    best.append(key)
+                best.sort(key=self._rank(suffix[:length]))
+                del best[TOP_SUGGESTIONS:]
+
+
+class PlaceCompleter(QObject):
+    """Attach as-you-type suggestions from a ``PrefixIndex`` to a QLineEdit.
+
+    Local matches are shown straight from the keystroke. When there are
+    none, ``remote_requested(text, session_token)`` is emitted once typing
+    pauses; the owner fetches remote suggestions and passes them to
+    ``show_remote``. ``remote_cancelled`` is emitted when a pending remote
+    lookup is no longer wanted.
+    """
+    
+    remote_requested = pyqtSignal(str, str)
+    remote_cancelled = pyqtSignal()
+    
+    def __init__(self, line_edit, index, limit=DEFAULT_SUGGESTIONS, debounce_ms=REMOTE_DEBOUNCE_MS,
+                 min_remote_chars=MIN_REMOTE_CHARS):
+        super().__init__(line_edit)
+        self.line_edit = line_edit
+        self.index = index
+        self.limit = limit
+        self.min_remote_chars = min_remote_chars
+        self.remote_pending = False
+        # Groups the autocomplete requests of one search for Places billing
+        self.session_token = uuid.uuid4().hex
+        
+        self.model = QStringListModel(self)
+        self.completer = QCompleter(self.model, self)
+        # The index already filtered and ranked the list; show it as is
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.completer.setMaxVisibleItems(limit)
+        self.completer.setWidget(line_edit)
+        self.completer.activated[str].connect(self.on_activated)
+        
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.on_typing_paused)
+        line_edit.textEdited.connect(self.on_text_edited)
+    
+    def on_text_edited(self, text):
+        self.timer.stop()
+        if self.remote_pending:
+            self.remote_pending = False
+            self.remote_cancelled.emit()
+        
+        suggestions = self.index.complete(text, self.limit)
+        if suggestions:
+            self.show_suggestions(suggestions)
+            return
+        self.completer.popup().hide()
+        if len(text.strip()) >= self.min_remote_chars:
+            self.timer.start()
+    
+    def on_typing_paused(self):
+        self.remote_pending = True
+        self.remote_requested.emit(self.line_edit.text(), self.session_token)
+    
+    def show_remote(self, text, suggestions):
+        """Show remote suggestions for ``text`` unless the input has moved on"""
+        self.remote_pending = False
+        if text != self.line_edit.text() or not suggestions:
+            return
+        for suggestion in suggestions:
+            # Known for the rest of the session, ranked below places actually used
+            self.index.add(suggestion, count=0)
+        self.show_suggestions(suggestions[:self.limit])
+    
+    def show_suggestions(self, suggestions):
+        self.model.setStringList(suggestions)
+        self.completer.complete()
+    
+    def on_activated(self, text):
+        self.line_edit.setText(text)
+        # A chosen suggestion ends the Places session
+        self.session_token = uuid.uuid4().hex
+
+
+def benchmark(places=6000, lookups=5000):
+    """Time index builds and lookups over a history-sized set of addresses"""
+    import random
+    
+    rng = random.Random(3)
+    localities = ["Vidyadhar Nagar", "Malviya Nagar", "Vaishali Nagar", "Mansarovar", "Raja Park", "Jagatpura",
+                  "Sitapura", "C Scheme", "Bani Park", "Sodala", "Tonk Phatak", "Shastri Nagar", "Jaipur Airport",
+                  "Hawa Mahal", "Amer Fort", "World Trade Park", "Sindhi Camp", "MI Road", "Tonk Road"]
+    addresses = [f"{rng.randint(1, 400)}, {rng.choice(localities)}, Sector {rng.randint(1, 30)}, Jaipur, Rajasthan"
+                 for _ in range(places)] + [f"{locality}, Jaipur" for locality in localities] * 20
+    
+    index = PrefixIndex()
+    started = time.perf_counter()
+    index.extend(addresses)
+    print(f"built from {len(addresses)} addresses ({len(index)} distinct) in "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms")
+    started = time.perf_counter()
+    for i in range(200):
+        index.add(f"{i}, New Colony {i}, Jaipur")
+    print(f"add: {(time.perf_counter() - started) / 200 * 1000:.3f} ms")
+    
+    typed = [locality[:length].lower() for locality in localities for length in (1, 2, 3, 5, 8)]
+    typed += ["sector 1", "12, ", "jaipur a", "tonk", "nagar"]
+    timings = []
+    for i in range(lookups):
+        started = time.perf_counter()
+        index.complete(typed[i % len(typed)])
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"complete: p50 {timings[len(timings) // 2] * 1000:.3f} ms  p99 {timings[int(len(timings) * 0.99)] * 1000:.3f} ms  "
+          f"max {timings[-1] * 1000:.3f} ms")
+    for text in ("mal", "airport", "s"):
+        print(f"  {text!r}: {index.complete(text, 3)}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Place_autocomplete.py --bench")
@@ -0,0 +1,266 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import time
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime
+
+SYSTEM_PROMPT = """You are an expert travel assistant with access to real-time journey data and user history.
+        You have detailed knowledge of:
+        - Travel routes, transportation options, and traffic patterns
+        - Local attractions, restaurants, and accommodations
+        - Weather conditions and seasonal travel tips
+        - Budget planning and cost-effective travel options
+        - Cultural insights and local customs
+        - Safety tips and travel advisories
+
+        Provide helpful, accurate, and personalized travel advice based on the user's location data and journey history.
+        Be conversational, friendly, and specific in your recommendations. Use the journey data to give contextual advice."""
+
+HISTORY_HEADER = "\nUSER'S RECENT JOURNEY HISTORY:\n"
+HISTORY_FOOTER = ("\nUse this travel pattern to suggest personalized recommendations, "
+                  "identify frequent routes, suggest optimizations, or recommend new destinations.")
+
+RELEVANT_HEADER = "\nRELEVANT PAST JOURNEYS AND CONVERSATIONS:\n"
+RELEVANT_FOOTER = ("\nThese records matched the current question; use them to compare with past trips "
+                   "or earlier advice where they help.")
+
+RESPONSE_INSTRUCTION = "\nYour response should be helpful, specific, and based on the travel data provided above:"
+
+HISTORY_JOURNEYS = 10
+HISTORY_MESSAGES = 6
+DEFAULT_TOKEN_BUDGET = 4000
+
+
+def estimate_tokens(text):
+    """Rough token count: about four characters per token for English text"""
+    return (len(text) + 3) // 4
+
+
+def format_journey_line(journey):
+    """One journey of the history block, without its list number"""
+    data = journey.get('data', {})
+    timestamp = journey.get('timestamp', '')
+    if timestamp:
+        try:
+            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            time_str = dt.strftime("%Y-%m-%d %H:%M")
+        except ValueError:
+            time_str = timestamp[:16]
+    else:
+        time_str = "Unknown time"
+    
+    return (f"{time_str}: {data.get('origin', 'Unknown')} → {data.get('destination', 'Unknown')} "
+            f"({data.get('mode', 'unknown')}, {data.get('duration', 'Unknown duration')})\n")
+
+
+def format_recent_journey(journey):
+    return f"""
+MOST RECENT JOURNEY:
+- Origin: {journey.get('origin', 'Unknown')}
+- Destination: {journey.get('destination', 'Unknown')}
+- Travel Mode: {journey.get('mode', 'Unknown')}
+- Duration: {journey.get('duration', 'Unknown')}
+- Distance: {journey.get('distance', 'Unknown')}
+- Traffic Duration: {journey.get('duration_in_traffic', 'N/A')}
+
+Use this journey information to provide relevant travel advice, alternative routes, nearby attractions,
+dining options, or any other contextual recommendations."""
+
+
+class ContextBuilder:
+    """Gemini prompt context kept up to date across messages.
+
+    The system prompt, the most recent journey and each history line are
+    rendered once, when they change. ``build`` only joins cached pieces, so
+    its cost does not depend on how much history the user has. Pieces are
+    dropped oldest-first when the prompt would exceed ``token_budget``.
+    """
+    
+    def __init__(self, token_budget=DEFAULT_TOKEN_BUDGET, journey_limit=HISTORY_JOURNEYS,
+                 message_limit=HISTORY_MESSAGES):
+        self.token_budget = token_budget
+        self.message_limit = message_limit
+        self._lock = threading.Lock()
+        self._system_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(RESPONSE_INSTRUCTION)
+        self._recent = None
+        # (line, tokens) for the newest journeys, oldest first
+        self._journey_lines = deque(maxlen=journey_limit)
+        # Rendered history block covering every line above, rebuilt after a change
+        self._history_block = None
+        self._fingerprint = None
+    
+    def reset(self):
+        with self._lock:
+            self._recent = None
+            self._journey_lines.clear()
+            self._changed()
+    
+    def set_journeys(self, journeys):
+        """Start over from a user's saved journeys, oldest first"""
+        with self._lock:
+            self._journey_lines.clear()
+            for journey in journeys[-self._journey_lines.maxlen:]:
+                self._add_line(journey)
+            self._changed()
+    
+    def add_journey(self, journey):
+        """Account for a journey that was just saved"""
+        with self._lock:
+            self._add_line(journey)
+            self._changed()
+    
+    def set_recent_journey(self, directions_data):
+        with self._lock:
+            if directions_data:
+                text = format_recent_journey(directions_data)
+                self._recent = (text, estimate_tokens(text))
+            else:
+                self._recent = None
+            self._changed()
+    
+    def fingerprint(self):
+        """Digest of the journey context; changes whenever that part of the prompt does"""
+        with self._lock:
+            if self._fingerprint is None:
+                digest = hashlib.sha1()
+                if self._recent is not None:
+                    digest.update(self._recent[0].encode('utf-8'))
+                for line, _ in self._journey_lines:
+                    digest.update(line.encode('utf-8'))
+                self._fingerprint = digest.hexdigest()
+            return self._fingerprint
+    
+    def build(self, message, conversation_history=(), summary=None, relevant=None):
+        """Full prompt for ``message``, within the token budget where possible.
+
+        ``summary`` is the rolling summary of turns older than ``conversation_history``.
+        ``relevant`` lists history records retrieved for this question, best first;
+        when given they take the place of the recent-journeys block.
+        """
+        question = f"\nCURRENT USER QUESTION: {message}"
+        recent_messages = list(conversation_history[-self.message_limit:]) if self.message_limit else []
+        
+        with self._lock:
+            recent = self._recent
+            journey_lines = list(self._journey_lines)
+            if self._history_block is None and journey_lines:
+                self._history_block = _render_history([line for line, _ in journey_lines])
+            history_block = self._history_block
+        
+        # The system prompt and the question always go in; the rest fills what is left
+        remaining = self.token_budget - self._system_tokens - estimate_tokens(question)
+        if recent is not None:
+            if recent[1] <= remaining:
+                remaining -= recent[1]
+            else:
+                recent = None
+        
+        # Newest conversation lines first, then the summary, then retrieved records or newest journeys
+        kept_messages = []
+        for line in reversed(recent_messages):
+            tokens = estimate_tokens(line) + 1
+            if tokens > remaining:
+                break
+            kept_messages.append(line)
+            remaining -= tokens
+        kept_messages.reverse()
+        
+        # Then the summary of older turns, whole or not at all
+        summary_block = f"\nEARLIER CONVERSATION SUMMARY:\n{summary}" if summary else None
+        if summary_block is not None:
+            summary_tokens = estimate_tokens(summary_block)
+            if summary_tokens <= remaining:
+                remaining -= summary_tokens
+            else:
+                summary_block = None
+        
+        relevant_block = None
+        if relevant:
+            available = remaining - estimate_tokens(RELEVANT_HEADER + RELEVANT_FOOTER)
+            kept_relevant = []
+            for line in relevant:
+                tokens = estimate_tokens(line) + 2
+                if tokens > available:
+                    break
+                kept_relevant.append(line)
+                available -= tokens
+            if kept_relevant:
+                relevant_block = RELEVANT_HEADER + ''.join(f"- {line}\n" for line in kept_relevant) + RELEVANT_FOOTER
+                remaining = available
+                journey_lines = []
+        
+        history_tokens = estimate_tokens(HISTORY_HEADER + HISTORY_FOOTER)
+        kept_lines = []
+        if journey_lines and history_tokens <= remaining:
+            remaining -= history_tokens
+            for line, tokens in reversed(journey_lines):
+                if tokens > remaining:
+                    break
+                kept_lines.append(line)
+                remaining -= tokens
+            kept_lines.reverse()
+        
+        context_parts = [SYSTEM_PROMPT]
+        if recent is not None:
+            context_parts.append(recent[0])
+        if kept_lines:
+            # Only a history cut short by the budget needs rendering again
+            if len(kept_lines) < len(journey_lines):
+                history_block = _render_history(kept_lines)
+            context_parts.append(history_block)
+        if relevant_block is not None:
+            context_parts.append(relevant_block)
+        if summary_block is not None:
+            context_parts.append(summary_block)
+        if kept_messages:
+            context_parts.append("\nPREVIOUS CONVERSATION CONTEXT:")
+            context_parts.extend(kept_messages)
+        context_parts.append(question)
+        context_parts.append(RESPONSE_INSTRUCTION)
+        return "\n".join(context_parts)
+    
+    def _changed(self):
+        self._history_block = None
+        self._fingerprint = None
+    
+    def _add_line(self, journey):
+        line = format_journey_line(journey)
+        # Allow for the list number added when the block is assembled
+        self._journey_lines.append((line, estimate_tokens(line) + 1))
+
+
+def _render_history(lines):
+    numbered = ''.join(f"{idx}. {line}" for idx, line in enumerate(lines, 1))
+    return HISTORY_HEADER + numbered + HISTORY_FOOTER
+
+
+def benchmark(history_sizes=(10, 1000, 100000), repeats=1000):
+    """Time prompt assembly as the journey history grows"""
+    for size in history_sizes:
+        journeys = [
+            {'timestamp': f"2025-01-{i % 28 + 1:02d}T08:{i % 60:02d}:00",
+             'data': {'origin': f"Origin {i}, Jaipur", 'destination': f"Destination {i}, Jaipur",
+                      'mode': 'driving', 'duration': f"{10 + i % 50} mins"}}
+            for i in range(size)
+        ]
+        conversation = [f"User: question {i}" if i % 2 == 0 else f" AI: answer {i}" for i in range(size)]
+        
+        builder = ContextBuilder()
+        builder.set_journeys(journeys)
+        builder.set_recent_journey(journeys[-1]['data'])
+        started = time.perf_counter()
+        for _ in range(repeats):
+            prompt = builder.build("How long is my usual commute?", conversation)
+        elapsed = (time.perf_counter() - started) / repeats * 1000
+        print(f"history={size:6d}: {elapsed:.3f} ms per prompt, ~{estimate_tokens(prompt)} tokens")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Prompt_context.py --bench")
@@ -0,0 +1,66 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``"""
+    
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+    
+    def try_acquire(self, tokens=1):
+        """Take ``tokens`` if available right now"""
+        acquired, _ = self._poll(tokens, None, None)
+        return acquired
+    
+    def acquire(self, tokens=1, cancel_event=None, timeout=None):
+        """Block until ``tokens`` are available; False if cancelled or timed out"""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            acquired, wait = self._poll(tokens, cancel_event, deadline)
+            if wait is None:
+                return acquired
+            self._sleep(wait)
+    
+    async def acquire_async(self, tokens=1, cancel_event=None, timeout=None):
+        """``acquire`` for coroutines: waits with ``asyncio.sleep`` so the event loop keeps running"""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            acquired, wait = self._poll(tokens, cancel_event, deadline)
+            if wait is None:
+                return acquired
+            await asyncio.sleep(wait)
+    
+    def _poll(self, tokens, cancel_event, deadline):
+        """``(True, None)`` when ``tokens`` were taken, ``(False, None)`` to give up, else ``(False, wait)``"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True, None
+            wait = (tokens - self._tokens) / self.rate
+        
+        if cancel_event is not None and cancel_event.is_set():
+            return False, None
+        if deadline is not None:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return False, None
+            wait = min(wait, remaining)
+        # Wake up periodically so cancellation is noticed promptly
+        return False, min(wait, 0.1)
+    
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
@@ -0,0 +1,123 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import re
+import math
+import time
+import zlib
+import threading
+from collections import OrderedDict
+
+RESPONSE_TTL = 6 * 3600
+NGRAM_SIZE = 3
+# Cosine similarity at which two prompts count as the same question
+NEAR_DUPLICATE_THRESHOLD = 0.92
+VECTOR_DIMENSIONS = 1 << 14
+
+NUMBER_RE = re.compile(r'\d+')
+
+
+def normalize_prompt(text):
+    """Lower-case and collapse whitespace and trailing punctuation"""
+    text = re.sub(r'\s+', ' ', (text or '').lower())
+    return text.strip(' ?!.,')
+
+
+def prompt_vector(text, ngram_size=NGRAM_SIZE, dimensions=VECTOR_DIMENSIONS):
+    """Unit-length sparse vector of hashed words and character n-grams"""
+    counts = {}
+    features = text.split()
+    padded = f" {text} "
+    features.extend(padded[i:i + ngram_size] for i in range(len(padded) - ngram_size + 1))
+    for feature in features:
+        # crc32 is stable across runs, unlike hash() on str
+        index = zlib.crc32(feature.encode('utf-8')) % dimensions
+        counts[index] = counts.get(index, 0) + 1
+    norm = math.sqrt(sum(value * value for value in counts.values())) or 1.0
+    return {index: value / norm for index, value in counts.items()}
+
+
+def cosine_similarity(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+
+class ResponseCache:
+    """LRU cache of AI replies keyed on the normalized prompt and a context fingerprint.
+
+    Exact repeats always hit. With ``similarity_threshold`` set, a prompt
+    whose hashed n-gram vector is at least that cosine-similar to a cached
+    prompt with the same fingerprint also hits, provided both mention the
+    same numbers ("platform 5" must not answer "platform 6").
+    """
+    
+    def __init__(self, max_entries=200, ttl=RESPONSE_TTL, similarity_threshold=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        # (normalized prompt, fingerprint) -> (response, stored_at, vector)
+        self._entries = OrderedDict()
+    
+    def get(self, prompt, fingerprint=None, now=None):
+        """Cached reply for ``prompt`` in this context, or None"""
+        now = now or time.time()
+        key = (normalize_prompt(prompt), fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry[0]
+            
+            if self.similarity_threshold is not None:
+                match = self._nearest(key, now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.near_hits += 1
+                    return self._entries[match][0]
+            
+            self.misses += 1
+            return None
+    
+    def put(self, prompt, fingerprint, response, now=None):
+        now = now or time.time()
+        normalized = normalize_prompt(prompt)
+        vector = prompt_vector(normalized) if self.similarity_threshold is not None else None
+        with self._lock:
+            key = (normalized, fingerprint)
+            self._entries[key] = (response, now, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def hit_rate(self):
+        lookups = self.exact_hits + self.near_hits + self.misses
+        return (self.exact_hits + self.near_hits) / lookups if lookups else 0.0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def _nearest(self, key, now):
+        normalized, fingerprint = key
+        vector = prompt_vector(normalized)
+        numbers = NUMBER_RE.findall(normalized)
+        best_key, best_score = None, self.similarity_threshold
+        for candidate, (_, stored_at, candidate_vector) in self._entries.items():
+            if candidate[1] != fingerprint or candidate_vector is None or now - stored_at > self.ttl:
+                continue
+            if NUMBER_RE.findall(candidate[0]) != numbers:
+                continue
+            score = cosine_similarity(vector, candidate_vector)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return best_key
@@ -0,0 +1,184 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from Directions_service import fetch_directions, parse_directions
+from Journey_model import Journey, format_duration, format_distance
+
+COMPARE_MODES = ('driving', 'walking', 'bicycling', 'transit')
+# rank_by value -> label shown in the comparison view
+RANKINGS = {'time': "Fastest (with traffic)", 'distance': "Shortest distance", 'steps': "Fewest steps"}
+DEFAULT_CONCURRENCY = 4
+# Steps listed per route in the side-by-side view
+PREVIEW_STEPS = 6
+
+# ``directions_data`` is what the directions view and journey history take for this route
+RouteOption = namedtuple('RouteOption', ['journey', 'directions_data', 'summary', 'route_index'])
+RouteComparison = namedtuple('RouteComparison', ['options', 'errors'])
+
+
+def route_options(directions_result, origin, destination, mode, timestamp=None):
+    """One ``RouteOption`` per route of a raw Directions result, in API order"""
+    options = []
+    for i, route in enumerate(directions_result):
+        directions_data = parse_directions(directions_result, origin, destination, mode, route_index=i)
+        options.append(RouteOption(Journey.from_directions(directions_data, timestamp), directions_data,
+                                   route.get('summary') or '', i))
+    return options
+
+
+def travel_seconds(journey):
+    """Trip time with traffic when the API predicted it, or None"""
+    return journey.traffic_s if journey.traffic_s is not None else journey.duration_s
+
+
+def rank_routes(options, rank_by='time'):
+    """``options`` best first by ``rank_by`` ('time', 'distance' or 'steps'); ties go to the faster route"""
+    if rank_by not in RANKINGS:
+        raise ValueError(f"Unknown ranking: {rank_by}")
+    
+    def sort_key(option):
+        journey = option.journey
+        seconds = travel_seconds(journey)
+        # Unknown values sort last
+        seconds = seconds if seconds is not None else float('inf')
+        if rank_by == 'time':
+            return (seconds,)
+        if rank_by == 'distance':
+            return (journey.distance_m if journey.distance_m is not None else float('inf'), seconds)
+        return (len(journey.steps or ()), seconds)
+    
+    return sorted(options, key=sort_key)
+
+
+class RouteComparer:
+    """Fetch alternative routes for several modes at once and parse them into journeys.
+
+    Each mode is one Directions request with ``alternatives=True``, made
+    concurrently and stored in the directions cache under its own key, so
+    comparing the same trip again costs no requests.
+    """
+    
+    def __init__(self, client, cache=None, concurrency=DEFAULT_CONCURRENCY):
+        self.client = client
+        self.cache = cache
+        self.concurrency = concurrency
+    
+    def compare(self, origin, destination, modes=('driving',), departure_time=None, rank_by='time',
+                cancel_event=None, origin_text=None, destination_text=None):
+        """Return a ``RouteComparison`` with every route of every mode, ranked.
+
+        ``origin``/``destination`` go to the API (e.g. ``place_id:...``);
+        ``origin_text``/``destination_text`` label routes without an address.
+        """
+        cancel_event = cancel_event or threading.Event()
+        departure_time = departure_time or datetime.now()
+        options = []
+        errors = []
+        
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(modes)) or 1,
+                                thread_name_prefix='route-compare') as pool:
+            futures = {
+                pool.submit(fetch_directions, self.client, origin, destination, mode, departure_time,
+                            cache=self.cache, alternatives=True): mode
+                for mode in modes
+            }
+            for future in as_completed(futures):
+                mode = futures[future]
+                if cancel_event.is_set():
+                    continue
+                try:
+                    directions_result = future.result()
+                except Exception as e:
+                    errors.append(f"{mode}: {e}")
+                    continue
+                if not directions_result:
+                    errors.append(f"{mode}: no route found")
+                    continue
+                options.extend(route_options(directions_result, origin_text or origin, destination_text or destination,
+                                             mode, departure_time.isoformat()))
+        
+        if cancel_event.is_set():
+            raise RuntimeError("Cancelled")
+        if not options:
+            raise RuntimeError(errors[0] if errors else "No routes found between the specified locations")
+        return RouteComparison(rank_routes(options, rank_by), errors)
+
+
+def comparison_html(options, rank_by='time'):
+    """Side-by-side table of ranked routes: one column per route"""
+    columns = ''.join(
+        f'<th style="padding: 8px; color: {"#4facfe" if i == 0 else "#ffffff"};">'
+        f'{"🏆 " if i == 0 else ""}#{i + 1} {option.journey.mode.title()}'
+        f'{"<br>via " + option.summary if option.summary else ""}</th>'
+        for i, option in enumerate(options)
+    )
+    
+    def row(label, values):
+        cells = ''.join(f'<td style="padding: 6px; vertical-align: top;">{value}</td>' for value in values)
+        return f'<tr><td style="padding: 6px; color: #b0b0b0;"><b>{label}</b></td>{cells}</tr>'
+    
+    journeys = [option.journey for option in options]
+    rows = [
+        row("⏱️ Duration", [format_duration(journey.duration_s) for journey in journeys]),
+        row("🚦 With traffic", [format_duration(journey.traffic_s) if journey.traffic_s is not None else "—"
+                               for journey in journeys]),
+        row("📏 Distance", [format_distance(journey.distance_m) for journey in journeys]),
+        row("📋 Steps", [len(journey.steps or ()) for journey in journeys]),
+        row("🧭 Directions", ['<br>'.join(
+            f"{step['step']}. {step['instruction']}" for step in option.directions_data['steps'][:PREVIEW_STEPS]
+        ) + ('<br>…' if len(option.directions_data['steps']) > PREVIEW_STEPS else '') for option in options]),
+    ]
+    return f"""
+    <div style="font-family: Arial, sans-serif; color: #ffffff;">
+        <h2 style="color: #4facfe;">🔀 {len(options)} routes, {RANKINGS[rank_by].lower()} first</h2>
+        <table cellspacing="0" border="1" style="border-color: rgba(255, 255, 255, 0.2);">
+            <tr><th></th>{columns}</tr>
+            {''.join(rows)}
+        </table>
+    </div>
+    """
+
+
+def benchmark(latency=0.1, repeats=200):
+    """Compare all modes against the fake server: sequential, concurrent, cached, and parse cost"""
+    from Fake_maps_server import FakeMapsServer, FakeMapsClient
+    from Directions_service import DirectionsCache
+    import os
+    import tempfile
+    
+    origin, destination = "Malviya Nagar, Jaipur", "Jaipur Airport, Jaipur"
+    with FakeMapsServer(latency=latency) as server, tempfile.TemporaryDirectory() as folder:
+        client = FakeMapsClient(server.url)
+        cache = DirectionsCache(os.path.join(folder, 'bench_cache.json'))
+        for name, concurrency, run_cache in (("sequential", 1, None), ("concurrent", 4, cache), ("cached", 4, cache)):
+            requests_before = server.request_count
+            started = time.perf_counter()
+            comparison = RouteComparer(client, run_cache, concurrency).compare(origin, destination, COMPARE_MODES)
+            print(f"{name:11s} {(time.perf_counter() - started) * 1000:7.1f} ms  "
+                  f"{server.request_count - requests_before} requests  {len(comparison.options)} routes")
+        
+        directions_result = client.directions(origin, destination, mode='driving', alternatives=True)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            options = route_options(directions_result, origin, destination, 'driving')
+        elapsed = time.perf_counter() - started
+        print(f"parse: {elapsed / (repeats * len(options)) * 1000:.3f} ms per route")
+    
+    for rank_by in RANKINGS:
+        ranked = rank_routes(comparison.options, rank_by)
+        print(f"{RANKINGS[rank_by]:24s} " + ", ".join(
+            f"{option.journey.mode}/{option.summary}" for option in ranked[:3]))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Route_comparison.py --bench")
@@ -4,17 +4,45 @@
 import sys
 import os
 import json
-import re
-from datetime import datetime
+import time
+import asyncio
+import threading
+from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QHBoxLayout, QPushButton, QLabel, QLineEdit, QTextEdit, 
-                           QComboBox, QTabWidget, QListWidget, QMessageBox, 
+                           QComboBox, QTabWidget, QListView, QMessageBox, 
                            QSplitter, QFrame, QScrollArea, QGridLayout, QStackedWidget,
-                           QDateTimeEdit, QCheckBox, QListWidgetItem)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QDateTime
+                           QDateTimeEdit, QCheckBox, QFileDialog,
+                           QDialog, QTableView, QHeaderView, QPlainTextEdit)
+from PyQt5.QtCore import (Qt, QObject, pyqtSignal, QTimer, QDateTime,
+                          QAbstractTableModel, QModelIndex, QSortFilterProxyModel)
 from PyQt5.QtGui import QFont, QPixmap, QPalette, QColor
 from PyQt5.QtCore import QPropertyAnimation, QEasingCurve, pyqtProperty
 from PyQt5.QtGui import QPainter, QLinearGradient, QBrush
+from Api_clients import get_client_registry, get_api_gateway
+from Directions_service import (DirectionsCache, fetch_directions, fetch_directions_async, parse_directions,
+                                clean_html_tags, make_cache_key)
+from Task_executor import TaskExecutor, ExecutorBusyError
+from Async_core import AsyncRunner, AsyncApiError, AsyncHttpError, ASYNC_NETWORKING
+from Batch_planner import BatchPlanner, read_batch_csv
+from Departure_optimizer import DepartureOptimizer
+from Offline_router import OfflineRouter, OfflineRoutingError, OFFLINE_GRAPH_DIR
+from Geocode_cache import GeocodeCache
+from Place_autocomplete import PrefixIndex, PlaceCompleter
+from Route_comparison import RouteComparer, rank_routes, comparison_html, RANKINGS, COMPARE_MODES
+from Trip_planner import TripPlanner, parse_stop_line, trip_plan_html
+from Commute_prefetch import CommutePrefetcher, CHECK_INTERVAL_MS
+from Distance_matrix import DistanceMatrixService, MatrixCellCache
+from Chat_view import ChatView
+from Journey_history import JourneyHistoryModel, JOURNEY_ID_ROLE
+from Prompt_context import ContextBuilder
+from Response_cache import ResponseCache, NEAR_DUPLICATE_THRESHOLD
+from Conversation_memory import ConversationMemory
+from History_index import HistoryIndex
+from Travel_analytics import TravelAnalytics, insights_html
+from Journey_model import format_duration
+from Travel_storage import (SqliteStore, JourneySummary, migrate_json_data, empty_user_data,
+                            MAX_JOURNEYS, MAX_CONVERSATIONS)
 
 # Import modules with proper error handling
 try:
@@ -81,7 +109,40 @@ class GlowButton(QPushButton):
         self.setStyleSheet(self.base_style)
         super().leaveEvent(event)
 
-class AuthThread(QThread):
+class BackgroundWorker(QObject):
+    """Base for request workers run on the shared TaskExecutor pool"""
+    # Emitted with the worker itself once its task has ended, from whichever thread ran it
+    task_done = pyqtSignal(object)
+    
+    def __init__(self):
+        super().__init__()
+        self.cancel_event = threading.Event()
+    
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+    
+    def maps_client_or_error(self, emit=None, factory=None):
+        """Maps client for this task, or None after passing the reason there is none to ``emit``.
+
+        An injected ``self.client`` (e.g. StubDirectionsClient) skips the
+        configuration checks. ``factory(api_key)`` makes the client; by
+        default it is the shared googlemaps client, which keeps its HTTP
+        connections alive between requests.
+        """
+        client = getattr(self, 'client', None)
+        if client is not None:
+            return client
+        if factory is None and not GOOGLEMAPS_AVAILABLE:
+            error = "Google Maps library not installed"
+        elif not GOOGLE_MAPS_API_KEY or GOOGLE_MAPS_API_KEY == "YOUR_GOOGLE_MAPS_API_KEY_HERE":
+            error = "Google Maps API key not configured"
+        else:
+            return (factory or get_client_registry().maps_client)(GOOGLE_MAPS_API_KEY)
+        if emit is not None:
+            emit(error)
+        return None
+
+class AuthThread(BackgroundWorker):
     auth_success = pyqtSignal(dict)
     auth_error = pyqtSignal(str)
     
@@ -123,7 +184,7 @@ class AuthThread(QThread):
             
             # Get user info
             service = build('oauth2', 'v2', credentials=creds)
-            user_info = service.userinfo().get().execute()
+            user_info = get_api_gateway().call('oauth', 'userinfo.get', service.userinfo().get().execute)
             
             # Save user info to file
             self.save_user_info(user_info)
@@ -141,94 +202,476 @@ class AuthThread(QThread):
         except Exception as e:
             print(f"Error saving user info: {e}")
 
-class GoogleMapsThread(QThread):
+class GoogleMapsThread(BackgroundWorker):
     directions_ready = pyqtSignal(dict)
     directions_error = pyqtSignal(str)
     
-    def __init__(self, origin, destination, mode, departure_time):
+    def __init__(self, origin, destination, mode, departure_time, client=None, cache=None, offline_router=None,
+                 geocode_cache=None):
         super().__init__()
         self.origin = origin
         self.destination = destination
         self.mode = mode
         self.departure_time = departure_time
+        # An injected client (e.g. StubDirectionsClient) bypasses the API key checks
+        self.client = client
+        self.cache = cache
+        # Local road graph used when Google Maps cannot be reached
+        self.offline_router = offline_router
+        self.geocode_cache = geocode_cache
     
     def run(self):
-        if not GOOGLEMAPS_AVAILABLE:
-            self.directions_error.emit("Google Maps library not installed")
-            return
+        try:
+            gmaps = self.maps_client_or_error(self.emit_offline_or_error)
+            if gmaps is None:
+                return
+            
+            # Known places, however they are spelt, go to the API as place IDs and share cache keys
+            origin, destination = self.origin, self.destination
+            if self.geocode_cache is not None:
+                origin = self.geocode_cache.query_for(self.origin, gmaps)
+                destination = self.geocode_cache.query_for(self.destination, gmaps)
+            
+            # Get directions, served from the cache when still fresh
+            directions_result = fetch_directions(
+                gmaps,
+                origin,
+                destination,
+                self.mode,
+                self.departure_time,
+                cache=self.cache
+            )
+            
+            if not directions_result:
+                self.directions_error.emit("No route found between the specified locations")
+                return
+            
+            directions_data = self.parse_result(directions_result)
+            
+            # The window may have been closed while the request was running
+            if self.is_cancelled():
+                return
+            
+            self.directions_ready.emit(directions_data)
+            
+        except Exception as e:
+            self.emit_offline_or_error(self.error_message(e))
+    
+    async def run_async(self, runner):
+        """``run`` on ``runner``'s event loop, using its async Maps client"""
+        try:
+            errors = []
+            gmaps = self.maps_client_or_error(errors.append, runner.maps_client)
+            if gmaps is None:
+                await asyncio.to_thread(self.emit_offline_or_error, errors[0])
+                return
+            
+            origin, destination = self.origin, self.destination
+            if self.geocode_cache is not None:
+                origin, destination = await asyncio.gather(self.geocode_cache.query_for_async(self.origin, gmaps),
+                                                           self.geocode_cache.query_for_async(self.destination, gmaps))
+            
+            directions_result = await fetch_directions_async(
+                gmaps,
+                origin,
+                destination,
+                self.mode,
+                self.departure_time,
+                cache=self.cache
+            )
+            
+            if not directions_result:
+                self.directions_error.emit("No route found between the specified locations")
+                return
+            
+            # Parsing is CPU work; with qasync the loop is the GUI thread
+            directions_data = await asyncio.to_thread(self.parse_result, directions_result)
+            
+            if self.is_cancelled():
+                return
+            
+            self.directions_ready.emit(directions_data)
         
-        if not GOOGLE_MAPS_API_KEY or GOOGLE_MAPS_API_KEY == "YOUR_GOOGLE_MAPS_API_KEY_HERE":
-            self.directions_error.emit("Google Maps API key not configured")
+        except Exception as e:
+            # The offline router does its own (blocking) path search
+            await asyncio.to_thread(self.emit_offline_or_error, self.error_message(e))
+    
+    @staticmethod
+    def error_message(error):
+        """The same text for a failure whichever Maps client raised it"""
+        if "googlemaps.exceptions" in str(type(error)) or isinstance(error, (AsyncApiError, AsyncHttpError)):
+            return f"Google Maps API error: {str(error)}"
+        return f"Error getting directions: {str(error)}"
+    
+    def parse_result(self, directions_result):
+        """Parse ``directions_result`` and link the API's addresses to the places as typed"""
+        directions_data = parse_directions(directions_result, self.origin, self.destination, self.mode)
+        if self.geocode_cache is not None:
+            # Saved journeys keep the API's addresses; make those resolve to the same places
+            self.geocode_cache.link(directions_data['origin'], self.origin)
+            self.geocode_cache.link(directions_data['destination'], self.destination)
+        return directions_data
+    
+    def emit_offline_or_error(self, error_message):
+        """Fall back to the offline road graph, or report ``error_message`` if that fails too"""
+        if self.offline_router is None or self.is_cancelled():
+            self.directions_error.emit(error_message)
+            return
+        try:
+            directions_data = self.offline_router.route(self.origin, self.destination, self.mode)
+        except (OfflineRoutingError, ValueError) as e:
+            self.directions_error.emit(f"{error_message} (offline routing: {e})")
             return
+        if not self.is_cancelled():
+            self.directions_ready.emit(directions_data)
+    
+    def clean_html_tags(self, text):
+        """Remove HTML tags from text"""
+        return clean_html_tags(text)
+
+class BatchPlannerThread(BackgroundWorker):
+    row_ready = pyqtSignal(int, dict)
+    row_failed = pyqtSignal(int, str)
+    batch_finished = pyqtSignal(int, int)
+    batch_error = pyqtSignal(str)
+    
+    def __init__(self, rows, client=None, cache=None, concurrency=4):
+        super().__init__()
+        self.rows = rows
+        self.client = client
+        self.cache = cache
+        self.concurrency = concurrency
+    
+    def run(self):
+        try:
+            gmaps = self.maps_client_or_error(self.batch_error.emit)
+            if gmaps is None:
+                return
+            planner = BatchPlanner(
+                gmaps,
+                cache=self.cache,
+                concurrency=self.concurrency
+            )
+            
+            # Each row is emitted as soon as it finishes
+            results = planner.run(self.rows, on_result=self.emit_row, cancel_event=self.cancel_event)
+            
+            if self.is_cancelled():
+                return
+            
+            failures = sum(1 for _, error in results if error)
+            self.batch_finished.emit(len(results) - failures, failures)
         
+        except Exception as e:
+            self.batch_error.emit(f"Error planning batch: {str(e)}")
+    
+    async def run_async(self, runner):
+        """``run`` on ``runner``'s event loop: every row in flight at once, paced by the rate limit"""
+        try:
+            gmaps = self.maps_client_or_error(self.batch_error.emit, runner.maps_client)
+            if gmaps is None:
+                return
+            planner = BatchPlanner(None, cache=self.cache)
+            results = await planner.run_async(gmaps, self.rows, on_result=self.emit_row,
+                                              cancel_event=self.cancel_event)
+            
+            if self.is_cancelled():
+                return
+            
+            failures = sum(1 for _, error in results if error)
+            self.batch_finished.emit(len(results) - failures, failures)
+        
+        except Exception as e:
+            self.batch_error.emit(f"Error planning batch: {str(e)}")
+    
+    def emit_row(self, index, row, directions_data, error):
+        if error:
+            self.row_failed.emit(index, f"{row.origin} → {row.destination}: {error}")
+        else:
+            self.row_ready.emit(index, directions_data)
+
+class DepartureOptimizerThread(BackgroundWorker):
+    slot_ready = pyqtSignal(object)
+    optimization_ready = pyqtSignal(object)
+    optimization_error = pyqtSignal(str)
+    
+    def __init__(self, origin, destination, mode, window_start, window_end, store=None, email=None,
+                 client=None, cache=None):
+        super().__init__()
+        self.origin = origin
+        self.destination = destination
+        self.mode = mode
+        self.window_start = window_start
+        self.window_end = window_end
+        self.store = store
+        self.email = email
+        self.client = client
+        self.cache = cache
+    
+    def run(self):
         try:
-            gmaps = googlemaps.Client(key=GOOGLE_MAPS_API_KEY)
+            gmaps = self.maps_client_or_error(self.optimization_error.emit)
+            if gmaps is None:
+                return
             
-            # Get directions with error handling
-            directions_result = gmaps.directions(
+            # Past trips on this route let clearly slow slots be skipped without a request
+            observations = []
+            if self.store is not None and self.email:
+                observations = self.store.load_route_observations(self.email, self.origin, self.destination, self.mode)
+            
+            optimizer = DepartureOptimizer(gmaps, cache=self.cache)
+            result = optimizer.optimize(
                 self.origin,
                 self.destination,
+                self.mode,
+                self.window_start,
+                self.window_end,
+                observations=observations,
+                cancel_event=self.cancel_event,
+                on_slot=self.slot_ready.emit
+            )
+            
+            if self.is_cancelled():
+                return
+            
+            self.optimization_ready.emit(result)
+        
+        except Exception as e:
+            if not self.is_cancelled():
+                self.optimization_error.emit(f"Error finding the best departure time: {str(e)}")
+
+class RouteComparisonThread(BackgroundWorker):
+    comparison_ready = pyqtSignal(object)
+    comparison_error = pyqtSignal(str)
+    
+    def __init__(self, origin, destination, modes, departure_time, client=None, cache=None, geocode_cache=None):
+        super().__init__()
+        self.origin = origin
+        self.destination = destination
+        self.modes = modes
+        self.departure_time = departure_time
+        self.client = client
+        self.cache = cache
+        self.geocode_cache = geocode_cache
+    
+    def run(self):
+        try:
+            gmaps = self.maps_client_or_error(self.comparison_error.emit)
+            if gmaps is None:
+                return
+            origin, destination = self.origin, self.destination
+            if self.geocode_cache is not None:
+                origin = self.geocode_cache.query_for(self.origin, gmaps)
+                destination = self.geocode_cache.query_for(self.destination, gmaps)
+            
+            # Fetching and parsing every alternative stays on this worker thread
+            comparison = RouteComparer(gmaps, cache=self.cache).compare(
+                origin,
+                destination,
+                self.modes,
+                self.departure_time,
+                cancel_event=self.cancel_event,
+                origin_text=self.origin,
+                destination_text=self.destination
+            )
+            
+            if self.is_cancelled():
+                return
+            
+            self.comparison_ready.emit(comparison)
+        
+        except Exception as e:
+            if not self.is_cancelled():
+                self.comparison_error.emit(f"Error comparing routes: {str(e)}")
+
+class DistanceMatrixThread(BackgroundWorker):
+    matrix_ready = pyqtSignal(object)
+    matrix_error = pyqtSignal(str)
+    
+    def __init__(self, origins, destinations, mode, departure_time, client=None, cache=None):
+        super().__init__()
+        self.origins = origins
+        self.destinations = destinations
+        self.mode = mode
+        self.departure_time = departure_time
+        self.client = client
+        self.cache = cache
+    
+    def run(self):
+        try:
+            gmaps = self.maps_client_or_error(self.matrix_error.emit)
+            if gmaps is None:
+                return
+            service = DistanceMatrixService(gmaps, cache=self.cache)
+            result = service.build(
+                self.origins,
+                self.destinations,
                 mode=self.mode,
                 departure_time=self.departure_time,
-                traffic_model='best_guess' if self.mode == 'driving' else None,
-                alternatives=False
+                cancel_event=self.cancel_event
             )
             
-            if not directions_result:
-                self.directions_error.emit("No route found between the specified locations")
+            if self.is_cancelled():
                 return
             
-            route = directions_result[0]
-            leg = route['legs'][0]
-            
-            # Format directions data with better error handling
-            directions_data = {
-                'origin': leg.get('start_address', self.origin),
-                'destination': leg.get('end_address', self.destination),
-                'mode': self.mode,
-                'duration': leg.get('duration', {}).get('text', 'Unknown'),
-                'distance': leg.get('distance', {}).get('text', 'Unknown'),
-                'duration_in_traffic': leg.get('duration_in_traffic', {}).get('text', 'N/A'),
-                'steps': []
-            }
+            self.matrix_ready.emit(result)
+        
+        except Exception as e:
+            self.matrix_error.emit(f"Error building travel-time matrix: {str(e)}")
+    
+    async def run_async(self, runner):
+        """``run`` on ``runner``'s event loop, with every chunk of the matrix in flight at once"""
+        try:
+            gmaps = self.maps_client_or_error(self.matrix_error.emit, runner.maps_client)
+            if gmaps is None:
+                return
+            service = DistanceMatrixService(gmaps, cache=self.cache)
+            result = await service.build_async(
+                self.origins,
+                self.destinations,
+                mode=self.mode,
+                departure_time=self.departure_time,
+                cancel_event=self.cancel_event
+            )
             
-            # Process steps with HTML tag removal
-            for i, step in enumerate(leg.get('steps', []), 1):
-                instruction = self.clean_html_tags(step.get('html_instructions', ''))
-                distance = step.get('distance', {}).get('text', 'Unknown')
-                duration = step.get('duration', {}).get('text', 'Unknown')
-                
-                directions_data['steps'].append({
-                    'step': i,
-                    'instruction': instruction,
-                    'distance': distance,
-                    'duration': duration
-                })
+            if self.is_cancelled():
+                return
             
-            self.directions_ready.emit(directions_data)
+            self.matrix_ready.emit(result)
+        
+        except Exception as e:
+            self.matrix_error.emit(f"Error building travel-time matrix: {str(e)}")
+
+class TripPlannerThread(BackgroundWorker):
+    plan_ready = pyqtSignal(object)
+    plan_error = pyqtSignal(str)
+    
+    def __init__(self, stops, mode, departure_time, round_trip=False, fixed_end=False, time_windows=None,
+                 service_minutes=0, client=None, directions_cache=None, matrix_cache=None):
+        super().__init__()
+        self.stops = stops
+        self.mode = mode
+        self.departure_time = departure_time
+        self.round_trip = round_trip
+        self.fixed_end = fixed_end
+        self.time_windows = time_windows
+        self.service_minutes = service_minutes
+        self.client = client
+        self.directions_cache = directions_cache
+        self.matrix_cache = matrix_cache
+    
+    def run(self):
+        try:
+            gmaps = self.maps_client_or_error(self.plan_error.emit)
+            if gmaps is None:
+                return
+            planner = TripPlanner(gmaps, directions_cache=self.directions_cache, matrix_cache=self.matrix_cache)
+            plan = planner.plan(
+                self.stops,
+                mode=self.mode,
+                departure_time=self.departure_time,
+                round_trip=self.round_trip,
+                fixed_end=self.fixed_end,
+                time_windows=self.time_windows,
+                service_minutes=self.service_minutes,
+                cancel_event=self.cancel_event
+            )
+            
+            if self.is_cancelled():
+                return
             
+            self.plan_ready.emit(plan)
+        
         except Exception as e:
-            if "googlemaps.exceptions" in str(type(e)):
-                self.directions_error.emit(f"Google Maps API error: {str(e)}")
-            else:
-                self.directions_error.emit(f"Error getting directions: {str(e)}")
+            if not self.is_cancelled():
+                self.plan_error.emit(f"Error planning the trip: {str(e)}")
+
+class CommutePrefetchThread(BackgroundWorker):
+    prefetch_finished = pyqtSignal(int, int)
     
-    def clean_html_tags(self, text):
-        """Remove HTML tags from text"""
-        if not text:
-            return ""
-        clean = re.compile('<.*?>')
-        return re.sub(clean, '', text)
+    def __init__(self, prefetcher, client=None):
+        super().__init__()
+        self.prefetcher = prefetcher
+        self.client = client
+    
+    def run(self):
+        try:
+            # Prefetching is best effort; without the API it simply does nothing
+            gmaps = self.maps_client_or_error()
+            if gmaps is None:
+                return
+            warmed, calls = self.prefetcher.run_due(gmaps, cancel_event=self.cancel_event)
+        except Exception as e:
+            print(f"Error prefetching commutes: {e}")
+            return
+        
+        if not self.is_cancelled():
+            self.prefetch_finished.emit(warmed, calls)
+
+class AnalyticsThread(BackgroundWorker):
+    insights_ready = pyqtSignal(str)
+    insights_error = pyqtSignal(str)
+    
+    def __init__(self, store, email):
+        super().__init__()
+        self.store = store
+        self.email = email
+    
+    def run(self):
+        try:
+            table = self.store.load_journey_table(self.email)
+            if self.is_cancelled():
+                return
+            html = insights_html(TravelAnalytics.from_table(table))
+        except Exception as e:
+            self.insights_error.emit(f"Error computing travel insights: {str(e)}")
+            return
+        if not self.is_cancelled():
+            self.insights_ready.emit(html)
 
-class GeminiChatThread(QThread):
+class PlacesAutocompleteThread(BackgroundWorker):
+    suggestions_ready = pyqtSignal(str, list)
+    
+    def __init__(self, text, session_token, client=None):
+        super().__init__()
+        self.text = text
+        self.session_token = session_token
+        self.client = client
+    
+    def run(self):
+        try:
+            # Suggestions are optional; without the API the local index is all there is
+            gmaps = self.maps_client_or_error()
+            if gmaps is None:
+                return
+            predictions = gmaps.places_autocomplete(self.text, session_token=self.session_token)
+        except Exception as e:
+            print(f"Error fetching place suggestions: {e}")
+            return
+        if not self.is_cancelled():
+            self.suggestions_ready.emit(self.text, [p['description'] for p in predictions if p.get('description')])
+
+class GeminiChatThread(BackgroundWorker):
     response_received = pyqtSignal(str)
+    response_chunk = pyqtSignal(str)
+    first_token_received = pyqtSignal(float)
     
-    def __init__(self, message, conversation_history, user_data=None, recent_journey=None):
+    def __init__(self, message, conversation_history, user_data=None, recent_journey=None, stream=False,
+                 context_builder=None, response_cache=None, context_fingerprint=None, conversation_summary=None,
+                 history_index=None, sent_at=None):
         super().__init__()
         self.message = message
         self.conversation_history = conversation_history or []
         self.user_data = user_data or {}
         self.recent_journey = recent_journey
+        self.stream = stream
+        self.context_builder = context_builder
+        self.response_cache = response_cache
+        self.context_fingerprint = context_fingerprint
+        self.conversation_summary = conversation_summary
+        self.history_index = history_index
+        # ``time.perf_counter()`` when the user sent the message; time to first token counts from here
+        self.sent_at = sent_at
     
     def run(self):
         if not GENAI_AVAILABLE:
@@ -240,16 +683,25 @@ class GeminiChatThread(QThread):
             return
         
         try:
-            # Configure Gemini
-            genai.configure(api_key=GEMINI_API_KEY)
-            model = genai.GenerativeModel("gemini-1.5-pro")
+            # Reuse the shared, already configured Gemini model
+            registry = get_client_registry()
+            model = registry.gemini_model(GEMINI_API_KEY, "gemini-1.5-pro")
             
             # Build enhanced context with location and journey data
             context = self.build_enhanced_context()
             
+            if self.stream:
+                self.stream_response(model, context, registry.gemini_request_options())
+                return
+            
             # Generate response
-            response = model.generate_content(context)
+            response = model.generate_content(context, request_options=registry.gemini_request_options())
             bot_reply = response.text.strip() if response.text else "I couldn't generate a response."
+            if response.text:
+                self.cache_reply(bot_reply)
+            
+            if self.is_cancelled():
+                return
             
             self.response_received.emit(bot_reply)
             
@@ -257,87 +709,483 @@ class GeminiChatThread(QThread):
             error_msg = f"Error communicating with AI: {str(e)}"
             self.response_received.emit(error_msg)
     
+    async def run_async(self, runner):
+        """``run`` on ``runner``'s event loop, calling Gemini's REST API directly"""
+        if not GEMINI_API_KEY or GEMINI_API_KEY == "YOUR_GEMINI_API_KEY_HERE":
+            self.response_received.emit("Gemini API key not configured. Please set your API key.")
+            return
+        
+        try:
+            gemini = runner.gemini_client(GEMINI_API_KEY, "gemini-1.5-pro")
+            # Searching the history index is CPU work, so it stays off the event loop
+            context = await asyncio.to_thread(self.build_enhanced_context)
+            
+            if self.stream:
+                await self.stream_response_async(gemini, context)
+                return
+            
+            text = await gemini.generate_content(context)
+            bot_reply = text.strip() if text else "I couldn't generate a response."
+            if text:
+                # Storing a reply vectorises its prompt
+                await asyncio.to_thread(self.cache_reply, bot_reply)
+            
+            if self.is_cancelled():
+                return
+            
+            self.response_received.emit(bot_reply)
+        
+        except Exception as e:
+            error_msg = f"Error communicating with AI: {str(e)}"
+            self.response_received.emit(error_msg)
+    
+    async def stream_response_async(self, gemini, context):
+        """``stream_response`` for an ``AsyncGeminiClient``"""
+        parts = []
+        started = self.sent_at or time.perf_counter()
+        try:
+            async for text in gemini.stream_generate_content(context):
+                if self.is_cancelled():
+                    return
+                self.emit_chunk(parts, text, started)
+        except Exception as e:
+            if self.stream_failed(parts, e):
+                return
+        else:
+            if parts:
+                await asyncio.to_thread(self.cache_reply, ''.join(parts).strip())
+        self.finish_stream(parts)
+    
+    def stream_response(self, model, context, request_options):
+        """Emit the reply chunk by chunk, then the full text through response_received"""
+        parts = []
+        started = self.sent_at or time.perf_counter()
+        try:
+            response = model.generate_content(context, stream=True, request_options=request_options)
+            for chunk in response:
+                if self.is_cancelled():
+                    return
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. safety metadata) carry nothing to show
+                    continue
+                self.emit_chunk(parts, text, started)
+        except Exception as e:
+            if self.stream_failed(parts, e):
+                return
+        else:
+            if parts:
+                self.cache_reply(''.join(parts).strip())
+        self.finish_stream(parts)
+    
+    def emit_chunk(self, parts, text, started):
+        """Add a streamed chunk to ``parts`` and show it; the first one also reports time to first token"""
+        if not text:
+            return
+        if not parts:
+            self.first_token_received.emit(time.perf_counter() - started)
+        parts.append(text)
+        self.response_chunk.emit(text)
+    
+    def stream_failed(self, parts, error):
+        """Report a stream that broke off; True when nothing had arrived and the error is the whole reply"""
+        error_msg = f"Error communicating with AI: {str(error)}"
+        if not parts:
+            self.response_received.emit(error_msg)
+            return True
+        # Keep what already arrived and report the failure after it
+        error_msg = f"\n\n⚠️ {error_msg}"
+        parts.append(error_msg)
+        self.response_chunk.emit(error_msg)
+        return False
+    
+    def finish_stream(self, parts):
+        """Emit the full streamed reply unless the request was cancelled"""
+        if self.is_cancelled():
+            return
+        bot_reply = ''.join(parts).strip()
+        self.response_received.emit(bot_reply or "I couldn't generate a response.")
+    
+    def cache_reply(self, bot_reply):
+        """Remember a complete reply so the same question in the same context is answered locally"""
+        if self.response_cache is not None and bot_reply:
+            self.response_cache.put(self.message, self.context_fingerprint, bot_reply)
+    
     def build_enhanced_context(self):
         """Build enhanced context with location and journey data"""
-        context_parts = []
-        
-        # Enhanced system prompt with travel expertise
-        context_parts.append("""You are an expert travel assistant with access to real-time journey data and user history. 
-        You have detailed knowledge of:
-        - Travel routes, transportation options, and traffic patterns
-        - Local attractions, restaurants, and accommodations
-        - Weather conditions and seasonal travel tips
-        - Budget planning and cost-effective travel options
-        - Cultural insights and local customs
-        - Safety tips and travel advisories
-        
-        Provide helpful, accurate, and personalized travel advice based on the user's location data and journey history.
-        Be conversational, friendly, and specific in your recommendations. Use the journey data to give contextual advice.""")
-        
-        # Add recent journey data if available
-        if self.recent_journey:
-            journey_context = f"""
-MOST RECENT JOURNEY:
-- Origin: {self.recent_journey.get('origin', 'Unknown')}
-- Destination: {self.recent_journey.get('destination', 'Unknown')}
-- Travel Mode: {self.recent_journey.get('mode', 'Unknown')}
-- Duration: {self.recent_journey.get('duration', 'Unknown')}
-- Distance: {self.recent_journey.get('distance', 'Unknown')}
-- Traffic Duration: {self.recent_journey.get('duration_in_traffic', 'N/A')}
+        builder = self.context_builder
+        if builder is None:
+            # No long-lived builder supplied, so render one from the data passed in
+            builder = ContextBuilder()
+            builder.set_journeys(self.user_data.get('journeys', []))
+            builder.set_recent_journey(self.recent_journey)
+        # Past journeys and conversations that match this question, if the index is available
+        relevant = self.history_index.search(self.message) if self.history_index is not None else None
+        return builder.build(self.message, self.conversation_history, summary=self.conversation_summary,
+                             relevant=relevant)
 
-Use this journey information to provide relevant travel advice, alternative routes, nearby attractions, 
-dining options, or any other contextual recommendations."""
-            context_parts.append(journey_context)
-        
-        # Add comprehensive journey history
-        if self.user_data.get('journeys'):
-            recent_journeys = self.user_data['journeys'][-10:]  # Last 10 journeys
-            if recent_journeys:
-                history_summary = "\nUSER'S RECENT JOURNEY HISTORY:\n"
-                for idx, journey in enumerate(recent_journeys, 1):
-                    data = journey.get('data', {})
-                    timestamp = journey.get('timestamp', '')
-                    if timestamp:
-                        try:
-                            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                            time_str = dt.strftime("%Y-%m-%d %H:%M")
-                        except:
-                            time_str = timestamp[:16]
-                    else:
-                        time_str = "Unknown time"
-                    
-                    history_summary += f"{idx}. {time_str}: {data.get('origin', 'Unknown')} → {data.get('destination', 'Unknown')} "
-                    history_summary += f"({data.get('mode', 'unknown')}, {data.get('duration', 'Unknown duration')})\n"
-                
-                history_summary += "\nUse this travel pattern to suggest personalized recommendations, "
-                history_summary += "identify frequent routes, suggest optimizations, or recommend new destinations."
-                context_parts.append(history_summary)
-        
-        # Add conversation context
-        if self.conversation_history:
-            context_parts.append("\nPREVIOUS CONVERSATION CONTEXT:")
-            # Include last 6 messages for better context
-            recent_messages = self.conversation_history[-6:]
-            for message in recent_messages:
-                context_parts.append(message)
-        
-        # Add current user message with clear marking
-        context_parts.append(f"\nCURRENT USER QUESTION: {self.message}")
-        context_parts.append("\nYour response should be helpful, specific, and based on the travel data provided above:")
-        
-        return "\n".join(context_parts)
+class TravelMatrixModel(QAbstractTableModel):
+    """Table model over a MatrixResult; cells are only formatted when painted"""
+    
+    def __init__(self, result=None, parent=None):
+        super().__init__(parent)
+        self.result = None
+        self.minutes = None
+        if result is not None:
+            self.set_result(result)
+    
+    def set_result(self, result):
+        self.beginResetModel()
+        self.result = result
+        self.minutes = result.best_durations() / 60.0
+        self.endResetModel()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or self.result is None else len(self.result.origins)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or self.result is None else len(self.result.destinations)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or self.result is None:
+            return None
+        minutes = self.minutes[index.row(), index.column()]
+        if role == Qt.DisplayRole:
+            return "—" if minutes != minutes else f"{minutes:.0f} min"
+        if role == Qt.UserRole:
+            # Sort key: unreachable cells sort last
+            return float('inf') if minutes != minutes else float(minutes)
+        if role == Qt.ToolTipRole:
+            distance = self.result.distances[index.row(), index.column()]
+            if distance == distance:
+                return f"{self.result.origins[index.row()]} → {self.result.destinations[index.column()]}: {distance / 1000:.1f} km"
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or self.result is None:
+            return None
+        names = self.result.destinations if orientation == Qt.Horizontal else self.result.origins
+        return names[section] if section < len(names) else None
+
+class TravelMatrixDialog(QDialog):
+    """Many-to-many travel-time table backed by the Distance Matrix API"""
+    
+    def __init__(self, submit_network_task, cancel_network_task, cache, mode='driving', departure_time=None,
+                 parent=None):
+        super().__init__(parent)
+        # The window's ``submit_network_task`` and ``cancel_network_task``, so the fetch is
+        # tracked and stopped like any other request
+        self.submit_network_task = submit_network_task
+        self.cancel_network_task = cancel_network_task
+        self.cache = cache
+        self.mode = mode
+        self.departure_time = departure_time
+        
+        self.setWindowTitle("🧮 Travel-Time Matrix")
+        self.resize(1000, 700)
+        layout = QVBoxLayout(self)
+        
+        inputs_layout = QHBoxLayout()
+        self.origins_input = QPlainTextEdit()
+        self.origins_input.setPlaceholderText("Origins, one per line")
+        inputs_layout.addWidget(self.origins_input)
+        self.destinations_input = QPlainTextEdit()
+        self.destinations_input.setPlaceholderText("Destinations, one per line")
+        inputs_layout.addWidget(self.destinations_input)
+        layout.addLayout(inputs_layout, 1)
+        
+        self.compute_btn = GlowButton(f"🧮 Build {mode.title()} Matrix")
+        self.compute_btn.clicked.connect(self.build_matrix)
+        layout.addWidget(self.compute_btn)
+        
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        
+        # Model/view keeps large tables responsive; clicking a header sorts by that destination
+        self.model = TravelMatrixModel(parent=self)
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.setSortRole(Qt.UserRole)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.proxy_model)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.table_view.horizontalHeader().setDefaultSectionSize(110)
+        layout.addWidget(self.table_view, 3)
+    
+    def build_matrix(self):
+        """Fetch the matrix for the entered places"""
+        origins = [line.strip() for line in self.origins_input.toPlainText().splitlines() if line.strip()]
+        destinations = [line.strip() for line in self.destinations_input.toPlainText().splitlines() if line.strip()]
+        if not origins or not destinations:
+            QMessageBox.warning(self, "Input Error", "Please enter at least one origin and one destination")
+            return
+        
+        worker = DistanceMatrixThread(origins, destinations, self.mode, self.departure_time,
+                                      cache=self.cache)
+        worker.matrix_ready.connect(self.on_matrix_ready)
+        worker.matrix_error.connect(self.on_matrix_error)
+        try:
+            self.matrix_worker = self.submit_network_task(('matrix', id(self)), worker)
+        except ExecutorBusyError as e:
+            QMessageBox.warning(self, "Busy", str(e))
+            return
+        
+        self.compute_btn.setEnabled(False)
+        self.status_label.setText(f"🔄 Fetching {len(origins)} × {len(destinations)} travel times...")
+    
+    def on_matrix_ready(self, result):
+        self.compute_btn.setEnabled(True)
+        self.model.set_result(result)
+        self.status_label.setText(f"✅ {len(result.origins)} × {len(result.destinations)} travel times ({result.mode})")
+    
+    def on_matrix_error(self, error_message):
+        self.compute_btn.setEnabled(True)
+        self.status_label.setText(f"❌ {error_message}")
+    
+    def reject(self):
+        # Stop a running fetch when the dialog is closed; on the asyncio loop its requests are abandoned at once
+        if hasattr(self, 'matrix_worker'):
+            self.cancel_network_task(('matrix', id(self)))
+        super().reject()
+
+class TripPlannerDialog(QDialog):
+    """Order a list of stops for the least travel and show the legs"""
+    
+    leg_chosen = pyqtSignal(dict)
+    
+    def __init__(self, start_worker, directions_cache, matrix_cache, mode='driving', departure_time=None, parent=None):
+        super().__init__(parent)
+        # The window's ``start_worker``, so the plan is tracked like any other request
+        self.start_worker = start_worker
+        self.directions_cache = directions_cache
+        self.matrix_cache = matrix_cache
+        self.mode = mode
+        self.departure_time = departure_time or datetime.now()
+        self.plan = None
+        
+        self.setWindowTitle("🗺️ Plan a Multi-Stop Trip")
+        self.resize(900, 750)
+        layout = QVBoxLayout(self)
+        
+        self.stops_input = QPlainTextEdit()
+        self.stops_input.setPlaceholderText(
+            "One stop per line; the first is where you start.\n"
+            "Add an arrival window with \" | 10:00-12:00\", e.g.\n"
+            "Malviya Nagar, Jaipur\nAmer Fort, Jaipur | 10:00-12:00\nHawa Mahal, Jaipur"
+        )
+        layout.addWidget(self.stops_input, 1)
+        
+        options_layout = QHBoxLayout()
+        self.round_trip_checkbox = QCheckBox("Return to start")
+        options_layout.addWidget(self.round_trip_checkbox)
+        self.fixed_end_checkbox = QCheckBox("Finish at last stop")
+        options_layout.addWidget(self.fixed_end_checkbox)
+        options_layout.addWidget(QLabel("Time at each stop:"))
+        self.service_combo = QComboBox()
+        for minutes in (0, 15, 30, 60):
+            self.service_combo.addItem(f"{minutes} min", minutes)
+        options_layout.addWidget(self.service_combo)
+        options_layout.addStretch()
+        layout.addLayout(options_layout)
+        
+        self.plan_btn = GlowButton(f"🗺️ Plan {mode.title()} Trip")
+        self.plan_btn.clicked.connect(self.plan_trip)
+        layout.addWidget(self.plan_btn)
+        
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        
+        self.plan_display = QTextEdit()
+        self.plan_display.setReadOnly(True)
+        layout.addWidget(self.plan_display, 2)
+        
+        leg_layout = QHBoxLayout()
+        self.leg_combo = QComboBox()
+        leg_layout.addWidget(self.leg_combo, 1)
+        self.show_leg_btn = GlowButton("🧭 Show Leg Directions")
+        self.show_leg_btn.clicked.connect(self.show_leg)
+        self.show_leg_btn.setEnabled(False)
+        leg_layout.addWidget(self.show_leg_btn)
+        layout.addLayout(leg_layout)
+    
+    def plan_trip(self):
+        """Solve the visiting order for the entered stops"""
+        stops, time_windows = [], []
+        try:
+            for line in self.stops_input.toPlainText().splitlines():
+                if line.strip():
+                    stop, window = parse_stop_line(line, self.departure_time)
+                    stops.append(stop)
+                    time_windows.append(window)
+        except ValueError as e:
+            QMessageBox.warning(self, "Input Error", str(e))
+            return
+        if len(stops) < 2:
+            QMessageBox.warning(self, "Input Error", "Please enter at least two stops")
+            return
+        
+        worker = TripPlannerThread(
+            stops, self.mode, self.departure_time,
+            round_trip=self.round_trip_checkbox.isChecked(),
+            fixed_end=self.fixed_end_checkbox.isChecked(),
+            time_windows=time_windows,
+            service_minutes=self.service_combo.currentData(),
+            directions_cache=self.directions_cache,
+            matrix_cache=self.matrix_cache
+        )
+        worker.plan_ready.connect(self.on_plan_ready)
+        worker.plan_error.connect(self.on_plan_error)
+        try:
+            self.planner_worker = self.start_worker(('trip_plan', id(self)), worker)
+        except ExecutorBusyError as e:
+            QMessageBox.warning(self, "Busy", str(e))
+            return
+        
+        self.plan_btn.setEnabled(False)
+        self.status_label.setText(f"🔄 Fetching travel times between {len(stops)} stops...")
+    
+    def on_plan_ready(self, plan):
+        self.plan = plan
+        self.plan_btn.setEnabled(True)
+        self.status_label.setText("")
+        self.plan_display.setHtml(trip_plan_html(plan))
+        self.leg_combo.clear()
+        for number, leg in enumerate(plan.legs, 1):
+            self.leg_combo.addItem(f"Leg {number}: {plan.stops[number - 1]} → {plan.stops[number]}")
+        self.show_leg_btn.setEnabled(bool(plan.legs))
+    
+    def on_plan_error(self, error_message):
+        self.plan_btn.setEnabled(True)
+        self.status_label.setText(f"❌ {error_message}")
+    
+    def show_leg(self):
+        index = self.leg_combo.currentIndex()
+        if self.plan is not None and index >= 0 and self.plan.legs[index]:
+            self.leg_chosen.emit(self.plan.legs[index])
+    
+    def reject(self):
+        # Stop a running plan when the dialog is closed
+        if hasattr(self, 'planner_worker'):
+            self.planner_worker.cancel_event.set()
+        super().reject()
+
+class RouteComparisonDialog(QDialog):
+    """Alternative routes side by side, re-rankable without new requests"""
+    
+    route_chosen = pyqtSignal(dict)
+    
+    def __init__(self, comparison, parent=None):
+        super().__init__(parent)
+        self.options = comparison.options
+        
+        self.setWindowTitle("🔀 Compare Routes")
+        self.resize(1100, 700)
+        layout = QVBoxLayout(self)
+        
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel("Rank by:"))
+        self.rank_combo = QComboBox()
+        for rank_by, label in RANKINGS.items():
+            self.rank_combo.addItem(label, rank_by)
+        self.rank_combo.currentIndexChanged.connect(self.show_ranking)
+        controls_layout.addWidget(self.rank_combo)
+        controls_layout.addStretch()
+        layout.addLayout(controls_layout)
+        
+        self.comparison_display = QTextEdit()
+        self.comparison_display.setReadOnly(True)
+        layout.addWidget(self.comparison_display)
+        
+        if comparison.errors:
+            layout.addWidget(QLabel("⚠️ Not compared: " + "; ".join(comparison.errors)))
+        
+        choose_layout = QHBoxLayout()
+        self.route_combo = QComboBox()
+        choose_layout.addWidget(self.route_combo, 1)
+        self.choose_btn = GlowButton("🧭 Show This Route")
+        self.choose_btn.clicked.connect(self.choose_route)
+        choose_layout.addWidget(self.choose_btn)
+        layout.addLayout(choose_layout)
+        
+        self.show_ranking()
+    
+    def show_ranking(self):
+        rank_by = self.rank_combo.currentData()
+        self.options = rank_routes(self.options, rank_by)
+        self.comparison_display.setHtml(comparison_html(self.options, rank_by))
+        self.route_combo.clear()
+        for i, option in enumerate(self.options):
+            data = option.directions_data
+            via = f" via {option.summary}" if option.summary else ""
+            self.route_combo.addItem(f"#{i + 1} {data['mode'].title()}{via} — {data['duration']}, {data['distance']}")
+    
+    def choose_route(self):
+        index = self.route_combo.currentIndex()
+        if index >= 0:
+            self.route_chosen.emit(self.options[index].directions_data)
+            self.accept()
 
 class EnhancedTravelAssistant(QMainWindow):
     def __init__(self):
         super().__init__()
         self.user_info = None
         self.user_data_file = 'enhanced_travel_data.json'
+        self.store = SqliteStore('travel_data.db')
+        self.directions_cache = DirectionsCache('directions_cache.json')
+        self.geocode_cache = GeocodeCache('geocode_cache.json')
+        # Addresses suggested while typing origin and destination
+        self.place_index = PrefixIndex()
+        self.place_suggestion_tasks = {}
+        # Road graph built with ``python Offline_router.py --import``, used when Google Maps is unreachable
+        self.offline_router = None
+        if os.path.isdir(OFFLINE_GRAPH_DIR):
+            try:
+                self.offline_router = OfflineRouter(OFFLINE_GRAPH_DIR, geocoder=self.geocode_cache.coordinates)
+            except Exception as e:
+                print(f"Warning: offline map not loaded: {e}")
+        self.matrix_cache = MatrixCellCache()
+        # Warms the cache just before the user's habitual trips
+        self.commute_prefetcher = CommutePrefetcher(self.directions_cache, self.geocode_cache)
+        # Every background request runs on this bounded pool
+        self.executor = TaskExecutor()
+        # Workers whose tasks are running; released on the GUI thread once they finish
+        self.active_workers = set()
+        # The worker in flight under each task key, handed back when a request repeats one
+        self.running_workers = {}
+        # Directions, chat and batch requests share one asyncio loop when an async HTTP client is installed
+        self.async_runner = AsyncRunner(QApplication.instance()) if ASYNC_NETWORKING else None
+        # Prompt pieces kept rendered between chat messages
+        self.context_builder = ContextBuilder()
+        # Replies to questions already asked in the same journey context
+        self.response_cache = ResponseCache(similarity_threshold=NEAR_DUPLICATE_THRESHOLD)
+        # Search over the signed-in user's whole history, for the AI prompt
+        try:
+            self.history_index = HistoryIndex()
+        except RuntimeError as e:
+            print(f"Warning: {e}")
+            self.history_index = None
+        
+        # One-shot import of the JSON files used by earlier versions
+        try:
+            migrate_json_data(self.store, self.user_data_file)
+        except Exception as e:
+            print(f"Error migrating travel data: {e}")
         self.current_user_data = {}
-        self.conversation_history = []
+        self.conversation_memory = ConversationMemory()
         self.most_recent_journey = None
+        # Insights are recomputed the next time their tab is opened after this is set
+        self.insights_stale = True
         
         self.init_ui()
         self.show_login_screen()
+        
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.timeout.connect(self.prefetch_commutes)
+        self.prefetch_timer.start(CHECK_INTERVAL_MS)
     
     def init_ui(self):
         self.setWindowTitle("🌟 Smart Travel Assistant - Smart Maps + AI")
@@ -473,6 +1321,11 @@ class EnhancedTravelAssistant(QMainWindow):
         self.history_tab = self.create_history_tab()
         self.tab_widget.addTab(self.history_tab, "📚 Journey History")
         
+        # Travel Insights Tab
+        self.insights_tab = self.create_insights_tab()
+        self.tab_widget.addTab(self.insights_tab, "📊 Insights")
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+        
         layout.addWidget(self.tab_widget)
         
         self.stacked_widget.addWidget(main_widget)
@@ -515,6 +1368,10 @@ class EnhancedTravelAssistant(QMainWindow):
         self.destination_input.setPlaceholderText("Enter destination (e.g., Monas, Kota Tua)")
         form_layout.addWidget(self.destination_input, 1, 1)
         
+        # As-you-type suggestions from past journeys and known places
+        self.origin_completer = self.create_place_completer(self.origin_input, 'origin')
+        self.destination_completer = self.create_place_completer(self.destination_input, 'destination')
+        
         # Travel mode
         mode_label = QLabel("🚗 Mode:")
         mode_label.setFont(QFont("Arial", 12, QFont.Bold))
@@ -541,6 +1398,13 @@ class EnhancedTravelAssistant(QMainWindow):
         self.departure_time.setEnabled(False)
         time_layout.addWidget(self.departure_time)
         
+        # How far ahead "find best time" looks
+        self.window_combo = QComboBox()
+        for hours in (1, 2, 4, 8):
+            self.window_combo.addItem(f"Next {hours} hour{'s' if hours > 1 else ''}", hours)
+        self.window_combo.setCurrentIndex(1)
+        time_layout.addWidget(self.window_combo)
+        
         form_layout.addLayout(time_layout, 3, 1)
         
         layout.addWidget(form_frame)
@@ -552,6 +1416,40 @@ class EnhancedTravelAssistant(QMainWindow):
         self.get_directions_btn.setFixedHeight(50)
         layout.addWidget(self.get_directions_btn)
         
+        # Alternatives for one or every mode, side by side
+        compare_layout = QHBoxLayout()
+        self.compare_btn = GlowButton("🔀 Compare Routes")
+        self.compare_btn.clicked.connect(self.compare_routes)
+        self.compare_btn.setFixedHeight(40)
+        compare_layout.addWidget(self.compare_btn, 1)
+        self.all_modes_checkbox = QCheckBox("All modes")
+        compare_layout.addWidget(self.all_modes_checkbox)
+        layout.addLayout(compare_layout)
+        
+        # Sweep departure times for the quickest trip
+        self.best_time_btn = GlowButton("⏰ Find Best Time to Leave")
+        self.best_time_btn.clicked.connect(self.find_best_departure)
+        self.best_time_btn.setFixedHeight(40)
+        layout.addWidget(self.best_time_btn)
+        
+        # Batch planning from a CSV of trips
+        self.batch_plan_btn = GlowButton("📂 Batch Plan Trips from CSV")
+        self.batch_plan_btn.clicked.connect(self.start_batch_plan)
+        self.batch_plan_btn.setFixedHeight(40)
+        layout.addWidget(self.batch_plan_btn)
+        
+        # Visiting order for a day of stops
+        self.trip_plan_btn = GlowButton("🗺️ Plan Multi-Stop Trip")
+        self.trip_plan_btn.clicked.connect(self.open_trip_planner)
+        self.trip_plan_btn.setFixedHeight(40)
+        layout.addWidget(self.trip_plan_btn)
+        
+        # Many-to-many travel-time table
+        self.matrix_btn = GlowButton("🧮 Travel-Time Matrix")
+        self.matrix_btn.clicked.connect(self.open_travel_matrix)
+        self.matrix_btn.setFixedHeight(40)
+        layout.addWidget(self.matrix_btn)
+        
         # Directions results
         self.directions_display = QTextEdit()
         self.directions_display.setReadOnly(True)
@@ -580,12 +1478,16 @@ class EnhancedTravelAssistant(QMainWindow):
         """)
         layout.addWidget(chat_header)
         
-        # Chat display
-        self.chat_display = QTextEdit()
-        self.chat_display.setReadOnly(True)
+        # Chat display, appended to incrementally
+        self.chat_display = ChatView()
         self.chat_display.setPlaceholderText("Start chatting with AI about your travel plans...")
         layout.addWidget(self.chat_display)
         
+        # Latency of the last streamed reply
+        self.chat_status = QLabel("")
+        self.chat_status.setStyleSheet("color: #888; font-size: 11px;")
+        layout.addWidget(self.chat_status)
+        
         # Chat input area
         input_frame = QFrame()
         input_frame.setStyleSheet("""
@@ -661,9 +1563,12 @@ class EnhancedTravelAssistant(QMainWindow):
         """)
         layout.addWidget(history_header)
         
-        # History list
-        self.history_list = QListWidget()
-        self.history_list.itemDoubleClicked.connect(self.on_history_item_clicked)
+        # History list; rows are built only for the journeys on screen
+        self.history_model = JourneyHistoryModel(self)
+        self.history_list = QListView()
+        self.history_list.setUniformItemSizes(True)
+        self.history_list.setModel(self.history_model)
+        self.history_list.doubleClicked.connect(self.on_history_item_clicked)
         layout.addWidget(self.history_list)
         
         # History controls
@@ -683,6 +1588,41 @@ class EnhancedTravelAssistant(QMainWindow):
         
         return widget
     
+    def create_insights_tab(self):
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setSpacing(15)
+        
+        # Insights header
+        insights_header = QLabel("📊 Your Travel Insights")
+        insights_header.setFont(QFont("Arial", 16, QFont.Bold))
+        insights_header.setAlignment(Qt.AlignCenter)
+        insights_header.setStyleSheet("""
+            QLabel {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:1, 
+                    stop:0 rgba(102, 126, 234, 0.2), stop:1 rgba(118, 75, 162, 0.2));
+                border-radius: 10px;
+                padding: 15px;
+                margin: 5px;
+            }
+        """)
+        layout.addWidget(insights_header)
+        
+        self.insights_display = QTextEdit()
+        self.insights_display.setReadOnly(True)
+        layout.addWidget(self.insights_display)
+        
+        controls_layout = QHBoxLayout()
+        controls_layout.addStretch()
+        
+        refresh_btn = GlowButton("🔄 Refresh")
+        refresh_btn.clicked.connect(self.refresh_insights)
+        controls_layout.addWidget(refresh_btn)
+        
+        layout.addLayout(controls_layout)
+        
+        return widget
+    
     # Continuing from where the code was cut off...
 
     def apply_styling(self):
@@ -817,8 +1757,8 @@ class EnhancedTravelAssistant(QMainWindow):
                 selection-background-color: #667eea;
             }
             
-            /* List Widget */
-            QListWidget {
+            /* List View */
+            QListView {
                 background: qlineargradient(x1:0, y1:0, x2:0, y2:1, 
                     stop:0 rgba(255, 255, 255, 0.08), stop:1 rgba(255, 255, 255, 0.03));
                 border: 2px solid #4a4a4a;
@@ -828,7 +1768,7 @@ class EnhancedTravelAssistant(QMainWindow):
                 color: #ffffff;
             }
             
-            QListWidget::item {
+            QListView::item {
                 background: rgba(255, 255, 255, 0.05);
                 border: 1px solid #4a4a4a;
                 border-radius: 8px;
@@ -837,14 +1777,14 @@ class EnhancedTravelAssistant(QMainWindow):
                 color: #ffffff;
             }
             
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background: qlineargradient(x1:0, y1:0, x2:1, y2:1, 
                     stop:0 #667eea, stop:1 #764ba2);
                 border: 2px solid #667eea;
                 color: #ffffff;
             }
             
-            QListWidget::item:hover {
+            QListView::item:hover {
                 background: rgba(102, 126, 234, 0.3);
                 border: 2px solid #667eea;
             }
@@ -1008,11 +1948,15 @@ class EnhancedTravelAssistant(QMainWindow):
         self.auth_thread = AuthThread()
         self.auth_thread.auth_success.connect(self.on_auth_success)
         self.auth_thread.auth_error.connect(self.on_auth_error)
-        self.auth_thread.start()
+        self.executor.submit('auth', self.auth_thread.run, self.auth_thread.cancel_event)
     
     def on_auth_success(self, user_info):
         """Handle successful authentication"""
         self.user_info = user_info
+        try:
+            self.store.save_user_profile(user_info)
+        except Exception as e:
+            print(f"Error saving user profile: {e}")
         self.welcome_label.setText(f"🎉 Welcome, {user_info.get('name', 'User')}!")
         self.login_status.setText("✅ Authentication successful!")
         
@@ -1030,16 +1974,36 @@ class EnhancedTravelAssistant(QMainWindow):
     
     def logout(self):
         """Logout and return to login screen"""
+        self.reset_history_index()
+        if self.user_info:
+            self.executor.cancel(('place_index', self.user_info.get('email', 'unknown')))
+        self.place_index.clear()
+        if self.user_info:
+            self.executor.cancel(('commute_prefetch', self.user_info.get('email', 'unknown')))
+        self.commute_prefetcher.clear()
+        if self.async_runner is not None:
+            # Cancelled coroutines emit nothing, so their buttons are reset here
+            self.async_runner.cancel_all()
+        self.get_directions_btn.setEnabled(True)
+        self.get_directions_btn.setText("🧭 Get Directions with Live Traffic")
+        self.batch_plan_btn.setEnabled(True)
+        self.batch_plan_btn.setText("📂 Batch Plan Trips from CSV")
+        self.chat_status.setText("")
+        
         # Clear user data
         self.user_info = None
         self.current_user_data = {}
-        self.conversation_history = []
+        self.conversation_memory.clear()
         self.most_recent_journey = None
+        self.context_builder.reset()
+        self.response_cache.clear()
         
         # Clear displays
         self.chat_display.clear()
         self.directions_display.clear()
-        self.history_list.clear()
+        self.history_model.clear()
+        self.insights_display.clear()
+        self.insights_stale = True
         
         # Remove token file
         if os.path.exists(TOKEN_FILE):
@@ -1063,55 +2027,197 @@ class EnhancedTravelAssistant(QMainWindow):
         user_email = self.user_info.get('email', 'unknown')
         
         try:
-            if os.path.exists(self.user_data_file):
-                with open(self.user_data_file, 'r', encoding='utf-8') as f:
-                    all_user_data = json.load(f)
-                    self.current_user_data = all_user_data.get(user_email, {
-                        'journeys': [],
-                        'conversations': [],
-                        'preferences': {}
-                    })
-            else:
-                self.current_user_data = {
-                    'journeys': [],
-                    'conversations': [],
-                    'preferences': {}
-                }
+            # Only this user's rows are read
+            self.current_user_data = self.store.load_user(user_email)
         except Exception as e:
             print(f"Error loading user data: {e}")
-            self.current_user_data = {
-                'journeys': [],
-                'conversations': [],
-                'preferences': {}
-            }
+            self.current_user_data = empty_user_data()
+        
+        self.context_builder.set_journeys(self.current_user_data.get('journeys', []))
+        self.rebuild_history_index(user_email)
+        self.rebuild_place_index(user_email)
+        self.commute_prefetcher.set_journeys(self.current_user_data.get('journeys', []))
+        self.insights_stale = True
+        self.prefetch_commutes()
     
-    def save_user_data(self):
-        """Save user-specific data to file"""
+    def prefetch_commutes(self):
+        """Warm the directions cache for any habitual trip due to start soon"""
         if not self.user_info:
             return
         
-        user_email = self.user_info.get('email', 'unknown')
+        task_key = ('commute_prefetch', self.user_info.get('email', 'unknown'))
+        if self.executor.is_in_flight(task_key):
+            return
         
+        prefetch_worker = CommutePrefetchThread(self.commute_prefetcher)
+        prefetch_worker.prefetch_finished.connect(self.on_commutes_prefetched)
         try:
-            # Load existing data
-            all_user_data = {}
-            if os.path.exists(self.user_data_file):
-                with open(self.user_data_file, 'r', encoding='utf-8') as f:
-                    all_user_data = json.load(f)
-            
-            # Update current user's data
-            all_user_data[user_email] = self.current_user_data
-            
-            # Save back to file
-            with open(self.user_data_file, 'w', encoding='utf-8') as f:
-                json.dump(all_user_data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving user data: {e}")
+            self.start_worker(task_key, prefetch_worker)
+        except ExecutorBusyError:
+            # Tried again on the next check
+            pass
+    
+    def on_commutes_prefetched(self, warmed, calls):
+        if warmed:
+            print(f"Prefetched {warmed} usual trip(s) with {calls} API call(s)")
+    
+    def rebuild_history_index(self, email):
+        """Index the user's stored journeys and conversations in the background"""
+        if self.history_index is None:
+            return
+        self.history_index.clear()
+        cancel_event = threading.Event()
+        
+        def build():
+            try:
+                journeys, conversations = self.store.load_history_records(email)
+            except Exception as e:
+                print(f"Error indexing travel history: {e}")
+                return
+            for journey, step_text in journeys:
+                if cancel_event.is_set():
+                    return
+                self.history_index.add_journey(journey, [step_text])
+            for conversation in conversations:
+                if cancel_event.is_set():
+                    return
+                self.history_index.add_conversation(conversation)
+        
+        try:
+            self.executor.submit(('history_index', email), build, cancel_event)
+        except (ExecutorBusyError, RuntimeError) as e:
+            print(f"Could not index travel history: {e}")
+    
+    def rebuild_place_index(self, email):
+        """Fill the autocomplete index from the user's journeys in the background"""
+        self.place_index.clear()
+        cancel_event = threading.Event()
+        
+        def still_wanted():
+            # A logout or another sign-in since the build started must not see this user's places
+            return not cancel_event.is_set() and bool(self.user_info) and self.user_info.get('email') == email
+        
+        def build():
+            try:
+                summaries = self.store.load_journey_index(email)
+            except Exception as e:
+                print(f"Error indexing places: {e}")
+                return
+            # Each trip counts as a use of both ends
+            travelled = [address for summary in summaries
+                         for address in (summary.origin, summary.destination) if address]
+            # The geocode cache is shared by everyone on this machine, so only this user's places are taken from it
+            geocoded = set()
+            for address in set(travelled):
+                place = self.geocode_cache.lookup(address, fuzzy=False)
+                if place is not None:
+                    geocoded.add(place.address)
+            
+            if not still_wanted():
+                return
+            self.place_index.extend(travelled)
+            if not still_wanted():
+                return
+            # Formatted addresses rank below places as travelled to
+            self.place_index.extend(geocoded, count=0)
+        
+        try:
+            self.executor.submit(('place_index', email), build, cancel_event)
+        except (ExecutorBusyError, RuntimeError) as e:
+            print(f"Could not index places: {e}")
+    
+    def create_place_completer(self, line_edit, field):
+        completer = PlaceCompleter(line_edit, self.place_index)
+        completer.remote_requested.connect(
+            lambda text, session_token: self.request_place_suggestions(completer, field, text, session_token))
+        completer.remote_cancelled.connect(lambda: self.cancel_place_suggestions(field))
+        return completer
+    
+    def request_place_suggestions(self, completer, field, text, session_token):
+        """Ask the Places API for suggestions the local index could not give"""
+        self.cancel_place_suggestions(field)
+        worker = PlacesAutocompleteThread(text, session_token)
+        worker.suggestions_ready.connect(completer.show_remote)
+        try:
+            self.place_suggestion_tasks[field] = self.start_worker(('place_suggestions', field, text), worker)
+        except (ExecutorBusyError, RuntimeError) as e:
+            # Suggestions are a convenience; never bother the user about them
+            print(f"Could not fetch place suggestions: {e}")
+    
+    def cancel_place_suggestions(self, field):
+        worker = self.place_suggestion_tasks.pop(field, None)
+        if worker is not None:
+            worker.cancel_event.set()
+    
+    def reset_history_index(self):
+        """Stop any index build for the current user and drop the index"""
+        if self.history_index is None:
+            return
+        if self.user_info:
+            self.executor.cancel(('history_index', self.user_info.get('email', 'unknown')))
+        self.history_index.clear()
     
     def toggle_departure_time(self, checked):
         """Toggle departure time input"""
         self.departure_time.setEnabled(not checked)
     
+    def submit_network_task(self, task_key, worker):
+        """Run ``worker`` on the asyncio loop when there is one, else on the shared pool.
+
+        Returns the worker that runs: a repeat of a key still in flight gets
+        the earlier worker back and ``worker`` is dropped.
+        """
+        if self.async_runner is None:
+            return self.start_worker(task_key, worker)
+        running = self.running_worker(task_key, worker)
+        if running is not None:
+            return running
+        future = self.async_runner.submit(task_key, worker.run_async(self.async_runner), worker.cancel_event)
+        self.track_worker(task_key, worker, future)
+        return worker
+    
+    def start_worker(self, task_key, worker):
+        """Run ``worker`` on the shared pool under ``task_key``; returns the worker that runs, as above"""
+        running = self.running_worker(task_key, worker)
+        if running is not None:
+            return running
+        handle = self.executor.submit(task_key, worker.run, worker.cancel_event)
+        self.track_worker(task_key, worker, handle.future)
+        return worker
+    
+    def running_worker(self, task_key, worker):
+        """The worker already in flight under ``task_key``, if any; ``worker`` is then discarded"""
+        running = self.running_workers.get(task_key)
+        if running is None or not self.network_task_in_flight(task_key):
+            return None
+        worker.deleteLater()
+        return running
+    
+    def track_worker(self, task_key, worker, future):
+        """Keep ``worker`` alive until ``future`` is done and its queued signals have been delivered"""
+        self.active_workers.add(worker)
+        self.running_workers[task_key] = worker
+        # Queued after the worker's other signals, so the GUI thread handles those first
+        worker.task_done.connect(lambda worker, task_key=task_key: self.release_worker(task_key, worker))
+        future.add_done_callback(lambda _, worker=worker: worker.task_done.emit(worker))
+    
+    def release_worker(self, task_key, worker):
+        self.active_workers.discard(worker)
+        if self.running_workers.get(task_key) is worker:
+            del self.running_workers[task_key]
+        worker.deleteLater()
+    
+    def cancel_network_task(self, task_key):
+        """Stop the task under ``task_key`` on the asyncio loop or the shared pool"""
+        if self.async_runner is not None:
+            self.async_runner.cancel(task_key)
+        self.executor.cancel(task_key)
+    
+    def network_task_in_flight(self, task_key):
+        if self.async_runner is not None and self.async_runner.is_in_flight(task_key):
+            return True
+        return self.executor.is_in_flight(task_key)
+    
     def get_directions(self):
         """Get directions from Google Maps"""
         origin = self.origin_input.text().strip()
@@ -1129,16 +2235,26 @@ class EnhancedTravelAssistant(QMainWindow):
         else:
             departure_time = self.departure_time.dateTime().toPyDateTime()
         
+        # The same route is already being fetched; its result will be shown
+        task_key = ('directions', make_cache_key(origin, destination, mode, departure_time))
+        if self.network_task_in_flight(task_key):
+            return
+        
+        # Queue the Google Maps request on the shared pool
+        maps_worker = GoogleMapsThread(origin, destination, mode, departure_time, cache=self.directions_cache,
+                                       offline_router=self.offline_router, geocode_cache=self.geocode_cache)
+        maps_worker.directions_ready.connect(self.on_directions_ready)
+        maps_worker.directions_error.connect(self.on_directions_error)
+        try:
+            self.submit_network_task(task_key, maps_worker)
+        except ExecutorBusyError as e:
+            QMessageBox.warning(self, "Busy", str(e))
+            return
+        
         # Disable button and show loading
         self.get_directions_btn.setEnabled(False)
         self.get_directions_btn.setText("🔄 Getting Directions...")
         self.directions_display.setText("🔄 Fetching directions with live traffic data...")
-        
-        # Start Google Maps thread
-        self.maps_thread = GoogleMapsThread(origin, destination, mode, departure_time)
-        self.maps_thread.directions_ready.connect(self.on_directions_ready)
-        self.maps_thread.directions_error.connect(self.on_directions_error)
-        self.maps_thread.start()
     
     def on_directions_ready(self, directions_data):
         """Handle directions results"""
@@ -1151,12 +2267,242 @@ class EnhancedTravelAssistant(QMainWindow):
         
         # Save journey to user data
         self.save_journey(directions_data)
+        self.place_index.add(directions_data['origin'])
+        self.place_index.add(directions_data['destination'])
         
         # Store most recent journey for AI context
         self.most_recent_journey = directions_data
+        self.context_builder.set_recent_journey(directions_data)
+    
+    def compare_routes(self):
+        """Fetch alternative routes for the chosen mode, or every mode, and compare them"""
+        origin = self.origin_input.text().strip()
+        destination = self.destination_input.text().strip()
         
-        # Update history display
-        self.update_history_display()
+        if not origin or not destination:
+            QMessageBox.warning(self, "Input Error", "Please enter both origin and destination")
+            return
+        
+        modes = COMPARE_MODES if self.all_modes_checkbox.isChecked() else (self.mode_combo.currentText(),)
+        if self.now_checkbox.isChecked():
+            departure_time = datetime.now()
+        else:
+            departure_time = self.departure_time.dateTime().toPyDateTime()
+        
+        task_key = ('compare_routes', origin, destination, modes)
+        if self.executor.is_in_flight(task_key):
+            return
+        
+        comparison_worker = RouteComparisonThread(origin, destination, modes, departure_time,
+                                                  cache=self.directions_cache, geocode_cache=self.geocode_cache)
+        comparison_worker.comparison_ready.connect(self.on_routes_ready)
+        comparison_worker.comparison_error.connect(self.on_routes_error)
+        try:
+            self.start_worker(task_key, comparison_worker)
+        except ExecutorBusyError as e:
+            QMessageBox.warning(self, "Busy", str(e))
+            return
+        
+        self.compare_btn.setEnabled(False)
+        self.compare_btn.setText("🔄 Fetching alternative routes...")
+    
+    def on_routes_ready(self, comparison):
+        self.compare_btn.setEnabled(True)
+        self.compare_btn.setText("🔀 Compare Routes")
+        dialog = RouteComparisonDialog(comparison, parent=self)
+        dialog.setStyleSheet(self.styleSheet())
+        # A chosen route is shown and saved like any other directions result
+        dialog.route_chosen.connect(self.on_directions_ready)
+        dialog.exec_()
+    
+    def on_routes_error(self, error_message):
+        self.compare_btn.setEnabled(True)
+        self.compare_btn.setText("🔀 Compare Routes")
+        QMessageBox.warning(self, "Route Comparison Error", error_message)
+    
+    def find_best_departure(self):
+        """Sweep departure times in the chosen window for the shortest predicted trip"""
+        origin = self.origin_input.text().strip()
+        destination = self.destination_input.text().strip()
+        
+        if not origin or not destination:
+            QMessageBox.warning(self, "Input Error", "Please enter both origin and destination")
+            return
+        
+        mode = self.mode_combo.currentText()
+        if self.now_checkbox.isChecked():
+            window_start = datetime.now()
+        else:
+            window_start = self.departure_time.dateTime().toPyDateTime()
+        window_end = window_start + timedelta(hours=self.window_combo.currentData())
+        
+        task_key = ('best_departure', origin, destination, mode, window_start.replace(second=0, microsecond=0))
+        if self.executor.is_in_flight(task_key):
+            return
+        
+        optimizer_worker = DepartureOptimizerThread(
+            origin, destination, mode, window_start, window_end,
+            store=self.store,
+            email=self.user_info.get('email') if self.user_info else None,
+            cache=self.directions_cache
+        )
+        optimizer_worker.slot_ready.connect(self.on_departure_slot_ready)
+        optimizer_worker.optimization_ready.connect(self.on_best_departure_ready)
+        optimizer_worker.optimization_error.connect(self.on_best_departure_error)
+        try:
+            self.start_worker(task_key, optimizer_worker)
+        except ExecutorBusyError as e:
+            QMessageBox.warning(self, "Busy", str(e))
+            return
+        
+        self.best_time_btn.setEnabled(False)
+        self.best_time_btn.setText("🔄 Checking departure times...")
+        self.directions_display.setHtml(
+            f'<h2 style="color: #4facfe;">⏰ Departures from {window_start:%H:%M} to {window_end:%H:%M}</h2>'
+        )
+    
+    def on_departure_slot_ready(self, slot):
+        """Show one live estimate as it arrives"""
+        self.directions_display.append(
+            f'<p>🕒 {slot.departure_time:%a %H:%M} • ⏱️ {format_duration(slot.duration_s)}</p>'
+        )
+    
+    def on_best_departure_ready(self, result):
+        """Show the duration curve and preselect the best departure time"""
+        self.best_time_btn.setEnabled(True)
+        self.best_time_btn.setText("⏰ Find Best Time to Leave")
+        
+        best = result.best
+        longest = max(slot.duration_s for slot in result.curve)
+        rows = []
+        for slot in result.curve:
+            width = max(2, round(240 * slot.duration_s / longest))
+            color = '#00f2fe' if slot.departure_time == best.departure_time else (
+                '#667eea' if slot.source == 'live' else 'rgba(102, 126, 234, 0.35)')
+            note = '' if slot.source == 'live' else ' (from your past trips)'
+            rows.append(
+                f'<tr><td>{slot.departure_time:%H:%M}</td>'
+                f'<td><table cellspacing="0" cellpadding="0"><tr><td width="{width}" '
+                f'style="background-color: {color}">&nbsp;</td></tr></table></td>'
+                f'<td>{format_duration(slot.duration_s)}{note}</td></tr>'
+            )
+        self.directions_display.setHtml(f"""
+            <h2 style="color: #4facfe;">⏰ Best time to leave: {best.departure_time:%a %H:%M}</h2>
+            <p>⏱️ About <b>{format_duration(best.duration_s)}</b> to {result.directions_data['destination']} 
+            ({result.queried} times checked, {result.pruned} skipped using your past trips).</p>
+            <table cellspacing="2">{''.join(rows)}</table>
+            <p>The departure time has been set; press <b>Get Directions</b> to see this route.</p>
+        """)
+        
+        # Preselect the slot; its route is already cached, so Get Directions is instant
+        self.now_checkbox.setChecked(False)
+        self.departure_time.setDateTime(QDateTime(best.departure_time))
+    
+    def on_best_departure_error(self, error_message):
+        self.best_time_btn.setEnabled(True)
+        self.best_time_btn.setText("⏰ Find Best Time to Leave")
+        self.directions_display.setText(f"❌ Error: {error_message}")
+        QMessageBox.warning(self, "Departure Time Error", error_message)
+    
+    def open_trip_planner(self):
+        """Open the multi-stop trip planner"""
+        if self.now_checkbox.isChecked():
+            departure_time = datetime.now()
+        else:
+            departure_time = self.departure_time.dateTime().toPyDateTime()
+        
+        dialog = TripPlannerDialog(
+            self.start_worker,
+            self.directions_cache,
+            self.matrix_cache,
+            mode=self.mode_combo.currentText(),
+            departure_time=departure_time,
+            parent=self
+        )
+        dialog.setStyleSheet(self.styleSheet())
+        dialog.leg_chosen.connect(self.display_directions)
+        dialog.exec_()
+    
+    def open_travel_matrix(self):
+        """Open the many-to-many travel-time table"""
+        if self.now_checkbox.isChecked():
+            departure_time = datetime.now()
+        else:
+            departure_time = self.departure_time.dateTime().toPyDateTime()
+        
+        dialog = TravelMatrixDialog(
+            self.submit_network_task,
+            self.cancel_network_task,
+            self.matrix_cache,
+            mode=self.mode_combo.currentText(),
+            departure_time=departure_time,
+            parent=self
+        )
+        dialog.setStyleSheet(self.styleSheet())
+        dialog.exec_()
+    
+    def start_batch_plan(self):
+        """Plan every trip in a CSV file concurrently"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Open Trips CSV", "", "CSV files (*.csv);;All files (*)"
+        )
+        if not path:
+            return
+        
+        try:
+            rows = read_batch_csv(path)
+        except Exception as e:
+            QMessageBox.warning(self, "Batch Error", f"Could not read {os.path.basename(path)}: {e}")
+            return
+        
+        if not rows:
+            QMessageBox.information(self, "Batch Plan", "The CSV file has no trips.")
+            return
+        
+        batch_worker = BatchPlannerThread(rows, cache=self.directions_cache)
+        batch_worker.row_ready.connect(self.on_batch_row_ready)
+        batch_worker.row_failed.connect(self.on_batch_row_failed)
+        batch_worker.batch_finished.connect(self.on_batch_finished)
+        batch_worker.batch_error.connect(self.on_batch_error)
+        try:
+            self.submit_network_task(('batch', path), batch_worker)
+        except ExecutorBusyError as e:
+            QMessageBox.warning(self, "Busy", str(e))
+            return
+        
+        self.batch_plan_btn.setEnabled(False)
+        self.batch_plan_btn.setText(f"🔄 Planning {len(rows)} trips...")
+        self.directions_display.setHtml(
+            f'<h2 style="color: #4facfe;">📂 Batch plan: {len(rows)} trips</h2>'
+        )
+    
+    def on_batch_row_ready(self, index, directions_data):
+        """Show and save one finished batch trip"""
+        traffic = directions_data.get('duration_in_traffic', 'N/A')
+        self.directions_display.append(
+            f'<p>✅ <b>#{index + 1}</b> {directions_data["origin"]} → {directions_data["destination"]} '
+            f'({directions_data["mode"]}) • ⏱️ {directions_data["duration"]} • 📏 {directions_data["distance"]}'
+            f'{" • 🚦 " + traffic if traffic != "N/A" else ""}</p>'
+        )
+        self.save_journey(directions_data)
+    
+    def on_batch_row_failed(self, index, error_message):
+        """Show one failed batch trip"""
+        self.directions_display.append(f'<p style="color: #ff6b6b;">❌ <b>#{index + 1}</b> {error_message}</p>')
+    
+    def on_batch_finished(self, succeeded, failed):
+        """Handle the end of a batch plan"""
+        self.batch_plan_btn.setEnabled(True)
+        self.batch_plan_btn.setText("📂 Batch Plan Trips from CSV")
+        self.directions_display.append(
+            f'<p style="color: #00f2fe;"><b>Done:</b> {succeeded} planned, {failed} failed</p>'
+        )
+    
+    def on_batch_error(self, error_message):
+        """Handle a batch that could not start"""
+        self.batch_plan_btn.setEnabled(True)
+        self.batch_plan_btn.setText("📂 Batch Plan Trips from CSV")
+        QMessageBox.warning(self, "Batch Error", error_message)
     
     def on_directions_error(self, error_message):
         """Handle directions error"""
@@ -1178,6 +2524,7 @@ class EnhancedTravelAssistant(QMainWindow):
                 <p><strong>⏱️ Duration:</strong> {directions_data['duration']}</p>
                 <p><strong>📏 Distance:</strong> {directions_data['distance']}</p>
                 {'<p><strong>🚦 With Traffic:</strong> ' + directions_data['duration_in_traffic'] + '</p>' if directions_data['duration_in_traffic'] != 'N/A' else ''}
+                {'<p style="color: #ffd36e;"><strong>📴 Offline route:</strong> Google Maps was unreachable, so this was planned on the local map without live traffic.</p>' if directions_data.get('offline') else ''}
             </div>
             
             <h3 style="color: #00f2fe; margin-bottom: 15px;">📋 Step-by-Step Directions</h3>
@@ -1215,13 +2562,35 @@ class EnhancedTravelAssistant(QMainWindow):
             self.current_user_data['journeys'] = []
         
         self.current_user_data['journeys'].append(journey_entry)
+        self.context_builder.add_journey(journey_entry)
+        if self.history_index is not None:
+            self.history_index.add_journey(journey_entry)
+        
+        # Keep only the most recent journeys to prevent data from getting too large
+        if len(self.current_user_data['journeys']) > MAX_JOURNEYS:
+            self.current_user_data['journeys'] = self.current_user_data['journeys'][-MAX_JOURNEYS:]
+        self.commute_prefetcher.set_journeys(self.current_user_data['journeys'])
         
-        # Keep only last 100 journeys to prevent file from getting too large
-        if len(self.current_user_data['journeys']) > 100:
-            self.current_user_data['journeys'] = self.current_user_data['journeys'][-100:]
+        self.insights_stale = True
         
-        # Save to file
-        self.save_user_data()
+        # Insert just this journey instead of rewriting all user data
+        if self.user_info:
+            try:
+                journey_id = self.store.append_journey(self.user_info.get('email', 'unknown'), journey_entry)
+            except Exception as e:
+                print(f"Error saving journey: {e}")
+                return
+            
+            # Add it to the top of the history tab without reloading the list
+            self.history_model.add_journey(JourneySummary(
+                journey_id,
+                journey_entry['timestamp'],
+                directions_data.get('origin'),
+                directions_data.get('destination'),
+                directions_data.get('mode'),
+                directions_data.get('duration'),
+                directions_data.get('distance')
+            ))
     
     def send_chat_message(self):
         """Send message to Gemini AI"""
@@ -1229,102 +2598,119 @@ class EnhancedTravelAssistant(QMainWindow):
         if not message:
             return
         
-        # Add user message to chat display
-        self.add_chat_message("You", message, "#4facfe")
-        
-        # Clear input
-        self.chat_input.clear()
+        # Ignore repeat clicks while the same question is still being answered
+        task_key = ('chat', message)
+        if self.network_task_in_flight(task_key):
+            self.chat_input.clear()
+            return
+        # Time to first token is measured from here, so it includes building the prompt
+        sent_at = time.perf_counter()
+        
+        # Answer repeated questions, such as the quick suggestions, without calling Gemini
+        fingerprint = self.context_builder.fingerprint()
+        cached_reply = self.response_cache.get(message, fingerprint)
+        if cached_reply is not None:
+            self.conversation_memory.add(f"User: {message}")
+            self.add_chat_message("You", message, "#4facfe")
+            self.chat_input.clear()
+            self.on_chat_response(cached_reply, {'message': message})
+            self.chat_status.setText(f"⚡ Cached reply • cache hit rate {self.response_cache.hit_rate():.0%}")
+            return
         
         # Add to conversation history
-        self.conversation_history.append(f"User: {message}")
+        self.conversation_memory.add(f"User: {message}")
+        
+        # Add user message to chat display
+        user_handle = self.chat_display.add_message("You", message, "#4facfe", removable=True)
         
-        # Show loading message
-        self.add_chat_message(" AI", "🤔 Thinking...", "#00f2fe")
+        # Show loading message; its handle lets the reply replace exactly this one
+        placeholder = self.chat_display.add_message(" AI", "🤔 Thinking...", "#00f2fe", removable=True)
         
-        # Start Gemini chat thread
-        self.chat_thread = GeminiChatThread(
+        # Queue the Gemini request on the shared pool, streaming the reply as it is generated
+        chat_worker = GeminiChatThread(
             message, 
-            self.conversation_history, 
+            list(self.conversation_memory.recent), 
             self.current_user_data,
-            self.most_recent_journey
+            self.most_recent_journey,
+            stream=True,
+            context_builder=self.context_builder,
+            response_cache=self.response_cache,
+            context_fingerprint=fingerprint,
+            conversation_summary=self.conversation_memory.summary(),
+            history_index=self.history_index,
+            sent_at=sent_at
+        )
+        stream_state = {'message': message, 'placeholder': placeholder, 'reply': None, 'sent_at': sent_at}
+        chat_worker.response_chunk.connect(
+            lambda chunk, state=stream_state: self.on_chat_chunk(chunk, state)
         )
-        self.chat_thread.response_received.connect(self.on_chat_response)
-        self.chat_thread.start()
+        chat_worker.first_token_received.connect(self.on_first_token)
+        chat_worker.response_received.connect(
+            lambda response, state=stream_state: self.on_chat_response(response, state)
+        )
+        try:
+            self.submit_network_task(task_key, chat_worker)
+        except ExecutorBusyError as e:
+            self.conversation_memory.pop()
+            self.chat_display.remove_message(placeholder)
+            self.chat_display.remove_message(user_handle)
+            QMessageBox.warning(self, "Busy", str(e))
+            return
+        
+        # The user's message stays, so stop tracking it
+        self.chat_display.release(user_handle)
+        
+        # Clear input
+        self.chat_input.clear()
+        self.chat_status.setText("⏳ Waiting for the first token...")
     
     def send_quick_message(self, message):
         """Send quick message to AI"""
         self.chat_input.setText(message)
         self.send_chat_message()
     
-    def on_chat_response(self, response):
+    def on_first_token(self, seconds):
+        """Show how long the model took to start answering"""
+        self.chat_status.setText(f"⚡ First token in {seconds:.2f}s")
+    
+    def on_chat_chunk(self, chunk, state):
+        """Append a streamed chunk to the in-progress AI message"""
+        if state['reply'] is None:
+            # First chunk replaces the loading message
+            self.chat_display.remove_message(state['placeholder'])
+            state['reply'] = self.chat_display.add_message(" AI", chunk, "#00f2fe", removable=True)
+        else:
+            self.chat_display.append_to_message(state['reply'], chunk)
+    
+    def on_chat_response(self, response, state=None):
         """Handle AI response"""
-        # Remove loading message
-        self.remove_last_chat_message()
-        
-        # Add AI response
-        self.add_chat_message(" AI", response, "#00f2fe")
-        
-        # Add to conversation history
-        self.conversation_history.append(f" AI: {response}")
+        state = state or {}
+        if state.get('reply') is not None:
+            # Swap the streamed chunks for the whole reply, formatted like any other message
+            self.chat_display.remove_message(state['reply'])
+            self.add_chat_message(" AI", response, "#00f2fe")
+            self.chat_status.setText(
+                f"{self.chat_status.text()} · full reply in {time.perf_counter() - state['sent_at']:.2f}s"
+            )
+        else:
+            # Remove loading message
+            self.chat_display.remove_message(state.get('placeholder'))
+            
+            # Add AI response
+            self.add_chat_message(" AI", response, "#00f2fe")
+            self.chat_status.setText("")
         
-        # Keep conversation history manageable
-        if len(self.conversation_history) > 20:
-            self.conversation_history = self.conversation_history[-20:]
+        # Add to conversation history; older turns are folded into the rolling summary
+        self.conversation_memory.add(f" AI: {response}")
         
         # Save conversation to user data
-        self.save_conversation(response)
+        self.save_conversation(response, state.get('message'))
     
     def add_chat_message(self, sender, message, color):
         """Add message to chat display"""
-        timestamp = datetime.now().strftime("%H:%M")
-        
-        # Create HTML formatted message
-        html_message = f"""
-        <div style="margin-bottom: 15px; padding: 12px; background: rgba(255, 255, 255, 0.05); border-radius: 10px; border-left: 4px solid {color};">
-            <p style="margin: 0; color: {color}; font-weight: bold; font-size: 14px;">
-                {sender} <span style="color: #888; font-weight: normal; font-size: 12px;">({timestamp})</span>
-            </p>
-            <p style="margin: 8px 0 0 0; color: #ffffff; font-size: 14px; line-height: 1.4;">
-                {message.replace('/n', '<br>')}
-            </p>
-        </div>"""
-        
-        # Append to chat display
-        current_html = self.chat_display.toHtml()
-        if "<body" in current_html:
-            # Insert before closing body tag
-            updated_html = current_html.replace("</body>", html_message + "</body>")
-        else:
-            # Simple append
-            updated_html = current_html + html_message
-        
-        self.chat_display.setHtml(updated_html)
-        
-        # Scroll to bottom
-        scrollbar = self.chat_display.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
-    
-    def remove_last_chat_message(self):
-        """Remove the last message from chat display"""
-        html = self.chat_display.toHtml()
-        # Find and remove the last message div
-        last_div_start = html.rfind('<div style="margin-bottom: 15px;')
-        if last_div_start != -1:
-            # Find the closing div
-            div_count = 1
-            search_pos = last_div_start + 20
-            while search_pos < len(html) and div_count > 0:
-                if html[search_pos:search_pos+4] == '<div':
-                    div_count += 1
-                elif html[search_pos:search_pos+6] == '</div>':
-                    div_count -= 1
-                search_pos += 1
-            
-            if div_count == 0:
-                updated_html = html[:last_div_start] + html[search_pos:]
-                self.chat_display.setHtml(updated_html)
-    
-    def save_conversation(self, ai_response):
+        self.chat_display.add_message(sender, message, color)
+    
+    def save_conversation(self, ai_response, user_message=None):
         """Save conversation to user data"""
         if 'conversations' not in self.current_user_data:
             self.current_user_data['conversations'] = []
@@ -1334,70 +2720,77 @@ class EnhancedTravelAssistant(QMainWindow):
             'ai_response': ai_response,
             'context_journey': self.most_recent_journey
         }
+        if user_message:
+            conversation_entry['user_message'] = user_message
         
         self.current_user_data['conversations'].append(conversation_entry)
+        if self.history_index is not None:
+            self.history_index.add_conversation(conversation_entry)
         
-        # Keep only last 50 conversations
-        if len(self.current_user_data['conversations']) > 50:
-            self.current_user_data['conversations'] = self.current_user_data['conversations'][-50:]
+        # Keep only the most recent conversations
+        if len(self.current_user_data['conversations']) > MAX_CONVERSATIONS:
+            self.current_user_data['conversations'] = self.current_user_data['conversations'][-MAX_CONVERSATIONS:]
         
-        self.save_user_data()
+        if self.user_info:
+            try:
+                self.store.append_conversation(self.user_info.get('email', 'unknown'), conversation_entry)
+            except Exception as e:
+                print(f"Error saving conversation: {e}")
     
-    def update_history_display(self):
-        """Update the journey history display"""
-        self.history_list.clear()
-        
-        if not self.current_user_data.get('journeys'):
-            item = QListWidgetItem("No journey history available yet.\nPlan your first journey using the Smart Maps tab!")
-            item.setFlags(Qt.NoItemFlags)  # Make it non-selectable
-            self.history_list.addItem(item)
+    def on_tab_changed(self, index):
+        # Opening the maps tab, also from the history list, is when a usual trip is most likely asked for
+        if self.tab_widget.widget(index) is self.maps_tab:
+            self.prefetch_commutes()
+        if self.tab_widget.widget(index) is self.insights_tab and self.insights_stale:
+            self.refresh_insights()
+    
+    def refresh_insights(self):
+        """Recompute the Insights tab from the stored journeys in the background"""
+        if not self.user_info:
             return
         
-        # Sort journeys by timestamp (most recent first)
-        journeys = sorted(
-            self.current_user_data['journeys'], 
-            key=lambda x: x.get('timestamp', ''), 
-            reverse=True
-        )
+        email = self.user_info.get('email', 'unknown')
+        task_key = ('insights', email)
+        if self.executor.is_in_flight(task_key):
+            return
         
-        for journey in journeys:
-            data = journey.get('data', {})
-            timestamp = journey.get('timestamp', '')
-            
-            # Format timestamp
+        worker = AnalyticsThread(self.store, email)
+        worker.insights_ready.connect(self.on_insights_ready)
+        worker.insights_error.connect(self.insights_display.setText)
+        try:
+            self.start_worker(task_key, worker)
+        except ExecutorBusyError as e:
+            self.insights_display.setText(f"⚠️ {e}")
+            return
+        self.insights_stale = False
+        self.insights_display.setText("🔄 Crunching your journey history...")
+    
+    def on_insights_ready(self, html):
+        self.insights_display.setHtml(html)
+    
+    def update_history_display(self):
+        """Reload the journey history index from the store"""
+        summaries = []
+        if self.user_info:
             try:
-                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                time_str = dt.strftime("%Y-%m-%d %H:%M")
-            except:
-                time_str = timestamp[:16] if timestamp else "Unknown time"
-            
-            # Create list item
-            origin = data.get('origin', 'Unknown')
-            destination = data.get('destination', 'Unknown')
-            mode = data.get('mode', 'unknown').title()
-            duration = data.get('duration', 'Unknown')
-            distance = data.get('distance', 'Unknown')
-            
-            # Truncate long addresses
-            if len(origin) > 40:
-                origin = origin[:37] + "..."
-            if len(destination) > 40:
-                destination = destination[:37] + "..."
-            
-            item_text = f"""🕒 {time_str}
-📍 From: {origin}
-🎯 To: {destination}
-🚗 Mode: {mode} • ⏱️ {duration} • 📏 {distance}"""
-            
-            item = QListWidgetItem(item_text)
-            item.setData(Qt.UserRole, journey)  # Store full journey data
-            self.history_list.addItem(item)
-    
-    # Complete the incomplete method and add missing methods
-
-    def on_history_item_clicked(self, item):
+                # Steps stay in the store until a journey is opened
+                summaries = self.store.load_journey_index(self.user_info.get('email', 'unknown'))
+            except Exception as e:
+                print(f"Error loading journey history: {e}")
+        self.history_model.set_journeys(summaries)
+    
+    def on_history_item_clicked(self, index):
         """Handle clicking on history item"""
-        journey_data = item.data(Qt.UserRole)
+        journey_id = index.data(JOURNEY_ID_ROLE)
+        if journey_id is None or not self.user_info:
+            return
+        
+        # Load the full journey, steps included, only now that it is needed
+        try:
+            journey_data = self.store.load_journey(self.user_info.get('email', 'unknown'), journey_id)
+        except Exception as e:
+            print(f"Error loading journey: {e}")
+            return
         if not journey_data:
             return
         
@@ -1409,9 +2802,15 @@ class EnhancedTravelAssistant(QMainWindow):
         # Switch to maps tab and populate fields
         self.tab_widget.setCurrentIndex(0)  # Maps tab
         
-        # Extract city/location names from full addresses
+        # Show the cached form of each place, so Get Directions needs no new geocode request
         origin = data.get('origin', '')
         destination = data.get('destination', '')
+        origin_place = self.geocode_cache.lookup(origin, fuzzy=False)
+        destination_place = self.geocode_cache.lookup(destination, fuzzy=False)
+        if origin_place is not None:
+            origin = origin_place.address
+        if destination_place is not None:
+            destination = destination_place.address
         
         self.origin_input.setText(origin)
         self.destination_input.setText(destination)
@@ -1469,34 +2868,38 @@ Steps: {len(data.get('steps', []))} navigation steps
         )
         
         if reply == QMessageBox.Yes:
+            self.reset_history_index()
             self.current_user_data['journeys'] = []
             self.current_user_data['conversations'] = []
-            self.save_user_data()
-            self.update_history_display()
+            self.commute_prefetcher.clear()
+            if self.user_info:
+                self.store.clear_history(self.user_info.get('email', 'unknown'))
+                self.rebuild_place_index(self.user_info.get('email', 'unknown'))
+            self.history_model.clear()
+            self.insights_stale = True
             self.chat_display.clear()
-            self.conversation_history = []
+            self.conversation_memory.clear()
             self.most_recent_journey = None
+            self.context_builder.reset()
+            self.response_cache.clear()
             
             QMessageBox.information(self, "History Cleared", "All history has been cleared successfully!")
     
     def closeEvent(self, event):
         """Handle application close event"""
-        # Save user data before closing
-        if self.user_info:
-            self.save_user_data()
-        
-        # Stop any running threads
-        if hasattr(self, 'auth_thread') and self.auth_thread.isRunning():
-            self.auth_thread.quit()
-            self.auth_thread.wait()
-        
-        if hasattr(self, 'maps_thread') and self.maps_thread.isRunning():
-            self.maps_thread.quit()
-            self.maps_thread.wait()
-        
-        if hasattr(self, 'chat_thread') and self.chat_thread.isRunning():
-            self.chat_thread.quit()
-            self.chat_thread.wait()
+        # Cancel queued requests and let running ones drain
+        if not self.executor.shutdown():
+            print("Some background requests did not finish before shutdown")
+        if self.async_runner is not None:
+            self.async_runner.shutdown()
+        
+        # Close the travel database and persist cached routes
+        self.store.close()
+        self.directions_cache.save()
+        self.geocode_cache.save()
+        get_client_registry().close()
+        if get_api_gateway().metrics():
+            print("API calls this session:\n" + get_api_gateway().metrics_report())
         
         event.accept()
 
@@ -1554,8 +2957,8 @@ def main():
     window = EnhancedTravelAssistant()
     window.show()
     
-    # Start the application
-    sys.exit(app.exec_())
+    # Start the application; with qasync the asyncio loop runs inside Qt's
+    sys.exit(window.async_runner.run_app(app) if window.async_runner else app.exec_())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_PENDING = 16
+
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when the request queue is full"""
+
+
+class TaskHandle:
+    """A submitted task: its future plus a cooperative cancellation flag"""
+    
+    def __init__(self, key, cancel_event=None):
+        self.key = key
+        self.future = None
+        self.cancel_event = cancel_event or threading.Event()
+    
+    def cancel(self):
+        """Drop the task if still queued, otherwise ask it to stop"""
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+    
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+    
+    def done(self):
+        return self.future is not None and self.future.done()
+    
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+class TaskExecutor:
+    """Bounded worker pool shared by every background request in the app.
+
+    Tasks are submitted under a key; submitting a key that is already in
+    flight returns the existing handle instead of starting a duplicate call.
+    At most ``max_workers + max_pending`` tasks are accepted at once.
+    """
+    
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, max_pending=DEFAULT_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='travel-worker')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._shutdown = False
+    
+    def submit(self, key, fn, cancel_event=None):
+        """Run ``fn()`` on the pool, coalescing on ``key``.
+
+        ``cancel_event`` lets the task poll for cancellation; it is set when
+        the handle is cancelled or the executor shuts down.
+        """
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("Executor has been shut down")
+            
+            existing = self._in_flight.get(key)
+            if existing is not None and not existing.done():
+                return existing
+            
+            if not self._slots.acquire(blocking=False):
+                raise ExecutorBusyError("Too many requests in progress, please wait")
+            
+            handle = TaskHandle(key, cancel_event)
+            try:
+                handle.future = self._pool.submit(self._run, handle, fn)
+            except Exception:
+                self._slots.release()
+                raise
+            self._in_flight[key] = handle
+        
+        handle.future.add_done_callback(lambda future, h=handle: self._finished(h))
+        return handle
+    
+    def is_in_flight(self, key):
+        """Whether a task with ``key`` is queued or running"""
+        with self._lock:
+            handle = self._in_flight.get(key)
+            return handle is not None and not handle.done()
+    
+    def cancel(self, key):
+        """Cancel the in-flight task for ``key``, if any"""
+        with self._lock:
+            handle = self._in_flight.get(key)
+        if handle is not None:
+            handle.cancel()
+    
+    def cancel_all(self):
+        with self._lock:
+            handles = list(self._in_flight.values())
+        for handle in handles:
+            handle.cancel()
+    
+    def shutdown(self, timeout=10):
+        """Drop queued tasks, signal running ones to stop and wait for them"""
+        with self._lock:
+            self._shutdown = True
+            handles = list(self._in_flight.values())
+        for handle in handles:
+            handle.cancel()
+        
+        futures = [handle.future for handle in handles if handle.future is not None]
+        _, not_done = wait(futures, timeout=timeout)
+        self._pool.shutdown(wait=not not_done)
+        return not not_done
+    
+    def _run(self, handle, fn):
+        # Cancelled while still queued but after the pool picked it up
+        if handle.is_cancelled():
+            return None
+        return fn()
+    
+    def _finished(self, handle):
+        self._slots.release()
+        with self._lock:
+            if self._in_flight.get(handle.key) is handle:
+                del self._in_flight[handle.key]
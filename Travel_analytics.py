@@ -0,0 +1,318 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import sys
+import time
+from html import escape
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from Journey_model import MISSING, format_duration
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+MICROS_PER_HOUR = 3600 * 1000000
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+TOP_ROUTES = 10
+
+
+def _column(values):
+    # array('l') is 4 bytes on Windows and 8 elsewhere; view it without copying either way
+    if not hasattr(values, 'itemsize') or isinstance(values, np.ndarray):
+        return np.asarray(values, dtype=np.int64)
+    return np.frombuffer(values, dtype=np.dtype(f'i{values.itemsize}')) if len(values) else np.zeros(0, np.int64)
+
+
+class TravelAnalytics:
+    """Route, traffic, time-of-day and mode statistics over a journey history.
+
+    Works on the integer columns of a ``JourneyTable`` (or equivalent NumPy
+    arrays): routes are grouped once by sorting their string codes, and
+    every statistic is then a handful of vectorized passes, so a few million
+    journeys take seconds rather than minutes.
+    """
+    
+    def __init__(self, strings, origin, destination, mode, time_us, duration_s, distance_m, traffic_s):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy is required for travel analytics. Install with: pip install numpy")
+        self.strings = strings
+        self.origin = _column(origin)
+        self.destination = _column(destination)
+        self.mode = _column(mode)
+        self.time_us = _column(time_us)
+        self.duration_s = _column(duration_s)
+        self.distance_m = _column(distance_m)
+        self.traffic_s = _column(traffic_s)
+        self._routes = None
+    
+    @classmethod
+    def from_table(cls, table):
+        return cls(table.strings, table.origin, table.destination, table.mode, table.time_us,
+                   table.duration_s, table.distance_m, table.traffic_s)
+    
+    def __len__(self):
+        return len(self.origin)
+    
+    def routes(self):
+        """(route codes as an (n, 3) array, route index of every journey)"""
+        if self._routes is None:
+            if not len(self):
+                self._routes = (np.zeros((0, 3), dtype=np.int64), np.zeros(0, dtype=np.int64))
+                return self._routes
+            size = max(len(self.strings), 1)
+            # Two passes keep the combined keys inside int64 however many places there are
+            pairs, pair_index = np.unique(self.origin.astype(np.int64) * size + self.destination,
+                                          return_inverse=True)
+            keys, route_index = np.unique(pair_index.astype(np.int64) * size + self.mode, return_inverse=True)
+            pair = pairs[keys // size]
+            codes = np.stack([pair // size, pair % size, keys % size], axis=1)
+            self._routes = (codes, route_index.reshape(-1))
+        return self._routes
+    
+    def route_stats(self, top=TOP_ROUTES):
+        """Most travelled routes with their trip count, median and p90 duration and mean traffic delay ratio"""
+        codes, route_index = self.routes()
+        if not len(codes):
+            return []
+        counts = np.bincount(route_index, minlength=len(codes))
+        known = self.duration_s != MISSING
+        medians, p90s = self._grouped_quantiles(route_index[known], self.duration_s[known], len(codes), (0.5, 0.9))
+        (ratios, rows), _ = self._delay_ratios()
+        ratio_rows = route_index[rows]
+        ratio_sums = np.bincount(ratio_rows, weights=ratios, minlength=len(codes))
+        ratio_counts = np.bincount(ratio_rows, minlength=len(codes))
+        
+        order = np.argsort(-counts, kind='stable')[:top]
+        stats = []
+        for i in order:
+            origin, destination, mode = (self.strings[code] for code in codes[i])
+            stats.append({
+                'origin': origin,
+                'destination': destination,
+                'mode': mode,
+                'trips': int(counts[i]),
+                'median_s': None if np.isnan(medians[i]) else float(medians[i]),
+                'p90_s': None if np.isnan(p90s[i]) else float(p90s[i]),
+                'delay_ratio': float(ratio_sums[i] / ratio_counts[i]) if ratio_counts[i] else None
+            })
+        return stats
+    
+    def delay_ratio(self):
+        """(median, mean) of ``duration_in_traffic / duration`` over journeys with both, or None"""
+        (ratios, _), count = self._delay_ratios()
+        if not count:
+            return None
+        return float(np.median(ratios)), float(ratios.mean())
+    
+    def heatmap(self):
+        """7 x 24 arrays of trip counts and mean duration in seconds, by weekday (Monday first) and hour"""
+        known = self.time_us != MISSING
+        hours = self.time_us[known] // MICROS_PER_HOUR
+        cells = ((hours // 24 + EPOCH_WEEKDAY) % 7) * 24 + hours % 24
+        counts = np.bincount(cells, minlength=168)
+        durations = self.duration_s[known]
+        timed = durations != MISSING
+        totals = np.bincount(cells[timed], weights=durations[timed], minlength=168)
+        timed_counts = np.bincount(cells[timed], minlength=168)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = totals / timed_counts
+        return counts.reshape(7, 24), means.reshape(7, 24)
+    
+    def mode_split(self):
+        """Per mode: trips, share of trips and total distance in meters, most used first"""
+        if not len(self):
+            return []
+        counts = np.bincount(self.mode)
+        measured = self.distance_m != MISSING
+        distances = np.bincount(self.mode[measured], weights=self.distance_m[measured], minlength=len(counts))
+        split = []
+        for code in np.argsort(-counts, kind='stable'):
+            if not counts[code]:
+                break
+            split.append({
+                'mode': self.strings[code],
+                'trips': int(counts[code]),
+                'share': float(counts[code] / len(self)),
+                'distance_m': float(distances[code])
+            })
+        return split
+    
+    def totals(self):
+        known_distance = self.distance_m != MISSING
+        known_duration = self.duration_s != MISSING
+        return {
+            'trips': len(self),
+            'routes': len(self.routes()[0]),
+            'distance_m': float(self.distance_m[known_distance].sum()),
+            'duration_s': float(self.duration_s[known_duration].sum())
+        }
+    
+    def _delay_ratios(self):
+        both = (self.traffic_s != MISSING) & (self.duration_s > 0)
+        rows = np.flatnonzero(both)
+        ratios = self.traffic_s[rows] / self.duration_s[rows]
+        return (ratios, rows), len(rows)
+    
+    @staticmethod
+    def _grouped_quantiles(groups, values, group_count, quantiles):
+        """Linear-interpolated quantiles of ``values`` within each group; NaN for empty groups"""
+        results = [np.full(group_count, np.nan) for _ in quantiles]
+        if not len(values):
+            return results
+        # One sort serves every quantile
+        order = np.lexsort((values, groups))
+        groups = groups[order]
+        values = values[order].astype(np.float64)
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        sizes = np.diff(np.r_[starts, len(groups)])
+        for result, q in zip(results, quantiles):
+            position = (sizes - 1) * q
+            lower = np.floor(position).astype(np.int64)
+            upper = np.ceil(position).astype(np.int64)
+            fraction = position - lower
+            result[groups[starts]] = values[starts + lower] * (1 - fraction) + values[starts + upper] * fraction
+        return results
+
+
+def _minutes(seconds):
+    return format_duration(seconds) if seconds is not None else '—'
+
+
+def format_report(analytics, top=TOP_ROUTES):
+    """Plain-text report for the command line"""
+    totals = analytics.totals()
+    lines = [f"Journeys: {totals['trips']} on {totals['routes']} routes, "
+             f"{totals['distance_m'] / 1000:.1f} km, {_minutes(totals['duration_s'])} on the road"]
+    delay = analytics.delay_ratio()
+    if delay:
+        lines.append(f"Traffic delay ratio: median {delay[0]:.2f}, mean {delay[1]:.2f}")
+    
+    lines.append("\nMost travelled routes:")
+    for route in analytics.route_stats(top):
+        ratio = f", traffic x{route['delay_ratio']:.2f}" if route['delay_ratio'] else ''
+        lines.append(f"  {route['trips']:6d}  {route['origin']} → {route['destination']} ({route['mode']}): "
+                     f"median {_minutes(route['median_s'])}, p90 {_minutes(route['p90_s'])}{ratio}")
+    
+    lines.append("\nMode split:")
+    for mode in analytics.mode_split():
+        lines.append(f"  {mode['mode']:12s} {mode['share'] * 100:5.1f}%  {mode['trips']} trip{'s' if mode['trips'] != 1 else ''}, "
+                     f"{mode['distance_m'] / 1000:.1f} km")
+    
+    counts, _ = analytics.heatmap()
+    lines.append("\nTrips by weekday and hour:")
+    width = max(len(str(counts.max())) + 1, 4)
+    lines.append("       " + ''.join(f"{hour:>{width}d}" for hour in range(24)))
+    for day, row in zip(WEEKDAYS, counts):
+        lines.append(f"  {day}  " + ''.join(f"{count:>{width}d}" if count else '.'.rjust(width) for count in row))
+    return '\n'.join(lines)
+
+
+def insights_html(analytics, top=TOP_ROUTES):
+    """Rich-text report for the Insights tab"""
+    if not len(analytics):
+        return "<p>📊 No journeys to analyse yet. Plan a few trips on the Smart Maps tab!</p>"
+    totals = analytics.totals()
+    delay = analytics.delay_ratio()
+    parts = [
+        f"<h3>📊 {totals['trips']} journeys • {totals['routes']} routes • "
+        f"{totals['distance_m'] / 1000:.1f} km • {escape(_minutes(totals['duration_s']))} on the road</h3>"
+    ]
+    if delay:
+        parts.append(f"<p>🚦 Traffic adds {max(delay[0] - 1, 0) * 100:.0f}% to a typical trip "
+                     f"(median delay ratio {delay[0]:.2f}).</p>")
+    
+    parts.append("<h4>🛣️ Most travelled routes</h4><table cellpadding='4'>"
+                 "<tr><th align='left'>Route</th><th>Trips</th><th>Median</th><th>p90</th><th>Traffic</th></tr>")
+    for route in analytics.route_stats(top):
+        ratio = f"x{route['delay_ratio']:.2f}" if route['delay_ratio'] else '—'
+        parts.append(
+            f"<tr><td>{escape(route['origin'] or 'Unknown')} → {escape(route['destination'] or 'Unknown')} "
+            f"({escape(route['mode'] or 'unknown')})</td><td align='right'>{route['trips']}</td>"
+            f"<td>{escape(_minutes(route['median_s']))}</td><td>{escape(_minutes(route['p90_s']))}</td>"
+            f"<td>{ratio}</td></tr>"
+        )
+    parts.append("</table>")
+    
+    parts.append("<h4>🚗 Mode split</h4><table cellpadding='4'>")
+    for mode in analytics.mode_split():
+        parts.append(f"<tr><td>{escape((mode['mode'] or 'unknown').title())}</td>"
+                     f"<td align='right'>{mode['share'] * 100:.1f}%</td><td align='right'>{mode['trips']} trip{'s' if mode['trips'] != 1 else ''}</td>"
+                     f"<td align='right'>{mode['distance_m'] / 1000:.1f} km</td></tr>")
+    parts.append("</table>")
+    
+    counts, means = analytics.heatmap()
+    peak = counts.max() or 1
+    parts.append("<h4>🕒 When you travel</h4><table cellspacing='1' cellpadding='2'><tr><th></th>")
+    parts.append(''.join(f"<th>{hour}</th>" for hour in range(24)) + "</tr>")
+    for day, row, mean_row in zip(WEEKDAYS, counts, means):
+        cells = []
+        for count, mean in zip(row, mean_row):
+            alpha = 0.08 + 0.8 * count / peak if count else 0
+            title = f"{count} trips, {_minutes(mean)} on average" if count else "no trips"
+            cells.append(f"<td title='{title}' style='background-color: rgba(102, 126, 234, {alpha:.2f})' "
+                         f"align='center'>{count or ''}</td>")
+        parts.append(f"<tr><th>{day}</th>{''.join(cells)}</tr>")
+    parts.append("</table>")
+    return ''.join(parts)
+
+
+def synthetic_analytics(count, seed=7):
+    """``TravelAnalytics`` over ``count`` random journeys on a few hundred routes"""
+    rng = np.random.default_rng(seed)
+    places = [f"Place {i}, Jaipur" for i in range(300)]
+    modes = ['driving', 'walking', 'bicycling', 'transit']
+    strings = places + modes
+    origin = rng.integers(0, len(places), count)
+    # Most trips are repeats of a few commutes
+    destination = np.where(rng.random(count) < 0.7, (origin * 7 + 3) % len(places),
+                           rng.integers(0, len(places), count))
+    mode = len(places) + rng.choice(len(modes), count, p=[0.6, 0.15, 0.1, 0.15])
+    start = 1735689600 * 1000000
+    time_us = start + rng.integers(0, 365 * 24 * 3600, count) * 1000000
+    duration_s = rng.gamma(4.0, 300.0, count).astype(np.int64) + 60
+    distance_m = (duration_s * rng.uniform(3, 12, count)).astype(np.int64)
+    traffic_s = np.where(mode == len(places), (duration_s * rng.uniform(1.0, 1.8, count)).astype(np.int64), MISSING)
+    duration_s[rng.random(count) < 0.01] = MISSING
+    return TravelAnalytics(strings, origin, destination, mode, time_us, duration_s, distance_m, traffic_s)
+
+
+def benchmark(count=2000000):
+    """Time each statistic over ``count`` synthetic journeys"""
+    analytics = synthetic_analytics(count)
+    total_started = time.perf_counter()
+    for name, compute in (('routes', analytics.routes), ('route stats', analytics.route_stats),
+                          ('delay ratio', analytics.delay_ratio), ('heatmap', analytics.heatmap),
+                          ('mode split', analytics.mode_split), ('totals', analytics.totals)):
+        started = time.perf_counter()
+        compute()
+        print(f"{name:12s} {(time.perf_counter() - started) * 1000:8.1f} ms")
+    print(f"{count} journeys analysed in {time.perf_counter() - total_started:.2f}s")
+    print()
+    print(format_report(analytics, top=5))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+        return
+    
+    if len(sys.argv) < 2:
+        print("Usage: python Travel_analytics.py EMAIL [travel_data.db] | --all [travel_data.db] | --bench")
+        return
+    
+    from Travel_storage import SqliteStore
+    
+    store = SqliteStore(sys.argv[2] if len(sys.argv) > 2 else 'travel_data.db')
+    try:
+        table = store.load_journey_table(None if sys.argv[1] == '--all' else sys.argv[1])
+    finally:
+        store.close()
+    print(format_report(TravelAnalytics.from_table(table)))
+
+
+if __name__ == '__main__':
+    main()
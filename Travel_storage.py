@@ -0,0 +1,525 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import os
+import json
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from Directions_service import normalize_place
+from Journey_model import (Journey, JourneyTable, EPOCH, MICROSECOND, parse_timestamp,
+                           parse_duration, parse_distance)
+
+# Same limits the app has always applied to a user's history
+MAX_JOURNEYS = 100
+MAX_CONVERSATIONS = 50
+
+# One row of the journey history index; steps are loaded separately when needed
+JourneySummary = namedtuple(
+    'JourneySummary', ['journey_id', 'timestamp', 'origin', 'destination', 'mode', 'duration', 'distance']
+)
+
+# Reserved key of the retired JSON snapshot, holding the last journal sequence folded into it
+SNAPSHOT_META_KEY = '__journal__'
+
+
+def empty_user_data():
+    """Return a fresh per-user data record"""
+    return {
+        'journeys': [],
+        'conversations': [],
+        'preferences': {}
+    }
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    email TEXT PRIMARY KEY,
+    name TEXT,
+    picture TEXT,
+    preferences TEXT NOT NULL DEFAULT '{}'
+);
+
+CREATE TABLE IF NOT EXISTS journeys (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    origin TEXT,
+    destination TEXT,
+    mode TEXT,
+    duration TEXT,
+    distance TEXT,
+    duration_in_traffic TEXT,
+    duration_value INTEGER,
+    distance_value INTEGER,
+    duration_in_traffic_value INTEGER,
+    -- Planned on the local map without live data; kept out of statistics
+    offline INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS steps (
+    journey_id INTEGER NOT NULL REFERENCES journeys(id) ON DELETE CASCADE,
+    step INTEGER NOT NULL,
+    instruction TEXT,
+    distance TEXT,
+    duration TEXT,
+    PRIMARY KEY (journey_id, step)
+);
+
+CREATE TABLE IF NOT EXISTS conversations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    user_message TEXT,
+    ai_response TEXT,
+    context_journey TEXT
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_journeys_email_timestamp ON journeys(email, timestamp);
+CREATE INDEX IF NOT EXISTS idx_journeys_route ON journeys(origin, destination, mode);
+CREATE INDEX IF NOT EXISTS idx_conversations_email_timestamp ON conversations(email, timestamp);
+"""
+
+
+class SqliteStore:
+    """Per-user travel data in SQLite, indexed by user and by route.
+
+    Loading a user only reads that user's rows, and every save is a single
+    small transaction. Also keeps a compact journey index for the history
+    tab.
+    """
+    
+    def __init__(self, db_file='travel_data.db'):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        # Shared by the UI and worker threads, so access is serialized by the lock
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA foreign_keys=ON')
+        self._conn.executescript(SCHEMA)
+        # Databases created before the traffic value column existed
+        columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(journeys)')}
+        if 'duration_in_traffic_value' not in columns:
+            self._conn.execute('ALTER TABLE journeys ADD COLUMN duration_in_traffic_value INTEGER')
+        if 'offline' not in columns:
+            self._conn.execute('ALTER TABLE journeys ADD COLUMN offline INTEGER NOT NULL DEFAULT 0')
+        self._conn.commit()
+    
+    def load_user(self, email, journey_limit=MAX_JOURNEYS, conversation_limit=MAX_CONVERSATIONS):
+        """Load one user's most recent journeys and conversations"""
+        user_data = empty_user_data()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT preferences FROM users WHERE email = ?', (email,)
+            ).fetchone()
+            if row:
+                user_data['preferences'] = json.loads(row['preferences'] or '{}')
+            
+            journey_rows = self._conn.execute(
+                'SELECT * FROM (SELECT * FROM journeys WHERE email = ? '
+                'ORDER BY timestamp DESC, id DESC LIMIT ?) ORDER BY timestamp, id',
+                (email, journey_limit)
+            ).fetchall()
+            steps_by_journey = self._load_steps([row['id'] for row in journey_rows])
+            
+            for row in journey_rows:
+                user_data['journeys'].append(self._journey_entry(row, steps_by_journey.get(row['id'], [])))
+            
+            conversation_rows = self._conn.execute(
+                'SELECT * FROM (SELECT * FROM conversations WHERE email = ? '
+                'ORDER BY timestamp DESC, id DESC LIMIT ?) ORDER BY timestamp, id',
+                (email, conversation_limit)
+            ).fetchall()
+        
+        for row in conversation_rows:
+            entry = {
+                'timestamp': row['timestamp'],
+                'ai_response': row['ai_response'],
+                'context_journey': json.loads(row['context_journey']) if row['context_journey'] else None
+            }
+            if row['user_message']:
+                entry['user_message'] = row['user_message']
+            user_data['conversations'].append(entry)
+        return user_data
+    
+    def load_journey_index(self, email):
+        """Every journey of a user as a ``JourneySummary``, without steps"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, timestamp, origin, destination, mode, duration, distance '
+                'FROM journeys WHERE email = ? ORDER BY timestamp, id',
+                (email,)
+            ).fetchall()
+        return [JourneySummary(*row) for row in rows]
+    
+    def load_journey_table(self, email=None):
+        """A user's journeys, or everyone's when ``email`` is None, as a ``JourneyTable``.
+
+        Offline journeys are left out: their times are estimates, not observations.
+        """
+        table = JourneyTable()
+        query = ('SELECT id, timestamp, origin, destination, mode, duration, distance, duration_in_traffic, '
+                 'duration_value, distance_value, duration_in_traffic_value FROM journeys WHERE offline = 0')
+        with self._lock:
+            if email is None:
+                cursor = self._conn.execute(query + ' ORDER BY timestamp, id')
+            else:
+                cursor = self._conn.execute(query + ' AND email = ? ORDER BY timestamp, id', (email,))
+            # Plain tuples; building Row objects would dominate on large histories
+            cursor.row_factory = None
+            for (journey_id, timestamp, origin, destination, mode, duration, distance, traffic,
+                 duration_value, distance_value, traffic_value) in cursor:
+                # Older rows only have the display text
+                if duration_value is None:
+                    duration_value = parse_duration(duration)
+                if distance_value is None:
+                    distance_value = parse_distance(distance)
+                if traffic_value is None and traffic and traffic != 'N/A':
+                    traffic_value = parse_duration(traffic)
+                table.append_row(journey_id, parse_timestamp(timestamp), origin, destination, mode,
+                                 duration_value, distance_value, traffic_value)
+        return table
+    
+    def load_route_observations(self, email, origin, destination, mode):
+        """``(departure datetime, seconds)`` for every saved trip on a route, preferring the traffic estimate.
+
+        Places are matched on their normalized text, so what the user typed
+        matches both earlier queries and the addresses Google returned.
+        Offline journeys are skipped.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT timestamp, origin, destination, duration, duration_in_traffic, duration_value, '
+                'duration_in_traffic_value FROM journeys WHERE email = ? AND mode = ? AND offline = 0',
+                (email, mode)
+            ).fetchall()
+        # Either side may be one place or several spellings of it
+        origins = {normalize_place(place) for place in ((origin,) if isinstance(origin, str) else origin)}
+        destinations = {normalize_place(place) for place in
+                        ((destination,) if isinstance(destination, str) else destination)}
+        observations = []
+        for row in rows:
+            if normalize_place(row['origin']) not in origins or normalize_place(row['destination']) not in destinations:
+                continue
+            seconds = row['duration_in_traffic_value'] or parse_duration(row['duration_in_traffic'])
+            if seconds is None:
+                seconds = row['duration_value'] or parse_duration(row['duration'])
+            time_us = parse_timestamp(row['timestamp'])
+            if seconds and time_us is not None:
+                observations.append((EPOCH + time_us * MICROSECOND, seconds))
+        return observations
+    
+    def load_journey(self, email, journey_id):
+        """One journey entry with its steps, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM journeys WHERE id = ? AND email = ?', (journey_id, email)
+            ).fetchone()
+            if row is None:
+                return None
+            steps = self._load_steps([journey_id]).get(journey_id, [])
+        return self._journey_entry(row, steps)
+    
+    def load_history_records(self, email):
+        """All of a user's journeys, each with its step instructions, and conversations, for indexing"""
+        with self._lock:
+            journey_rows = self._conn.execute(
+                "SELECT j.*, group_concat(s.instruction, ' ') AS step_text FROM journeys j "
+                'LEFT JOIN steps s ON s.journey_id = j.id WHERE j.email = ? '
+                'GROUP BY j.id ORDER BY j.timestamp, j.id',
+                (email,)
+            ).fetchall()
+            conversation_rows = self._conn.execute(
+                'SELECT timestamp, user_message, ai_response FROM conversations WHERE email = ? '
+                'ORDER BY timestamp, id',
+                (email,)
+            ).fetchall()
+        journeys = [(self._journey_entry(row, []), row['step_text'] or '') for row in journey_rows]
+        conversations = [dict(row) for row in conversation_rows]
+        return journeys, conversations
+    
+    def append_journey(self, email, journey_entry):
+        """Insert a saved journey and its steps; returns the journey id"""
+        with self._lock, self._conn:
+            return self._insert_journey(email, journey_entry)
+    
+    def append_conversation(self, email, conversation_entry):
+        """Insert a saved AI conversation"""
+        with self._lock, self._conn:
+            self._insert_conversation(email, conversation_entry)
+    
+    def clear_history(self, email):
+        """Delete a user's journeys and conversations"""
+        with self._lock, self._conn:
+            self._delete_history(email)
+    
+    def save_user(self, email, user_data):
+        """Replace one user's stored data with ``user_data``"""
+        with self._lock, self._conn:
+            self._replace_user(email, user_data)
+    
+    def import_user(self, email, journeys=(), conversations=()):
+        """Add journey and conversation entries to a user's history in one transaction"""
+        with self._lock, self._conn:
+            self._add_history(email, journeys, conversations)
+    
+    def import_legacy_data(self, users, histories, meta_key, meta_value):
+        """Write migrated data and set ``meta_key`` in one transaction.
+
+        ``users`` maps emails to data replaced as by ``save_user``; each
+        ``(email, journeys, conversations)`` in ``histories`` is added as by
+        ``import_user``.
+        """
+        with self._lock, self._conn:
+            for email, user_data in users.items():
+                self._replace_user(email, user_data)
+            for email, journeys, conversations in histories:
+                self._add_history(email, journeys, conversations)
+            self._set_meta(meta_key, meta_value)
+    
+    def save_user_profile(self, user_info):
+        """Record the signed-in user's profile"""
+        email = user_info.get('email')
+        if not email:
+            return
+        with self._lock, self._conn:
+            self._upsert_user(email, name=user_info.get('name'), picture=user_info.get('picture'))
+    
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else default
+    
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._set_meta(key, value)
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+    
+    @staticmethod
+    def _journey_entry(row, steps):
+        entry = {
+            'timestamp': row['timestamp'],
+            'data': {
+                'origin': row['origin'],
+                'destination': row['destination'],
+                'mode': row['mode'],
+                'duration': row['duration'],
+                'distance': row['distance'],
+                'duration_in_traffic': row['duration_in_traffic'] or 'N/A',
+                'duration_value': row['duration_value'],
+                'distance_value': row['distance_value'],
+                'duration_in_traffic_value': row['duration_in_traffic_value'],
+                'steps': steps
+            }
+        }
+        if row['offline']:
+            entry['data']['offline'] = True
+        return entry
+    
+    def _load_steps(self, journey_ids):
+        steps_by_journey = {}
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(journey_ids), 500):
+            chunk = journey_ids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self._conn.execute(
+                f'SELECT * FROM steps WHERE journey_id IN ({placeholders}) ORDER BY journey_id, step',
+                chunk
+            ).fetchall()
+            for row in rows:
+                steps_by_journey.setdefault(row['journey_id'], []).append({
+                    'step': row['step'],
+                    'instruction': row['instruction'],
+                    'distance': row['distance'],
+                    'duration': row['duration']
+                })
+        return steps_by_journey
+    
+    def _insert_journey(self, email, journey_entry):
+        data = journey_entry.get('data', {})
+        cursor = self._conn.execute(
+            'INSERT INTO journeys (email, timestamp, origin, destination, mode, duration, distance, '
+            'duration_in_traffic, duration_value, distance_value, duration_in_traffic_value, offline) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                email,
+                journey_entry.get('timestamp') or datetime.now().isoformat(),
+                data.get('origin'),
+                data.get('destination'),
+                data.get('mode'),
+                data.get('duration'),
+                data.get('distance'),
+                data.get('duration_in_traffic'),
+                data.get('duration_value'),
+                data.get('distance_value'),
+                data.get('duration_in_traffic_value'),
+                1 if data.get('offline') else 0
+            )
+        )
+        self._conn.executemany(
+            'INSERT INTO steps (journey_id, step, instruction, distance, duration) VALUES (?, ?, ?, ?, ?)',
+            [
+                (cursor.lastrowid, step.get('step', i), step.get('instruction'), step.get('distance'), step.get('duration'))
+                for i, step in enumerate(data.get('steps', []), 1)
+            ]
+        )
+        return cursor.lastrowid
+    
+    def _insert_conversation(self, email, conversation_entry):
+        context_journey = conversation_entry.get('context_journey')
+        self._conn.execute(
+            'INSERT INTO conversations (email, timestamp, user_message, ai_response, context_journey) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (
+                email,
+                conversation_entry.get('timestamp') or datetime.now().isoformat(),
+                conversation_entry.get('user_message'),
+                conversation_entry.get('ai_response'),
+                json.dumps(context_journey, ensure_ascii=False) if context_journey else None
+            )
+        )
+    
+    def _replace_user(self, email, user_data):
+        self._delete_history(email)
+        self._upsert_user(email, preferences=user_data.get('preferences', {}))
+        self._add_history(email, user_data.get('journeys', []), user_data.get('conversations', []))
+    
+    def _add_history(self, email, journeys, conversations):
+        for journey_entry in journeys:
+            self._insert_journey(email, journey_entry)
+        for conversation_entry in conversations:
+            self._insert_conversation(email, conversation_entry)
+    
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            'INSERT INTO meta (key, value) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+            (key, value)
+        )
+    
+    def _delete_history(self, email):
+        # Steps go with their journeys through ON DELETE CASCADE
+        self._conn.execute('DELETE FROM journeys WHERE email = ?', (email,))
+        self._conn.execute('DELETE FROM conversations WHERE email = ?', (email,))
+    
+    def _upsert_user(self, email, name=None, picture=None, preferences=None):
+        self._conn.execute(
+            'INSERT INTO users (email, name, picture) VALUES (?, ?, ?) '
+            'ON CONFLICT(email) DO UPDATE SET '
+            'name = COALESCE(excluded.name, users.name), '
+            'picture = COALESCE(excluded.picture, users.picture)',
+            (email, name, picture)
+        )
+        if preferences is not None:
+            self._conn.execute(
+                'UPDATE users SET preferences = ? WHERE email = ?',
+                (json.dumps(preferences, ensure_ascii=False), email)
+            )
+
+def migrate_json_data(store, enhanced_file='enhanced_travel_data.json', travel_file='user_travel_data.json',
+                      journeys_file='journeys.json', user_info_file='user_info.json'):
+    """Import the legacy JSON files into ``store`` once.
+
+    Everything is read first and written in one transaction with the
+    ``json_migrated`` mark, so a crash partway leaves nothing to import
+    twice on the next launch.
+    """
+    if store.get_meta('json_migrated'):
+        return False
+    
+    histories = []
+    # Older schema from the openrouteservice prototype
+    for email, user_data in _read_json(travel_file, {}).items():
+        journeys = []
+        for journey in user_data.get('journeys', []):
+            entry = Journey.from_travel_record(journey).to_entry()
+            # Keep the original timestamp text rather than its normalized form
+            entry['timestamp'] = journey.get('timestamp')
+            journeys.append(entry)
+        histories.append((email, journeys, user_data.get('chat_history', [])))
+    
+    # journeys.json predates per-user storage, so it belongs to the last signed-in user
+    legacy_journeys = _read_json(journeys_file, [])
+    owner = _read_json(user_info_file, {}).get('email')
+    if legacy_journeys and owner:
+        histories.append((owner, [{
+            'timestamp': journey.get('timestamp'),
+            'data': {key: value for key, value in journey.items() if key != 'timestamp'}
+        } for journey in legacy_journeys], []))
+    
+    users = _read_legacy_snapshot(enhanced_file)
+    store.import_legacy_data(users, histories, 'json_migrated', datetime.now().isoformat())
+    return True
+
+
+def _read_legacy_snapshot(snapshot_file):
+    """Users' data from the JSON snapshot the app used before SQLite, with its journal replayed on top.
+
+    The files are only read; a journal left ``.compacting`` by an
+    interrupted compaction is replayed first, as it holds older records.
+    """
+    snapshot = _read_json(snapshot_file, {})
+    snapshot_seq = snapshot.pop(SNAPSHOT_META_KEY, {}).get('seq', 0)
+    journal_file = os.path.splitext(snapshot_file)[0] + '.journal'
+    for path in (journal_file + '.compacting', journal_file):
+        for record in _read_journal(path):
+            if record.get('seq', 0) > snapshot_seq:
+                _apply_record(snapshot.setdefault(record.get('email'), empty_user_data()), record)
+    return snapshot
+
+
+def _read_journal(path):
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # A torn final line from a crash mid-write is skipped
+                continue
+
+
+def _apply_record(user_data, record):
+    """Apply one legacy journal record to a user's data in place"""
+    op = record.get('op')
+    if op == 'journey':
+        user_data.setdefault('journeys', []).append(record['entry'])
+        if len(user_data['journeys']) > MAX_JOURNEYS:
+            user_data['journeys'] = user_data['journeys'][-MAX_JOURNEYS:]
+    elif op == 'conversation':
+        user_data.setdefault('conversations', []).append(record['entry'])
+        if len(user_data['conversations']) > MAX_CONVERSATIONS:
+            user_data['conversations'] = user_data['conversations'][-MAX_CONVERSATIONS:]
+    elif op == 'clear':
+        user_data['journeys'] = []
+        user_data['conversations'] = []
+    elif op == 'user':
+        user_data.clear()
+        user_data.update(record['data'])
+
+
+def _read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return default
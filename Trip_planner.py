@@ -0,0 +1,410 @@
+# Copyright (c) 2025 Shriyansh Singh Rathore
+# Licensed under the MIT License
+
+import re
+import sys
+import time
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from Directions_service import fetch_directions, parse_directions
+from Distance_matrix import DistanceMatrixService
+from Journey_model import format_duration
+
+DEFAULT_CONCURRENCY = 4
+# Stands in for a missing matrix cell; large enough that no tour uses it when another exists
+UNREACHABLE_S = 1e7
+# Seconds of travel one second of lateness is worth when trading them off
+LATENESS_WEIGHT = 100.0
+# Or-opt moves chains of up to this many consecutive stops
+OR_OPT_MAX_SEGMENT = 3
+# With time windows, this many of the best travel-saving moves are scheduled in full per pass
+WINDOW_CANDIDATES = 20
+IMPROVEMENT_EPSILON = 1e-6
+
+# "Place | 09:30-11:00" gives a stop an arrival window
+WINDOW_RE = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$')
+
+# ``order`` indexes the input stops; ``arrivals`` are datetimes per visited stop, in visiting order
+TripPlan = namedtuple('TripPlan', ['order', 'stops', 'legs', 'arrivals', 'late_stops', 'travel_s',
+                                   'input_order_travel_s', 'solve_ms', 'errors'])
+
+
+def parse_stop_line(line, day):
+    """``(place, (earliest, latest) or None)`` from "Place" or "Place | HH:MM-HH:MM" on ``day``"""
+    place, _, window = line.partition('|')
+    match = WINDOW_RE.match(window) if window.strip() else None
+    if window.strip() and match is None:
+        raise ValueError(f"Time window should look like 09:30-11:00: {window.strip()}")
+    if match is None:
+        return place.strip(), None
+    start_hour, start_minute, end_hour, end_minute = map(int, match.groups())
+    earliest = day.replace(hour=start_hour, minute=start_minute, second=0, microsecond=0)
+    latest = day.replace(hour=end_hour, minute=end_minute, second=0, microsecond=0)
+    if latest < earliest:
+        raise ValueError(f"Time window ends before it starts: {window.strip()}")
+    return place.strip(), (earliest, latest)
+
+
+def tour_cost(tour, cost):
+    """Sum of ``cost`` along consecutive stops of ``tour``"""
+    tour = np.asarray(tour)
+    return float(cost[tour[:-1], tour[1:]].sum())
+
+
+def nearest_neighbour(cost, start, end, windows=None, service_s=0.0):
+    """Greedy path from ``start`` to ``end`` visiting every other node once.
+
+    With ``windows`` the next stop is the one that can be ready soonest,
+    counting any wait for its window to open.
+    """
+    count = len(cost)
+    unvisited = np.ones(count, dtype=bool)
+    unvisited[start] = False
+    unvisited[end] = False
+    tour = [start]
+    clock = 0.0
+    while unvisited.any():
+        current = tour[-1]
+        ready = clock + cost[current]
+        if windows is not None:
+            ready = np.maximum(ready, windows[:, 0])
+        ready = np.where(unvisited, ready, np.inf)
+        following = int(np.argmin(ready))
+        tour.append(following)
+        unvisited[following] = False
+        clock = ready[following] + service_s
+    tour.append(end)
+    return tour
+
+
+def schedule(tour, cost, windows=None, service_s=0.0):
+    """``(arrival seconds per position, total lateness, finish time)`` for visiting ``tour`` in order"""
+    arrivals = [0.0]
+    clock = 0.0
+    lateness = 0.0
+    for previous, current in zip(tour, tour[1:]):
+        clock += cost[previous, current]
+        if windows is not None:
+            earliest, latest = windows[current]
+            clock = max(clock, earliest)
+            lateness += max(0.0, clock - latest)
+        arrivals.append(clock)
+        clock += service_s
+    return arrivals, lateness, arrivals[-1]
+
+
+def two_opt_moves(tour, cost):
+    """``(delta, i, j)`` of the best segment reversal for each start ``i``; reversal keeps both ends fixed"""
+    tour = np.asarray(tour)
+    forward = np.concatenate([[0.0], np.cumsum(cost[tour[:-1], tour[1:]])])
+    backward = np.concatenate([[0.0], np.cumsum(cost[tour[1:], tour[:-1]])])
+    last = len(tour) - 2
+    moves = []
+    for i in range(1, last):
+        j = np.arange(i + 1, last + 1)
+        before, after = tour[i - 1], tour[j + 1]
+        # Asymmetric costs: the reversed segment is charged in its new direction
+        delta = (cost[before, tour[j]] + cost[tour[i], after] + (backward[j] - backward[i])
+                 - cost[before, tour[i]] - cost[tour[j], after] - (forward[j] - forward[i]))
+        best = int(np.argmin(delta))
+        moves.append((float(delta[best]), i, int(j[best])))
+    return moves
+
+
+def apply_two_opt(tour, i, j):
+    return tour[:i] + tour[i:j + 1][::-1] + tour[j + 1:]
+
+
+def or_opt_moves(tour, cost, max_segment=OR_OPT_MAX_SEGMENT):
+    """``(delta, i, length, k)``: move ``tour[i:i + length]`` to after position ``k`` of the remaining tour"""
+    tour = np.asarray(tour)
+    moves = []
+    for length in range(1, max_segment + 1):
+        for i in range(1, len(tour) - length):
+            first, last = tour[i], tour[i + length - 1]
+            before, after = tour[i - 1], tour[i + length]
+            removal = cost[before, first] + cost[last, after] - cost[before, after]
+            rest = np.concatenate([tour[:i], tour[i + length:]])
+            insertion = cost[rest[:-1], first] + cost[last, rest[1:]] - cost[rest[:-1], rest[1:]]
+            # Putting the segment back where it came from is not a move
+            insertion[i - 1] = np.inf
+            k = int(np.argmin(insertion))
+            moves.append((float(insertion[k] - removal), i, length, k))
+    return moves
+
+
+def apply_or_opt(tour, i, length, k):
+    segment = tour[i:i + length]
+    rest = tour[:i] + tour[i + length:]
+    return rest[:k + 1] + segment + rest[k + 1:]
+
+
+def improve(tour, cost, windows=None, service_s=0.0, deadline=None):
+    """Alternate 2-opt and Or-opt until neither improves the tour (or ``deadline`` passes)"""
+    if windows is None:
+        while deadline is None or time.perf_counter() < deadline:
+            delta, i, j = min(two_opt_moves(tour, cost), default=(0.0, 0, 0))
+            if delta < -IMPROVEMENT_EPSILON:
+                tour = apply_two_opt(tour, i, j)
+                continue
+            delta, i, length, k = min(or_opt_moves(tour, cost), default=(0.0, 0, 0, 0))
+            if delta < -IMPROVEMENT_EPSILON:
+                tour = apply_or_opt(tour, i, length, k)
+                continue
+            break
+        return tour
+    
+    # With windows a shorter tour can still arrive late, so the moves that save
+    # most travel are scheduled in full and only a better objective is accepted
+    def objective(candidate):
+        _, lateness, finish = schedule(candidate, cost, windows, service_s)
+        return finish + LATENESS_WEIGHT * lateness
+    
+    best = objective(tour)
+    while deadline is None or time.perf_counter() < deadline:
+        candidates = sorted([(delta, apply_two_opt, (i, j)) for delta, i, j in two_opt_moves(tour, cost)] +
+                            [(delta, apply_or_opt, move) for delta, *move in or_opt_moves(tour, cost)],
+                            key=lambda candidate: candidate[0])[:WINDOW_CANDIDATES]
+        candidates += _late_stop_moves(tour, cost, windows, service_s)
+        improved = False
+        for _, apply, move in candidates:
+            candidate = apply(tour, *move)
+            value = objective(candidate)
+            if value < best - IMPROVEMENT_EPSILON:
+                tour, best, improved = candidate, value, True
+                break
+        if not improved:
+            break
+    return tour
+
+
+def _late_stop_moves(tour, cost, windows, service_s):
+    """Every earlier position for each stop that arrives late"""
+    arrivals, _, _ = schedule(tour, cost, windows, service_s)
+    moves = []
+    for i in range(1, len(tour) - 1):
+        if arrivals[i] > windows[tour[i], 1]:
+            moves.extend((0.0, apply_or_opt, (i, 1, k)) for k in range(i - 1))
+    return moves
+
+
+def solve_tour(cost, round_trip=False, fixed_end=False, windows=None, service_s=0.0, time_limit=None,
+               local_search=True):
+    """Visiting order for the stops of ``cost``, starting at stop 0.
+
+    The tour returns to stop 0 with ``round_trip``, ends at the last stop
+    with ``fixed_end``, and otherwise ends wherever is best. ``windows`` is
+    an (n, 2) array of earliest/latest arrival seconds after leaving stop 0
+    (use 0 and inf for stops without one). ``local_search=False`` returns
+    the nearest-neighbour tour unimproved.
+    """
+    count = len(cost)
+    if count <= 2:
+        return list(range(count)) + ([0] if round_trip and count > 1 else [])
+    augmented, end = cost, count - 1
+    if round_trip or not fixed_end:
+        # An extra end node: a free end costs nothing to reach, a return costs the trip back to stop 0
+        augmented = np.zeros((count + 1, count + 1))
+        augmented[:count, :count] = cost
+        if round_trip:
+            augmented[:count, count] = cost[:, 0]
+        if windows is not None:
+            windows = np.vstack([windows, [0.0, np.inf]])
+        end = count
+    deadline = time.perf_counter() + time_limit if time_limit else None
+    
+    tour = nearest_neighbour(augmented, 0, end, windows, service_s)
+    if local_search:
+        tour = improve(tour, augmented, windows, service_s, deadline)
+    if round_trip:
+        return tour[:-1] + [0]
+    return tour if fixed_end else tour[:-1]
+
+
+class TripPlanner:
+    """Order a day's stops for the least travel time and fetch directions for each leg.
+
+    The stop-to-stop travel times come from one cached, parallel matrix
+    build. The order is solved locally (nearest neighbour, then 2-opt and
+    Or-opt), and only the legs of the final order are requested as full
+    directions.
+    """
+    
+    def __init__(self, client, directions_cache=None, matrix_cache=None, concurrency=DEFAULT_CONCURRENCY):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy is required for trip planning. Install with: pip install numpy")
+        self.client = client
+        self.directions_cache = directions_cache
+        self.concurrency = concurrency
+        self.matrix_service = DistanceMatrixService(client, cache=matrix_cache, concurrency=concurrency)
+    
+    def plan(self, stops, mode='driving', departure_time=None, round_trip=False, fixed_end=False,
+             time_windows=None, service_minutes=0, cancel_event=None):
+        """Return a ``TripPlan`` for ``stops``; the first stop is where the day starts"""
+        if len(stops) < 2:
+            raise ValueError("Enter at least two stops")
+        cancel_event = cancel_event or threading.Event()
+        departure_time = departure_time or datetime.now()
+        service_s = service_minutes * 60.0
+        
+        matrix = self.matrix_service.build(stops, stops, mode, departure_time, cancel_event=cancel_event)
+        if cancel_event.is_set():
+            raise RuntimeError("Cancelled")
+        cost = np.nan_to_num(matrix.best_durations(), nan=UNREACHABLE_S)
+        np.fill_diagonal(cost, 0.0)
+        
+        windows = None
+        if time_windows and any(window is not None for window in time_windows):
+            windows = np.array([
+                [0.0, np.inf] if window is None else
+                [(window[0] - departure_time).total_seconds(), (window[1] - departure_time).total_seconds()]
+                for window in time_windows
+            ])
+        
+        started = time.perf_counter()
+        order = solve_tour(cost, round_trip, fixed_end, windows, service_s)
+        solve_ms = (time.perf_counter() - started) * 1000
+        input_order = list(range(len(stops))) + ([0] if round_trip else [])
+        
+        legs, errors = self._fetch_legs([stops[i] for i in order], mode, departure_time, cost, order, service_s,
+                                        windows, cancel_event)
+        arrivals, _, _ = schedule(order, cost, windows, service_s)
+        late_stops = [stops[stop] for stop, arrival in zip(order, arrivals)
+                      if windows is not None and arrival > windows[stop, 1]]
+        return TripPlan(
+            order,
+            [stops[i] for i in order],
+            legs,
+            [departure_time + timedelta(seconds=arrival) for arrival in arrivals],
+            late_stops,
+            tour_cost(order, cost),
+            tour_cost(input_order, cost),
+            solve_ms,
+            errors
+        )
+    
+    def _fetch_legs(self, ordered_stops, mode, departure_time, cost, order, service_s, windows, cancel_event):
+        """Full directions for each consecutive pair, leaving at the scheduled time"""
+        arrivals, _, _ = schedule(order, cost, windows, service_s)
+        pairs = list(zip(ordered_stops, ordered_stops[1:]))
+        leaving = [departure_time + timedelta(seconds=arrival + (service_s if i else 0))
+                   for i, arrival in enumerate(arrivals[:-1])]
+        
+        def fetch(index):
+            if cancel_event.is_set():
+                raise RuntimeError("Cancelled")
+            origin, destination = pairs[index]
+            directions_result = fetch_directions(self.client, origin, destination, mode, leaving[index],
+                                                 cache=self.directions_cache)
+            if not directions_result:
+                raise RuntimeError("No route found")
+            return parse_directions(directions_result, origin, destination, mode)
+        
+        legs = [None] * len(pairs)
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='trip-leg') as pool:
+            futures = [pool.submit(fetch, index) for index in range(len(pairs))]
+            for index, future in enumerate(futures):
+                try:
+                    legs[index] = future.result()
+                except Exception as e:
+                    errors.append(f"{pairs[index][0]} → {pairs[index][1]}: {e}")
+        if cancel_event.is_set():
+            raise RuntimeError("Cancelled")
+        return legs, errors
+
+
+def trip_plan_html(plan):
+    """Visiting order with arrival times and each leg's duration and distance"""
+    saved = plan.input_order_travel_s - plan.travel_s
+    html = f"""
+    <div style="font-family: Arial, sans-serif; color: #ffffff;">
+        <h2 style="color: #4facfe;">🗺️ {len(set(plan.order))} stops, {format_duration(plan.travel_s)} of travel</h2>
+        <p style="color: #b0b0b0;">{format_duration(saved) + " less than in the order entered" if saved >= 60
+                                    else "The order entered was already the quickest found"}
+        (solved in {plan.solve_ms:.0f} ms)</p>
+    """
+    for number, (stop, arrival) in enumerate(zip(plan.stops, plan.arrivals)):
+        if number:
+            leg = plan.legs[number - 1]
+            detail = f"{leg['duration']}, {leg['distance']}" if leg else "no directions"
+            html += f'<p style="color: #b0b0b0; margin-left: 20px;">↓ {detail}</p>'
+        late = ' <span style="color: #ff6b6b;">(late for its window)</span>' if stop in plan.late_stops and number else ''
+        html += f'<p><strong>{number + 1}. {stop}</strong> — {"leave" if number == 0 else "arrive"} {arrival:%H:%M}{late}</p>'
+    if plan.errors:
+        html += '<p style="color: #ff6b6b;">⚠️ ' + '<br>'.join(plan.errors) + '</p>'
+    return html + "</div>"
+
+
+def random_instance(count, seed=7, window_share=0.0, service_s=600.0):
+    """Asymmetric travel times between random points, with windows on a share of the stops"""
+    rng = np.random.default_rng(seed)
+    points = rng.uniform(0, 20000, size=(count, 2))
+    distance = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+    # One-way streets and congestion make the two directions differ
+    cost = distance / 8.0 * rng.uniform(0.9, 1.3, size=(count, count))
+    np.fill_diagonal(cost, 0.0)
+    if not window_share:
+        return cost, None
+    windows = np.tile([0.0, np.inf], (count, 1))
+    horizon = count * (cost.mean() + service_s)
+    for stop in rng.choice(np.arange(1, count), size=int((count - 1) * window_share), replace=False):
+        earliest = rng.uniform(0, horizon * 0.8)
+        windows[stop] = [earliest, earliest + 2 * 3600]
+    return cost, windows
+
+
+def benchmark(count=50, repeats=5):
+    """Solve random 50-stop tours, then plan a trip end to end against the fake server"""
+    from Fake_maps_server import FakeMapsServer, FakeMapsClient
+    from Directions_service import DirectionsCache
+    import os
+    import tempfile
+    
+    for label, window_share, round_trip in (("open path", 0.0, False), ("round trip", 0.0, True),
+                                            ("open, 30% time windows", 0.3, False)):
+        service_s = 600.0 if window_share else 0.0
+        timings, ratios, late = [], [], []
+        for seed in range(repeats):
+            cost, windows = random_instance(count, seed, window_share, service_s)
+            started = time.perf_counter()
+            tour = solve_tour(cost, round_trip=round_trip, windows=windows, service_s=service_s)
+            timings.append(time.perf_counter() - started)
+            assert sorted(set(tour)) == list(range(count))
+            greedy = solve_tour(cost, round_trip=round_trip, windows=windows, service_s=service_s, local_search=False)
+            ratios.append(tour_cost(tour, cost) / tour_cost(greedy, cost))
+            if windows is not None:
+                late.append([sum(arrival > windows[stop, 1] for stop, arrival in zip(candidate, arrivals))
+                             for candidate in (tour, greedy)
+                             for arrivals in [schedule(candidate, cost, windows, service_s)[0]]])
+        print(f"{label:24s} {count} stops: solve avg {np.mean(timings) * 1000:6.1f} ms, max {max(timings) * 1000:6.1f} ms; "
+              f"travel {np.mean(ratios) * 100:5.1f}% of nearest neighbour"
+              + (f"; stops late {np.mean([solved for solved, _ in late]):.1f} vs {np.mean([greedy for _, greedy in late]):.1f}"
+                 if late else ""))
+    
+    stops = [f"Site {i}, Jaipur" for i in range(count)]
+    with FakeMapsServer(latency=0.05) as server, tempfile.TemporaryDirectory() as folder:
+        planner = TripPlanner(FakeMapsClient(server.url), DirectionsCache(os.path.join(folder, 'bench_cache.json')),
+                              concurrency=8)
+        for label in ('cold', 'cached'):
+            requests_before = server.request_count
+            started = time.perf_counter()
+            plan = planner.plan(stops)
+            print(f"end to end ({label}): {time.perf_counter() - started:.2f}s, "
+                  f"{server.request_count - requests_before} requests, solve {plan.solve_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("Usage: python Trip_planner.py --bench")